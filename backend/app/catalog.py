@@ -0,0 +1,549 @@
+"""
+Indexed product catalog.
+
+Wraps the product data with O(1) lookups by id, key, (category, subcategory)
+and (brand, subcategory), golden pairs by women's product id, and the match
+indexes over the men's catalogs. Services and endpoints go through the
+repository returned by get_catalog() rather than scanning the raw product dicts.
+
+CATALOG_BACKEND selects the implementation: "memory" (CatalogStore over the
+demo data), "columnar" (the same, with products stored column-wise, see
+columnar.py), "sqlite" (SqliteCatalog, see sqlite_catalog.py) or "snapshot"
+(SnapshotCatalog over a memory-mapped file, see snapshot.py).
+
+A loaded catalog is immutable. reload_catalog() builds a complete new one
+(indexes and match table included) and swaps the module reference in one
+assignment, so readers never lock: a request takes get_catalog() once and
+finishes against that version even if a reload lands meanwhile. The replaced
+catalog releases its files (SQLite connections, snapshot mapping) once the
+last of those requests lets go of it.
+"""
+import gc
+import itertools
+import os
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from typing import Callable, Iterator, Mapping, Optional
+from .models import ProductCategory
+from .services.automaton import get_key_matcher
+from .services.facets import FacetIndex
+from .services.index import CatalogIndex
+from .services.precompute import read_match_table
+from .services.search import SearchIndex
+from .services.suggest import SuggestIndex
+
+
+# Candidate generation: "exact" inverted index, or "lsh" for approximate
+# MinHash matching on ingredients (see services/minhash.py)
+MATCHING_MODE = os.getenv("MATCHING_MODE", "exact")
+
+# LSH recall-vs-speed knob: more rows per band = fewer candidates, lower recall
+LSH_BANDS = int(os.getenv("LSH_BANDS", 32))
+LSH_ROWS = int(os.getenv("LSH_ROWS", 4))
+
+# Catalog repository: "memory" (demo data dicts), "columnar", "sqlite" (CATALOG_SQLITE_PATH)
+# or "snapshot" (memory-mapped CATALOG_SNAPSHOT_PATH)
+CATALOG_BACKEND = os.getenv("CATALOG_BACKEND", "memory")
+CATALOG_SQLITE_PATH = os.getenv("CATALOG_SQLITE_PATH", "catalog.db")
+CATALOG_SNAPSHOT_PATH = os.getenv("CATALOG_SNAPSHOT_PATH", "catalog.snap")
+
+# Precomputed match table (python -m app.services.precompute), loaded with each catalog
+MATCH_TABLE_PATH = os.getenv("MATCH_TABLE_PATH")
+
+# Products per page when a listing is streamed page by page
+LISTING_CHUNK_SIZE = 500
+
+# Each loaded catalog gets a new version, so derived caches can tell it apart
+_versions = itertools.count(1)
+
+# Serialize lazy index builds, so concurrent first requests don't build the same index twice
+_index_locks = {name: threading.Lock() for name in ("_search_index", "_suggest_index", "_facet_index")}
+
+
+def next_version() -> int:
+    """Allocate a version number for a newly loaded catalog."""
+    return next(_versions)
+
+
+class CatalogRepository(ABC):
+    """
+    Read-only product catalog interface used by the matching and search services.
+
+    Product databases are mappings of catalog key -> product dict, iterated in
+    catalog order. Listings and lookups return product dicts.
+    """
+
+    version: int
+    golden_pairs: list[dict]
+    # Precomputed top-k matches by women's product id, built for this catalog
+    match_table: dict[str, dict] = {}
+    # When the attached match table was generated (None without one)
+    match_table_generated_at: Optional[float] = None
+    _search_index: Optional[SearchIndex] = None
+    _suggest_index: Optional[SuggestIndex] = None
+    _facet_index: Optional[FacetIndex] = None
+    womens_products: Mapping[str, dict]
+    mens_products: Mapping[str, dict]
+    womens_clothing: Mapping[str, dict]
+    mens_clothing: Mapping[str, dict]
+
+    def _build_match_indexes(self):
+        """Build the key matchers and men's candidate indexes over the product mappings."""
+        # Title-to-key automatons used by find_matching_key
+        for products in (self.womens_products, self.mens_products, self.womens_clothing, self.mens_clothing):
+            get_key_matcher(products)
+
+        # Candidate indexes over the men's catalogs
+        self.mens_products_index = CatalogIndex(self.mens_products)
+        self.mens_clothing_index = CatalogIndex(self.mens_clothing)
+
+        if MATCHING_MODE == "lsh":
+            self.mens_products_index.build_lsh(LSH_BANDS, LSH_ROWS)
+            self.mens_clothing_index.build_lsh(LSH_BANDS, LSH_ROWS)
+
+    def attach_match_table(self, table: Optional[dict]):
+        """Attach a match table read with read_match_table, or detach it with None."""
+        self.match_table = table["matches"] if table else {}
+        self.match_table_generated_at = table.get("generated_at") if table else None
+
+    def _lazy_index(self, name: str, build: Callable):
+        """Get the index stored in attribute name, building it from this catalog on first use."""
+        index = getattr(self, name)
+        if index is None:
+            with _index_locks[name]:
+                index = getattr(self, name)
+                if index is None:
+                    index = build(self)
+                    setattr(self, name, index)
+        return index
+
+    @property
+    def search_index(self) -> SearchIndex:
+        """
+        BM25 index over every product, built on first use.
+
+        load_catalog() builds it before an in-memory catalog goes live, and
+        in the background for other backends; snapshots map it from the file.
+        """
+        return self._lazy_index("_search_index", SearchIndex.from_catalog)
+
+    @property
+    def suggest_index(self) -> SuggestIndex:
+        """Typeahead prefix index over titles and brands, built on first use like search_index."""
+        return self._lazy_index("_suggest_index", SuggestIndex.from_catalog)
+
+    @property
+    def facet_index(self) -> FacetIndex:
+        """Facet value bitsets over every product, built on first use like search_index."""
+        return self._lazy_index("_facet_index", FacetIndex.from_catalog)
+
+    def _releaser(self) -> Optional[Callable[[], None]]:
+        """
+        Get a callable closing the files this catalog holds open, or None.
+
+        It must not reference the catalog itself: it runs once a replaced
+        catalog is unreachable, i.e. after the requests using it have finished.
+        """
+        return None
+
+    @abstractmethod
+    def womens_db(self, category: ProductCategory) -> Mapping[str, dict]:
+        """Get the women's product mapping searched for a product category."""
+
+    @abstractmethod
+    def mens_db(self, category: ProductCategory) -> Mapping[str, dict]:
+        """Get the men's product mapping searched for a product category."""
+
+    @abstractmethod
+    def mens_index(self, category: ProductCategory) -> CatalogIndex:
+        """Get the match candidate index over the men's products for a category."""
+
+    @abstractmethod
+    def get_product(self, product_id: str) -> Optional[dict]:
+        """Get any product by id."""
+
+    @abstractmethod
+    def get_key(self, product_id: str) -> Optional[str]:
+        """Get the catalog key of a product by id."""
+
+    @abstractmethod
+    def get_womens(self, key: str) -> Optional[dict]:
+        """Get a women's product by catalog key."""
+
+    @abstractmethod
+    def get_mens(self, key: str) -> Optional[dict]:
+        """Get a men's product by catalog key."""
+
+    @abstractmethod
+    def womens_by_subcategory(self, category: str, subcategory: str) -> list[dict]:
+        """Get women's products in a (category, subcategory), in catalog order."""
+
+    @abstractmethod
+    def mens_by_subcategory(self, category: str, subcategory: str) -> list[dict]:
+        """Get men's products in a (category, subcategory), in catalog order."""
+
+    @abstractmethod
+    def mens_by_brand(self, brand: str, subcategory: str) -> list[dict]:
+        """Get men's products of a brand in a subcategory, in catalog order."""
+
+    @abstractmethod
+    def golden_pair(self, womens_id: str) -> Optional[dict]:
+        """Get pre-computed pair data for a women's product."""
+
+    @abstractmethod
+    def list_womens(self, category: Optional[str] = None) -> list[dict]:
+        """List women's products, optionally restricted to one category."""
+
+    @abstractmethod
+    def list_mens(self, category: Optional[str] = None) -> list[dict]:
+        """List men's products, optionally restricted to one category."""
+
+    @abstractmethod
+    def list_page(
+        self,
+        side: str,
+        category: Optional[str] = None,
+        after: Optional[str] = None,
+        limit: int = 100
+    ) -> list[dict]:
+        """
+        List one page of a side's products in product id order.
+
+        Args:
+            side: "womens" or "mens"
+            category: Optional category to restrict to
+            after: Product id the previous page ended on (exclusive)
+            limit: Maximum products to return
+
+        The order doesn't depend on catalog load order, so an id cursor stays
+        valid across catalog versions.
+        """
+
+    def filtered_page(
+        self,
+        side: str,
+        filters: dict[str, list[str]],
+        after: Optional[str] = None,
+        limit: int = 100
+    ) -> list[dict]:
+        """List one page of a side's products matching facet filters, in product id order."""
+        index = self.facet_index
+        ids = index.page(index.select(filters, side), side, after, limit)
+        return [product for product in map(self.get_product, ids) if product is not None]
+
+    def iter_pages(
+        self,
+        side: str,
+        category: Optional[str] = None,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+        filters: Optional[dict[str, list[str]]] = None
+    ) -> Iterator[list[dict]]:
+        """Stream a side's products in id order, a bounded page at a time, optionally facet-filtered."""
+        if filters and category:
+            filters = {**filters, "category": [category]}
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = LISTING_CHUNK_SIZE if remaining is None else min(remaining, LISTING_CHUNK_SIZE)
+            if filters:
+                page = self.filtered_page(side, filters, after, size)
+            else:
+                page = self.list_page(side, category, after, size)
+            if page:
+                yield page
+            if len(page) < size:
+                return
+            after = page[-1]["id"]
+            if remaining is not None:
+                remaining -= len(page)
+
+    @abstractmethod
+    def count_womens(self) -> int:
+        """Count women's products."""
+
+    @abstractmethod
+    def count_mens(self) -> int:
+        """Count men's products."""
+
+
+class CatalogStore(CatalogRepository):
+    """Read-only in-memory product catalog with precomputed indexes, built once at load."""
+
+    def __init__(
+        self,
+        womens_products: dict,
+        mens_products: dict,
+        womens_clothing: dict,
+        mens_clothing: dict,
+        golden_pairs: list[dict]
+    ):
+        self.version = next_version()
+        self.womens_products = womens_products
+        self.mens_products = mens_products
+        self.womens_clothing = womens_clothing
+        self.mens_clothing = mens_clothing
+        self.golden_pairs = golden_pairs
+
+        # Merged views, matching get_all_womens_products()/get_all_mens_products()
+        self.all_womens = {**womens_products, **womens_clothing}
+        self.all_mens = {**mens_products, **mens_clothing}
+
+        self._by_id: dict[str, tuple[str, dict]] = {}
+        self._womens_by_category: dict[str, list[dict]] = {}
+        self._mens_by_category: dict[str, list[dict]] = {}
+        self._womens_by_subcategory: dict[tuple[str, str], list[dict]] = {}
+        self._mens_by_subcategory: dict[tuple[str, str], list[dict]] = {}
+        self._mens_by_brand: dict[tuple[str, str], list[dict]] = {}
+
+        for products, by_category, by_subcategory in (
+            (self.all_womens, self._womens_by_category, self._womens_by_subcategory),
+            (self.all_mens, self._mens_by_category, self._mens_by_subcategory)
+        ):
+            for key, product in products.items():
+                self._by_id[product["id"]] = (key, product)
+                by_category.setdefault(product.get("category"), []).append(product)
+                by_subcategory.setdefault(
+                    (product.get("category"), product.get("subcategory")), []
+                ).append(product)
+
+        # Id-sorted listings per (side, category), with None for the whole side
+        self._listings: dict[tuple[str, Optional[str]], tuple[list[str], list[dict]]] = {}
+        for side, products in (("womens", self.all_womens), ("mens", self.all_mens)):
+            groups: dict[Optional[str], list[dict]] = {None: list(products.values())}
+            for product in groups[None]:
+                if product.get("category"):
+                    groups.setdefault(product["category"], []).append(product)
+            for category, members in groups.items():
+                members.sort(key=lambda product: product["id"])
+                self._listings[(side, category)] = ([product["id"] for product in members], members)
+
+        for product in self.all_mens.values():
+            self._mens_by_brand.setdefault(
+                (product.get("brand"), product.get("subcategory")), []
+            ).append(product)
+
+        # First pair wins, as with a scan over the list
+        self._golden_by_womens_id: dict[str, dict] = {}
+        for pair in golden_pairs:
+            self._golden_by_womens_id.setdefault(pair["womens_id"], pair)
+
+        self._build_match_indexes()
+
+    @classmethod
+    def from_mock_data(cls, compact: bool = False) -> "CatalogStore":
+        """
+        Build the store from the demo product database.
+
+        Args:
+            compact: Store products in columnar form (see columnar.py)
+        """
+        from . import mock_data
+        products = (
+            mock_data.WOMENS_PRODUCTS,
+            mock_data.MENS_PRODUCTS,
+            mock_data.WOMENS_CLOTHING,
+            mock_data.MENS_CLOTHING
+        )
+        if compact:
+            from .columnar import ColumnarProducts, StringPool
+            pool = StringPool()
+            products = tuple(ColumnarProducts(db, pool) for db in products)
+        return cls(*products, mock_data.GOLDEN_PAIRS)
+
+    # -------------------------------------------------------------------------
+    # Per-category product databases
+    # -------------------------------------------------------------------------
+
+    def womens_db(self, category: ProductCategory) -> dict:
+        """Get the women's product dict searched for a product category."""
+        return self.womens_clothing if category == ProductCategory.CLOTHING else self.womens_products
+
+    def mens_db(self, category: ProductCategory) -> dict:
+        """Get the men's product dict searched for a product category."""
+        return self.mens_clothing if category == ProductCategory.CLOTHING else self.mens_products
+
+    def mens_index(self, category: ProductCategory) -> CatalogIndex:
+        """Get the match candidate index over the men's products for a category."""
+        if category == ProductCategory.CLOTHING:
+            return self.mens_clothing_index
+        return self.mens_products_index
+
+    # -------------------------------------------------------------------------
+    # Lookups
+    # -------------------------------------------------------------------------
+
+    def get_product(self, product_id: str) -> Optional[dict]:
+        """Get any product by id."""
+        entry = self._by_id.get(product_id)
+        return entry[1] if entry else None
+
+    def get_key(self, product_id: str) -> Optional[str]:
+        """Get the catalog key of a product by id."""
+        entry = self._by_id.get(product_id)
+        return entry[0] if entry else None
+
+    def get_womens(self, key: str) -> Optional[dict]:
+        """Get a women's product by catalog key."""
+        return self.all_womens.get(key)
+
+    def get_mens(self, key: str) -> Optional[dict]:
+        """Get a men's product by catalog key."""
+        return self.all_mens.get(key)
+
+    def womens_by_subcategory(self, category: str, subcategory: str) -> list[dict]:
+        """Get women's products in a (category, subcategory), in catalog order."""
+        return self._womens_by_subcategory.get((category, subcategory), [])
+
+    def mens_by_subcategory(self, category: str, subcategory: str) -> list[dict]:
+        """Get men's products in a (category, subcategory), in catalog order."""
+        return self._mens_by_subcategory.get((category, subcategory), [])
+
+    def mens_by_brand(self, brand: str, subcategory: str) -> list[dict]:
+        """Get men's products of a brand in a subcategory, in catalog order."""
+        return self._mens_by_brand.get((brand, subcategory), [])
+
+    def golden_pair(self, womens_id: str) -> Optional[dict]:
+        """Get pre-computed pair data for a women's product."""
+        return self._golden_by_womens_id.get(womens_id)
+
+    # -------------------------------------------------------------------------
+    # Listings
+    # -------------------------------------------------------------------------
+
+    def list_womens(self, category: Optional[str] = None) -> list[dict]:
+        """List women's products, optionally restricted to one category."""
+        if category:
+            return self._womens_by_category.get(category, [])
+        return list(self.all_womens.values())
+
+    def list_mens(self, category: Optional[str] = None) -> list[dict]:
+        """List men's products, optionally restricted to one category."""
+        if category:
+            return self._mens_by_category.get(category, [])
+        return list(self.all_mens.values())
+
+    def list_page(
+        self,
+        side: str,
+        category: Optional[str] = None,
+        after: Optional[str] = None,
+        limit: int = 100
+    ) -> list[dict]:
+        """List one page of a side's products in product id order."""
+        ids, products = self._listings.get((side, category or None), ([], []))
+        start = bisect_right(ids, after) if after is not None else 0
+        return products[start:start + limit]
+
+    def count_womens(self) -> int:
+        """Count women's products."""
+        return len(self.all_womens)
+
+    def count_mens(self) -> int:
+        """Count men's products."""
+        return len(self.all_mens)
+
+
+def load_catalog() -> CatalogRepository:
+    """Build a new catalog, with its indexes and match table, from the configured backend."""
+    if CATALOG_BACKEND == "sqlite":
+        from .sqlite_catalog import SqliteCatalog
+        catalog = SqliteCatalog(CATALOG_SQLITE_PATH)
+    elif CATALOG_BACKEND == "snapshot":
+        from .snapshot import SnapshotCatalog
+        catalog = SnapshotCatalog(CATALOG_SNAPSHOT_PATH)
+    elif CATALOG_BACKEND == "columnar":
+        catalog = CatalogStore.from_mock_data(compact=True)
+    else:
+        catalog = CatalogStore.from_mock_data()
+
+    if MATCH_TABLE_PATH and os.path.exists(MATCH_TABLE_PATH):
+        catalog.attach_match_table(read_match_table(MATCH_TABLE_PATH))
+    # Suggestions are ranked with the match table, so it has to be attached first
+    if isinstance(catalog, CatalogStore):
+        # Products are in memory already: build the indexes now, not on the first request
+        catalog.search_index
+        catalog.suggest_index
+        catalog.facet_index
+    else:
+        # Don't hold a file-backed catalog back while indexes it doesn't store are built
+        # from every product; a request arriving first builds the one it needs itself
+        threading.Thread(
+            target=_build_search_indexes, args=(catalog,), name="catalog-indexes", daemon=True
+        ).start()
+    return catalog
+
+
+def _build_search_indexes(catalog: CatalogRepository):
+    """Build whichever search, facet and suggest indexes a catalog doesn't have yet."""
+    start = time.perf_counter()
+    try:
+        catalog.search_index
+        catalog.facet_index
+        catalog.suggest_index
+    except Exception as e:
+        print(f"Building search indexes for catalog v{catalog.version} failed: {e}")
+        return
+    print(f"Search indexes for catalog v{catalog.version} ready in {time.perf_counter() - start:.2f}s")
+
+
+def catalog_sources() -> list[str]:
+    """Files a reload would read, for change detection."""
+    sources = []
+    if CATALOG_BACKEND == "sqlite":
+        sources += [CATALOG_SQLITE_PATH, f"{CATALOG_SQLITE_PATH}-wal"]
+    elif CATALOG_BACKEND == "snapshot":
+        sources.append(CATALOG_SNAPSHOT_PATH)
+    if MATCH_TABLE_PATH:
+        sources.append(MATCH_TABLE_PATH)
+    return sources
+
+
+_catalog: Optional[CatalogRepository] = None
+
+# Serializes loads and reloads; readers never take it
+_load_lock = threading.Lock()
+
+
+def get_catalog() -> CatalogRepository:
+    """Get the current catalog, loading the configured backend on first use."""
+    catalog = _catalog
+    if catalog is None:
+        with _load_lock:
+            if _catalog is None:
+                set_catalog(load_catalog())
+            catalog = _catalog
+    return catalog
+
+
+def set_catalog(catalog: CatalogRepository):
+    """Make a fully built catalog current (a single reference swap)."""
+    global _catalog
+    retired, _catalog = _catalog, catalog
+    if retired is not None and retired is not catalog:
+        weakref.finalize(retired, _release_catalog, retired.version, retired._releaser())
+
+
+def _release_catalog(version: int, release: Optional[Callable[[], None]]):
+    """Close a replaced catalog's files once nothing references it any more."""
+    if release is not None:
+        release()
+    print(f"Released catalog v{version}")
+
+
+def reload_catalog() -> CatalogRepository:
+    """
+    Build a new catalog version in the calling thread and switch to it.
+
+    Requests already holding the previous catalog finish against it. If the
+    build fails, the previous catalog stays current and the error propagates.
+    """
+    with _load_lock:
+        catalog = load_catalog()
+        set_catalog(catalog)
+    # Catalogs hold reference cycles (products and their key matchers), so retired
+    # ones are freed by the cycle collector: run it for those no request still uses
+    gc.collect()
+    return catalog
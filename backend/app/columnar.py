@@ -0,0 +1,494 @@
+"""
+Compact columnar product storage.
+
+Product dicts are stored as struct-of-arrays columns instead of one nested
+dict per product:
+
+- unique strings (id, title, image URL, catalog key) as UTF-8 blobs with offsets
+- prices in an array('d')
+- repeated strings (category, subcategory, brand) as interned ids in array('I')
+- string lists (ingredients, materials, retailers, ...) as interned ids in one
+  flat array('I') per field, with offsets
+- small structured values (attributes, size charts) as interned JSON, so
+  identical charts are stored once
+
+ColumnarProducts is a read-only Mapping of catalog key -> ProductView, and
+ProductView is a read-only Mapping over one product, so code written against
+the product dicts keeps working unchanged. Values that don't fit their
+column's type are kept as-is in a sparse side table.
+
+Measure bytes per product against plain dicts with:
+    python -m app.columnar --products 1000000
+    python -m app.columnar --products 100000 --loaded   # whole CatalogStore with its indexes
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import resource
+import time
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Iterable, Iterator, Mapping, Optional, Sequence, Union
+
+# Column kinds
+TEXT = "text"        # unique per product: UTF-8 blob + offsets
+NUMBER = "number"    # float in array('d')
+SYMBOL = "symbol"    # interned string id
+SYMBOLS = "symbols"  # list of interned string ids
+JSON = "json"        # interned JSON text of a dict
+
+SCHEMA = {
+    "id": TEXT,
+    "title": TEXT,
+    "price": NUMBER,
+    "category": SYMBOL,
+    "subcategory": SYMBOL,
+    "brand": SYMBOL,
+    "ingredients": SYMBOLS,
+    "materials": SYMBOLS,
+    "attributes": JSON,
+    "available_sizes": SYMBOLS,
+    "size_chart": JSON,
+    "retailers": SYMBOLS,
+    "image_url": TEXT,
+    "matches_womens": SYMBOLS
+}
+
+
+class StringPool:
+    """Interned strings addressed by integer id, shareable across columns and catalogs."""
+
+    def __init__(self):
+        self.strings: list[str] = []
+        self._ids: dict[str, int] = {}
+
+    def intern(self, value: str) -> int:
+        """Get the id of a string, adding it on first sight."""
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self._ids[value] = string_id
+            self.strings.append(value)
+        return string_id
+
+    def __getitem__(self, string_id: int) -> str:
+        return self.strings[string_id]
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+
+class _TextColumn:
+    """Per-product strings packed into one UTF-8 blob."""
+
+    def __init__(self, blob: Optional[Sequence] = None, offsets: Optional[Sequence] = None):
+        self.blob = blob if blob is not None else bytearray()
+        self.offsets = offsets if offsets is not None else array("Q", [0])
+
+    def append(self, value: str):
+        self.blob += value.encode("utf-8")
+        self.offsets.append(len(self.blob))
+
+    def raw(self, ordinal: int) -> bytes:
+        return bytes(self.blob[self.offsets[ordinal]:self.offsets[ordinal + 1]])
+
+    def get(self, ordinal: int) -> str:
+        return self.raw(ordinal).decode("utf-8")
+
+
+class _SymbolsColumn:
+    """Per-product string lists as interned ids in one flat array."""
+
+    def __init__(self, ids: Optional[Sequence] = None, offsets: Optional[Sequence] = None):
+        self.ids = ids if ids is not None else array("I")
+        self.offsets = offsets if offsets is not None else array("Q", [0])
+
+    def append(self, ids: Iterable[int]):
+        self.ids.extend(ids)
+        self.offsets.append(len(self.ids))
+
+    def get(self, ordinal: int, pool: Sequence[str]) -> list[str]:
+        return [pool[i] for i in self.ids[self.offsets[ordinal]:self.offsets[ordinal + 1]]]
+
+
+def _fits(kind: str, value: Any) -> bool:
+    """Whether a value can be stored in a column of this kind without changing it."""
+    if kind in (TEXT, SYMBOL):
+        return isinstance(value, str)
+    if kind == NUMBER:
+        return type(value) is float
+    if kind == SYMBOLS:
+        return type(value) is list and all(isinstance(item, str) for item in value)
+    if kind == JSON:
+        # Must survive the round trip exactly (no tuples, non-string keys, ...)
+        try:
+            return type(value) is dict and json.loads(json.dumps(value)) == value
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+class ProductView(Mapping):
+    """Read-only dict-like view of one product in a ColumnarProducts store."""
+
+    __slots__ = ("_products", "_ordinal")
+
+    def __init__(self, products: "ColumnarProducts", ordinal: int):
+        self._products = products
+        self._ordinal = ordinal
+
+    def __getitem__(self, field: str) -> Any:
+        return self._products._value(self._ordinal, field)
+
+    def __contains__(self, field: object) -> bool:
+        return field in self._products._layout(self._ordinal)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._products._layout(self._ordinal))
+
+    def __len__(self) -> int:
+        return len(self._products._layout(self._ordinal))
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class ColumnarProducts(Mapping):
+    """
+    Read-only catalog key -> product mapping stored column-wise.
+
+    Iteration follows the input order; key lookups bisect a key-sorted
+    ordinal array instead of holding a dict entry per product.
+    """
+
+    def __init__(
+        self,
+        products: Union[Mapping[str, dict], Iterable[tuple[str, dict]]],
+        pool: Optional[StringPool] = None
+    ):
+        self.pool = pool if pool is not None else StringPool()
+        self._size = 0
+        self._keys = _TextColumn()
+        self._text = {field: _TextColumn() for field, kind in SCHEMA.items() if kind == TEXT}
+        self._numbers = {field: array("d") for field, kind in SCHEMA.items() if kind == NUMBER}
+        self._symbols = {field: array("I") for field, kind in SCHEMA.items() if kind in (SYMBOL, JSON)}
+        self._lists = {field: _SymbolsColumn() for field, kind in SCHEMA.items() if kind == SYMBOLS}
+
+        # Field order per product, interned: most products share a handful of layouts
+        self._layouts: list[tuple[str, ...]] = []
+        self._layout_ids: dict[tuple[str, ...], int] = {}
+        self._product_layouts = array("I")
+
+        # Values that don't fit their column (or have no column), by ordinal
+        self._extras: dict[int, dict] = {}
+
+        items = products.items() if isinstance(products, Mapping) else products
+        for key, product in items:
+            self._append(key, product)
+
+        self._by_key = array("I", sorted(range(self._size), key=self._keys.raw))
+
+    def _append(self, key: str, product: Mapping):
+        ordinal = self._size
+        self._size += 1
+        self._keys.append(key)
+
+        layout = tuple(product)
+        layout_id = self._layout_ids.get(layout)
+        if layout_id is None:
+            layout_id = len(self._layouts)
+            self._layout_ids[layout] = layout_id
+            self._layouts.append(layout)
+        self._product_layouts.append(layout_id)
+
+        extras = {}
+        for field, value in product.items():
+            if field not in SCHEMA or not _fits(SCHEMA[field], value):
+                extras[field] = value
+        if extras:
+            self._extras[ordinal] = extras
+
+        # Every column gets a slot per product; absent fields hold a placeholder
+        for field, column in self._text.items():
+            value = product.get(field)
+            column.append(value if field not in extras and isinstance(value, str) else "")
+        for field, column in self._numbers.items():
+            value = product.get(field)
+            column.append(value if field not in extras and type(value) is float else 0.0)
+        for field, column in self._symbols.items():
+            value = product.get(field)
+            if field in extras or field not in product:
+                column.append(0)
+            elif SCHEMA[field] == JSON:
+                column.append(self.pool.intern(json.dumps(value)))
+            else:
+                column.append(self.pool.intern(value))
+        for field, column in self._lists.items():
+            value = product.get(field)
+            if field in extras or field not in product:
+                column.append(())
+            else:
+                column.append(self.pool.intern(item) for item in value)
+
+    def columns(self) -> dict[str, Sequence]:
+        """Get every column buffer by name, for serialization (see snapshot.py)."""
+        columns = {
+            "keys.blob": self._keys.blob,
+            "keys.offsets": self._keys.offsets,
+            "by_key": self._by_key,
+            "layouts": self._product_layouts
+        }
+        for field, column in self._text.items():
+            columns[f"text.{field}.blob"] = column.blob
+            columns[f"text.{field}.offsets"] = column.offsets
+        for field, column in self._numbers.items():
+            columns[f"numbers.{field}"] = column
+        for field, column in self._symbols.items():
+            columns[f"symbols.{field}"] = column
+        for field, column in self._lists.items():
+            columns[f"lists.{field}.ids"] = column.ids
+            columns[f"lists.{field}.offsets"] = column.offsets
+        return columns
+
+    def metadata(self) -> dict:
+        """Get the non-column state (size, field layouts, side-table values) as JSON-able data."""
+        return {
+            "size": self._size,
+            "layouts": [list(layout) for layout in self._layouts],
+            "extras": {str(ordinal): extras for ordinal, extras in self._extras.items()}
+        }
+
+    @classmethod
+    def from_columns(
+        cls,
+        columns: Mapping[str, Sequence],
+        metadata: dict,
+        pool: Sequence[str]
+    ) -> "ColumnarProducts":
+        """
+        Rebuild a store around existing column buffers (e.g. memoryviews of a snapshot).
+
+        Args:
+            columns: Buffers as returned by columns()
+            metadata: State as returned by metadata()
+            pool: String lookup by id for the symbol columns
+        """
+        products = cls.__new__(cls)
+        products.pool = pool
+        products._size = metadata["size"]
+        products._keys = _TextColumn(columns["keys.blob"], columns["keys.offsets"])
+        products._by_key = columns["by_key"]
+        products._product_layouts = columns["layouts"]
+        products._layouts = [tuple(layout) for layout in metadata["layouts"]]
+        products._layout_ids = {layout: i for i, layout in enumerate(products._layouts)}
+        products._extras = {int(ordinal): extras for ordinal, extras in metadata["extras"].items()}
+
+        products._text = {
+            field: _TextColumn(columns[f"text.{field}.blob"], columns[f"text.{field}.offsets"])
+            for field, kind in SCHEMA.items() if kind == TEXT
+        }
+        products._numbers = {
+            field: columns[f"numbers.{field}"] for field, kind in SCHEMA.items() if kind == NUMBER
+        }
+        products._symbols = {
+            field: columns[f"symbols.{field}"] for field, kind in SCHEMA.items() if kind in (SYMBOL, JSON)
+        }
+        products._lists = {
+            field: _SymbolsColumn(columns[f"lists.{field}.ids"], columns[f"lists.{field}.offsets"])
+            for field, kind in SCHEMA.items() if kind == SYMBOLS
+        }
+        return products
+
+    def _layout(self, ordinal: int) -> tuple[str, ...]:
+        return self._layouts[self._product_layouts[ordinal]]
+
+    def _value(self, ordinal: int, field: str) -> Any:
+        if field not in self._layout(ordinal):
+            raise KeyError(field)
+
+        extras = self._extras.get(ordinal)
+        if extras is not None and field in extras:
+            return extras[field]
+
+        kind = SCHEMA[field]
+        if kind == TEXT:
+            return self._text[field].get(ordinal)
+        if kind == NUMBER:
+            return self._numbers[field][ordinal]
+        if kind == SYMBOL:
+            return self.pool[self._symbols[field][ordinal]]
+        if kind == JSON:
+            # Decoded per access, so callers can't mutate the shared value
+            return json.loads(self.pool[self._symbols[field][ordinal]])
+        return self._lists[field].get(ordinal, self.pool)
+
+    def ordinal_of(self, key: str) -> Optional[int]:
+        """Position of a key in catalog order, or None if absent."""
+        target = key.encode("utf-8")
+        position = bisect_left(self._by_key, target, key=self._keys.raw)
+        if position < self._size and self._keys.raw(self._by_key[position]) == target:
+            return self._by_key[position]
+        return None
+
+    def key_at(self, ordinal: int) -> str:
+        """Catalog key at a position in catalog order."""
+        return self._keys.get(ordinal)
+
+    def product_at(self, ordinal: int) -> ProductView:
+        """Product at a position in catalog order."""
+        return ProductView(self, ordinal)
+
+    def __getitem__(self, key: str) -> ProductView:
+        ordinal = self.ordinal_of(key) if isinstance(key, str) else None
+        if ordinal is None:
+            raise KeyError(key)
+        return ProductView(self, ordinal)
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self.ordinal_of(key) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        for ordinal in range(self._size):
+            yield self._keys.get(ordinal)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def items(self) -> Iterator[tuple[str, ProductView]]:
+        for ordinal in range(self._size):
+            yield self._keys.get(ordinal), ProductView(self, ordinal)
+
+    def values(self) -> Iterator[ProductView]:
+        for ordinal in range(self._size):
+            yield ProductView(self, ordinal)
+
+
+# =============================================================================
+# Memory benchmark
+# =============================================================================
+
+def synthetic_products(count: int, seed: int = 7) -> Iterator[tuple[str, dict]]:
+    """
+    Generate mock_data-shaped products.
+
+    Each product goes through a JSON round trip, so its strings are separate
+    objects as they would be when loaded from a feed or API.
+    """
+    rng = random.Random(seed)
+    brands = [f"Brand {i}" for i in range(500)]
+    words = [f"word{i}" for i in range(5000)]
+    ingredients = [f"ingredient {i}" for i in range(2000)]
+    subcategories = ["razors", "shave_gel", "deodorant", "body_wash", "lotion", "hoodies", "jeans", "t-shirts"]
+    retailers = ["target", "walmart", "cvs", "walgreens", "amazon", "uniqlo", "hm", "zara"]
+
+    for i in range(count):
+        brand = rng.choice(brands)
+        subcategory = rng.choice(subcategories)
+        product = {
+            "id": f"p{i:07d}",
+            "title": f"{brand} " + " ".join(rng.choices(words, k=rng.randint(3, 7))),
+            "price": round(rng.uniform(1, 80), 2),
+            "category": "clothing" if subcategory in ("hoodies", "jeans", "t-shirts") else "personal_care",
+            "subcategory": subcategory,
+            "brand": brand,
+            "ingredients": rng.sample(ingredients, rng.randint(5, 12)),
+            "attributes": {"count": rng.randint(1, 6), "scented": rng.random() < 0.5},
+            "retailers": rng.sample(retailers, rng.randint(1, 4)),
+            "image_url": f"https://example.com/images/p{i:07d}.jpg"
+        }
+        yield f"{brand.lower()} p{i}", json.loads(json.dumps(product))
+
+
+def _resident_bytes() -> int:
+    """Current resident set size (falls back to the peak where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _synthetic_partition(count: int, side: str, clothing: bool) -> Iterator[tuple[str, dict]]:
+    """One CatalogStore partition of a synthetic side (half the catalog, seeded per side)."""
+    for key, product in synthetic_products(count // 2, seed=1 if side == "womens" else 2):
+        if (product["category"] == "clothing") == clothing:
+            product["id"] = side[0] + product["id"]
+            yield key, product
+
+
+def _synthetic_store(count: int, columnar: bool):
+    """A CatalogStore over a synthetic catalog, with its search, facet and suggest indexes built."""
+    from .catalog import CatalogStore
+
+    pool = StringPool()
+    partitions = []
+    for side, clothing in (("womens", False), ("mens", False), ("womens", True), ("mens", True)):
+        products = _synthetic_partition(count, side, clothing)
+        partitions.append(ColumnarProducts(products, pool) if columnar else dict(products))
+
+    store = CatalogStore(*partitions, [])
+    store.search_index
+    store.facet_index
+    store.suggest_index
+    return store
+
+
+def measure(representation: str, count: int, loaded: bool = False) -> dict:
+    """
+    Build a synthetic catalog in one representation and report its memory use.
+
+    Args:
+        representation: "dict" or "columnar"
+        count: Products to generate
+        loaded: Measure a whole CatalogStore (lookups, key matchers, match,
+            search, facet and suggest indexes) instead of the product storage alone
+    """
+    gc.collect()
+    before = _resident_bytes()
+    start = time.perf_counter()
+
+    if loaded:
+        products = _synthetic_store(count, representation == "columnar")
+        size = products.count_womens() + products.count_mens()
+    elif representation == "columnar":
+        products = ColumnarProducts(synthetic_products(count))
+        size = len(products)
+    else:
+        products = dict(synthetic_products(count))
+        size = len(products)
+
+    build_seconds = time.perf_counter() - start
+    gc.collect()
+    used = _resident_bytes() - before
+    # A loaded store holds two seeded halves
+    assert size == (count // 2 * 2 if loaded else count)
+
+    return {
+        "representation": representation,
+        "products": count,
+        "bytes_per_product": round(used / count),
+        "total_mb": round(used / 2**20, 1),
+        "build_seconds": round(build_seconds, 1)
+    }
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Compare product dict vs columnar memory use.")
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--loaded", action="store_true", help="Measure a whole CatalogStore with its indexes")
+    args = parser.parse_args(argv)
+
+    # Each representation is measured in a fresh process so they don't share freed memory
+    for representation in ("dict", "columnar"):
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            result = pool.submit(measure, representation, args.products, args.loaded).result()
+        print(f"{result['representation']:>8}: {result['bytes_per_product']} bytes/product "
+              f"({result['total_mb']} MB for {result['products']} products, built in {result['build_seconds']}s)")
+
+
+if __name__ == "__main__":
+    main()
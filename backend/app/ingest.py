@@ -0,0 +1,302 @@
+"""
+Streaming catalog ingestion for retailer feeds.
+
+Feeds (JSONL, or CSV with JSON or "|"-separated list columns) are streamed
+through a generator pipeline, so memory stays bounded whatever the feed size:
+
+    read -> validate -> normalize -> write in chunks
+
+Each chunk is written to the SQLite catalog in one transaction, followed by a
+checkpoint recording how many feed records are durably stored. Repeated ids
+are skipped by the catalog's unique id constraint rather than a set held in
+memory, so they are caught across chunks and earlier runs alike. An interrupted
+run picks up after the last committed chunk when started again.
+
+Usage:
+    python -m app.ingest feed.jsonl --side womens --db catalog.db
+    python -m app.ingest feed.csv --side mens --chunk-size 5000
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sqlite3
+import time
+from typing import Iterable, Iterator, Optional
+
+from pydantic import ValidationError
+
+from .models import CatalogProduct
+from .sqlite_catalog import create_schema, insert_product
+
+# CSV columns holding lists or objects: JSON text, or "|"-separated for lists
+LIST_FIELDS = frozenset({"ingredients", "materials", "available_sizes", "retailers", "matches_womens"})
+DICT_FIELDS = frozenset({"attributes", "size_chart"})
+
+# Rejected rows are reported individually up to this many, then only counted
+MAX_REPORTED_ERRORS = 20
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+class IngestStats:
+    """Running counters for one ingestion run."""
+
+    def __init__(
+        self,
+        records: int = 0,
+        inserted: int = 0,
+        duplicates: int = 0,
+        rejected: int = 0,
+        key_conflicts: int = 0
+    ):
+        self.records = records
+        self.inserted = inserted
+        self.duplicates = duplicates
+        self.rejected = rejected
+        # Inserted products whose key was taken, stored under "<key> [<id>]"
+        self.key_conflicts = key_conflicts
+
+    def to_dict(self) -> dict:
+        return {
+            "records": self.records,
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "key_conflicts": self.key_conflicts
+        }
+
+
+# =============================================================================
+# Pipeline stages
+# =============================================================================
+
+def _parse_csv_value(field: str, value: str):
+    """Decode a CSV cell into the type the product schema expects."""
+    value = value.strip()
+    if not value:
+        return None
+    if field in DICT_FIELDS or (field in LIST_FIELDS and value.startswith("[")):
+        return json.loads(value)
+    if field in LIST_FIELDS:
+        return value.split("|")
+    return value
+
+
+def read_records(path: str, skip: int = 0) -> Iterator[tuple[int, Optional[dict]]]:
+    """
+    Stream raw records from a JSONL or CSV feed.
+
+    Args:
+        path: Feed file (.csv is read as CSV, anything else as JSONL)
+        skip: Records already ingested by a previous run
+
+    Yields:
+        (record number, raw dict), with None for records that can't be parsed
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            for number, row in enumerate(csv.DictReader(f), start=1):
+                if number <= skip:
+                    continue
+                try:
+                    yield number, {field: _parse_csv_value(field, value or "") for field, value in row.items() if field}
+                except json.JSONDecodeError:
+                    yield number, None
+        else:
+            number = 0
+            for line in f:
+                if not line.strip():
+                    continue
+                number += 1
+                if number <= skip:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    yield number, None
+                    continue
+                yield number, record if isinstance(record, dict) else None
+
+
+def validate(records: Iterable[tuple[int, Optional[dict]]]) -> Iterator[tuple[int, Optional[CatalogProduct]]]:
+    """Check records against the product schema, passing None for rejected rows."""
+    reported = 0
+    for number, record in records:
+        error = None
+        if record is None:
+            error = "could not be parsed"
+        else:
+            try:
+                yield number, CatalogProduct.model_validate(record)
+                continue
+            except ValidationError as e:
+                error = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+
+        if reported < MAX_REPORTED_ERRORS:
+            print(f"Record {number}: {error}")
+            reported += 1
+        yield number, None
+
+
+def normalize_product(product: CatalogProduct) -> tuple[str, dict]:
+    """
+    Normalize a validated product into (catalog key, stored product dict).
+
+    Collapses whitespace, lowercases subcategory and retailers, drops empty
+    list entries and rounds the price to cents. The key defaults to the
+    lowercased title (see insert_product for products sharing a key).
+    """
+    data = product.model_dump(mode="json", exclude_none=True)
+    data["title"] = _WHITESPACE_RE.sub(" ", data["title"])
+    data["price"] = round(data["price"], 2)
+
+    if "subcategory" in data:
+        data["subcategory"] = data["subcategory"].lower()
+    if "retailers" in data:
+        data["retailers"] = [r.strip().lower() for r in data["retailers"] if r.strip()]
+    for field in ("ingredients", "materials", "available_sizes"):
+        if field in data:
+            data[field] = [_WHITESPACE_RE.sub(" ", item).strip() for item in data[field] if item.strip()]
+
+    key = data.pop("key", None) or data["title"].lower()
+    return key, data
+
+
+def normalize(
+    products: Iterable[tuple[int, Optional[CatalogProduct]]]
+) -> Iterator[tuple[int, Optional[tuple[str, dict]]]]:
+    """Normalize validated products, passing rejected rows through."""
+    for number, product in products:
+        yield number, normalize_product(product) if product is not None else None
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    """Group a stream into lists of at most `size` items."""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# =============================================================================
+# Checkpoints
+# =============================================================================
+
+def read_checkpoint(path: str, feed: str, side: str) -> IngestStats:
+    """Load the progress of an earlier run of the same feed, or start fresh."""
+    if not os.path.exists(path):
+        return IngestStats()
+
+    with open(path) as f:
+        checkpoint = json.load(f)
+
+    if checkpoint.get("feed") != os.path.abspath(feed) or checkpoint.get("side") != side:
+        raise ValueError(f"Checkpoint {path} belongs to another feed; delete it to start over")
+    return IngestStats(**checkpoint["stats"])
+
+
+def write_checkpoint(path: str, feed: str, side: str, stats: IngestStats):
+    """Record committed progress atomically."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"feed": os.path.abspath(feed), "side": side, "stats": stats.to_dict()}, f)
+    os.replace(tmp_path, path)
+
+
+# =============================================================================
+# Runner
+# =============================================================================
+
+def ingest(
+    feed: str,
+    side: str,
+    db_path: str,
+    chunk_size: int = 1000,
+    checkpoint_path: Optional[str] = None,
+    progress_seconds: float = 5.0
+) -> IngestStats:
+    """
+    Stream a feed into the SQLite catalog.
+
+    Args:
+        feed: JSONL or CSV feed path
+        side: "womens" or "mens"
+        db_path: SQLite catalog file (created if missing)
+        chunk_size: Records written per transaction
+        checkpoint_path: Progress file (defaults to <feed>.checkpoint)
+        progress_seconds: Minimum interval between progress lines
+
+    Returns:
+        Totals for the feed, including records from resumed runs
+    """
+    checkpoint_path = checkpoint_path or f"{feed}.checkpoint"
+    stats = read_checkpoint(checkpoint_path, feed, side)
+    if stats.records:
+        print(f"Resuming {feed} after record {stats.records}")
+
+    resumed_from = stats.records
+    start = last_report = time.perf_counter()
+
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        create_schema(conn)
+
+        pipeline = normalize(validate(read_records(feed, skip=stats.records)))
+        for chunk in chunked(pipeline, chunk_size):
+            with conn:
+                for number, item in chunk:
+                    stats.records = number
+                    if item is None:
+                        stats.rejected += 1
+                        continue
+
+                    key = insert_product(conn, side, *item)
+                    if key is None:
+                        stats.duplicates += 1
+                        continue
+                    stats.inserted += 1
+                    if key != item[0]:
+                        stats.key_conflicts += 1
+            write_checkpoint(checkpoint_path, feed, side, stats)
+
+            now = time.perf_counter()
+            if now - last_report >= progress_seconds:
+                rate = (stats.records - resumed_from) / (now - start)
+                print(f"{stats.records} records ({stats.inserted} inserted, {stats.duplicates} duplicates, "
+                      f"{stats.key_conflicts} key conflicts, {stats.rejected} rejected) - {rate:.0f} rows/s")
+                last_report = now
+    finally:
+        conn.close()
+
+    # The feed is fully ingested; a later run of the same file starts over
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    elapsed = time.perf_counter() - start
+    rate = (stats.records - resumed_from) / elapsed if elapsed > 0 else 0
+    print(f"Done: {stats.records} records ({stats.inserted} inserted, {stats.duplicates} duplicates, "
+          f"{stats.key_conflicts} key conflicts, {stats.rejected} rejected) in {elapsed:.1f}s - {rate:.0f} rows/s")
+    return stats
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Stream a JSONL/CSV product feed into the SQLite catalog.")
+    parser.add_argument("feed", help="Feed file (.jsonl or .csv)")
+    parser.add_argument("--side", required=True, choices=["womens", "mens"])
+    parser.add_argument("--db", default=os.getenv("CATALOG_SQLITE_PATH", "catalog.db"))
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Records per transaction")
+    parser.add_argument("--checkpoint", default=None, help="Progress file (default: <feed>.checkpoint)")
+    args = parser.parse_args(argv)
+
+    ingest(args.feed, args.side, args.db, args.chunk_size, args.checkpoint)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,32 +7,126 @@ FastAPI server providing:
 - Universal Fit Decoder (AI-powered size chart reading)
 - Savings tracking
 """
+import asyncio
+import json
 import os
+import secrets
+import time
+from typing import Optional
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
 
 from .models import (
-    ProductMatchRequest, SizeMatchRequest, MatchResponse, SizeResponse,
-    SavingsStats, ProductCategory, UserMeasurements
+    ProductMatchRequest, SizeMatchRequest, MatchResponse, BatchMatchResponse,
+    SizeResponse, SizeJobResponse, SizeRecommendation, SavingsStats, ProductCategory, UserMeasurements,
+    ProductMatch
 )
-from .services.matching import find_mens_equivalent, search_products_by_title
-from .services.sizing import get_size_recommendation, find_mens_clothing_equivalent
-from .mock_data import get_all_womens_products, get_all_mens_products, GOLDEN_PAIRS
+from .services import http_client, matching, sizing
+from .services.matching import (
+    find_mens_equivalents_batch, find_mens_equivalents_shared, search_products_by_title
+)
+from .services.ocr_jobs import DONE, OcrJob, OcrJobQueue, QueueFullError
+from .services.sizing import cached_size_chart, get_size_recommendation, find_mens_clothing_equivalent
+from .services.suggest import MAX_SUGGESTIONS
+from .services.text import normalize_retailer
+from .catalog import CatalogRepository, catalog_sources, get_catalog, reload_catalog
 
 # Load environment variables
 load_dotenv()
 
+# Upper bound on items per batch match request
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", 100))
+
+# Page size for catalog listings (NDJSON streams aren't capped)
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", 100))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 1000))
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Seconds between catalog file checks; 0 disables the watcher
+CATALOG_WATCH_INTERVAL = float(os.getenv("CATALOG_WATCH_INTERVAL", 0))
+
+# Required in the X-Admin-Token header of admin endpoints; unset disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Background size chart OCR: concurrent jobs, jobs allowed to wait, seconds results are kept
+OCR_JOBS = OcrJobQueue(
+    workers=int(os.getenv("OCR_WORKERS", 4)),
+    maxsize=int(os.getenv("OCR_QUEUE_SIZE", 100)),
+    ttl=float(os.getenv("OCR_JOB_TTL", 600))
+)
+
+# Longest a job poll may wait for the result (long polling)
+MAX_JOB_WAIT = float(os.getenv("MAX_JOB_WAIT", 30))
+
+
+def _log_catalog(catalog: CatalogRepository):
+    print(f"Catalog version {catalog.version}: {catalog.count_womens()} women's products, "
+          f"{catalog.count_mens()} men's products, {len(catalog.golden_pairs)} pre-verified pairs, "
+          f"precomputed matches for {len(catalog.match_table)} women's products")
+
+
+def _source_signature() -> tuple:
+    """(path, mtime, size) of each catalog source file, to notice rewrites."""
+    signature = []
+    for path in catalog_sources():
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+
+async def watch_catalog(interval: float):
+    """
+    Reload the catalog when its source files change.
+
+    A change is only acted on once the files have stayed the same for a full
+    interval, so a snapshot or database still being written isn't loaded
+    half-finished. A failed reload keeps serving the current catalog.
+    """
+    loaded = _source_signature()
+    pending = None
+    while True:
+        await asyncio.sleep(interval)
+        signature = _source_signature()
+        if signature == loaded:
+            pending = None
+            continue
+        if signature != pending:
+            pending = signature
+            continue
+
+        try:
+            catalog = await asyncio.to_thread(reload_catalog)
+            _log_catalog(catalog)
+        except Exception as e:
+            print(f"Catalog reload failed, keeping version {get_catalog().version}: {e}")
+        loaded, pending = signature, None
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler."""
     print("PinkVanity API starting up...")
-    print(f"Loaded {len(get_all_womens_products())} women's products")
-    print(f"Loaded {len(get_all_mens_products())} men's products")
-    print(f"Loaded {len(GOLDEN_PAIRS)} pre-verified pairs")
+    _log_catalog(get_catalog())
+    await http_client.open_client()
+    OCR_JOBS.start()
+
+    watcher = None
+    if CATALOG_WATCH_INTERVAL > 0:
+        watcher = asyncio.create_task(watch_catalog(CATALOG_WATCH_INTERVAL))
+        print(f"Watching catalog files every {CATALOG_WATCH_INTERVAL:g}s: {', '.join(catalog_sources()) or 'none'}")
     yield
+    if watcher:
+        watcher.cancel()
+    await OCR_JOBS.stop()
+    sizing.CHART_CACHE.close()
+    await http_client.close_client()
     print("PinkVanity API shutting down...")
 
 
@@ -76,11 +170,21 @@ async def root():
 @app.get("/health", tags=["Health"])
 async def health_check():
     """Detailed health check."""
+    catalog = get_catalog()
     return {
         "status": "healthy",
-        "womens_products_loaded": len(get_all_womens_products()),
-        "mens_products_loaded": len(get_all_mens_products()),
-        "golden_pairs_loaded": len(GOLDEN_PAIRS),
+        "womens_products_loaded": catalog.count_womens(),
+        "mens_products_loaded": catalog.count_mens(),
+        "golden_pairs_loaded": len(catalog.golden_pairs),
+        "precomputed_matches_loaded": len(catalog.match_table),
+        "catalog_version": catalog.version,
+        "match_cache": matching.MATCH_CACHE.stats(),
+        "chart_cache": sizing.CHART_CACHE.stats(),
+        "ocr_jobs": OCR_JOBS.stats(),
+        "single_flight": {
+            "size_chart": sizing.CHART_FLIGHTS.stats(),
+            "match": matching.MATCH_FLIGHTS.stats()
+        },
         "openai_configured": bool(os.getenv("OPENAI_API_KEY"))
     }
 
@@ -89,6 +193,36 @@ async def health_check():
 # Pink Tax Matching API (Feature A)
 # =============================================================================
 
+def _match_response(
+    title: str,
+    price: float,
+    matches: list[ProductMatch],
+    not_found_message: str,
+    catalog_version: Optional[int] = None
+) -> MatchResponse:
+    """Wrap ranked match results (or lack of them) in the API response."""
+    if matches:
+        match = matches[0]
+        return MatchResponse(
+            found_match=True,
+            original_product=title,
+            original_price=price,
+            match=match,
+            matches=matches,
+            message=f"Found equivalent! Save ${match.savings_amount:.2f} ({match.savings_percent:.0f}%)",
+            catalog_version=catalog_version
+        )
+    else:
+        return MatchResponse(
+            found_match=False,
+            original_product=title,
+            original_price=price,
+            match=None,
+            message=not_found_message,
+            catalog_version=catalog_version
+        )
+
+
 @app.post("/api/v1/match", response_model=MatchResponse, tags=["Pink Tax"])
 async def find_product_match(request: ProductMatchRequest):
     """
@@ -102,34 +236,64 @@ async def find_product_match(request: ProductMatchRequest):
     - Input: "Gillette Venus Razor" at $15.99
     - Output: "Gillette Fusion5" at $11.99 (25% savings)
     """
-    match = find_mens_equivalent(
+    catalog = get_catalog()
+    matches = await find_mens_equivalents_shared(
         womens_title=request.title,
         womens_price=request.price,
         category=request.category,
         ingredients=request.ingredients,
-        brand=request.brand
+        brand=request.brand,
+        k=request.k,
+        catalog=catalog,
+        retailer=request.retailer,
+        any_retailer=request.any_retailer
     )
 
-    if match:
-        return MatchResponse(
-            found_match=True,
-            original_product=request.title,
-            original_price=request.price,
-            match=match,
-            message=f"Found equivalent! Save ${match.savings_amount:.2f} ({match.savings_percent:.0f}%)"
+    return _match_response(
+        request.title, request.price, matches,
+        "No cheaper men's equivalent found for this product.",
+        catalog.version
+    )
+
+
+@app.post("/api/v1/match/batch", response_model=BatchMatchResponse, tags=["Pink Tax"])
+async def find_product_matches_batch(requests: list[ProductMatchRequest]):
+    """
+    Find men's equivalents for a list of women's products in one round trip.
+
+    Intended for category and search pages that show many products at once.
+    Returns one result per item, in the same order as the request.
+    """
+    if len(requests) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch too large: {len(requests)} items (max {MAX_BATCH_SIZE})"
         )
-    else:
-        return MatchResponse(
-            found_match=False,
-            original_product=request.title,
-            original_price=request.price,
-            match=None,
-            message="No cheaper men's equivalent found for this product."
+
+    catalog = get_catalog()
+    # Scoring up to MAX_BATCH_SIZE items is CPU-bound: keep it off the event loop
+    batch_matches = await asyncio.to_thread(find_mens_equivalents_batch, requests, catalog)
+    results = [
+        _match_response(
+            request.title, request.price, matches,
+            "No cheaper men's equivalent found for this product.",
+            catalog.version
         )
+        for request, matches in zip(requests, batch_matches)
+    ]
+
+    return BatchMatchResponse(count=len(results), results=results, catalog_version=catalog.version)
 
 
 @app.get("/api/v1/match/quick", response_model=MatchResponse, tags=["Pink Tax"])
-async def quick_match(title: str, price: float, category: str = "personal_care"):
+async def quick_match(
+    title: str,
+    price: float,
+    category: str = "personal_care",
+    k: int = Query(1, ge=1, le=10),
+    retailer: Optional[str] = None,
+    any_retailer: bool = False
+):
     """
     Quick match endpoint using query parameters.
 
@@ -140,28 +304,18 @@ async def quick_match(title: str, price: float, category: str = "personal_care")
     except ValueError:
         cat = ProductCategory.PERSONAL_CARE
 
-    match = find_mens_equivalent(
+    catalog = get_catalog()
+    matches = await find_mens_equivalents_shared(
         womens_title=title,
         womens_price=price,
-        category=cat
+        category=cat,
+        k=k,
+        catalog=catalog,
+        retailer=retailer,
+        any_retailer=any_retailer
     )
 
-    if match:
-        return MatchResponse(
-            found_match=True,
-            original_product=title,
-            original_price=price,
-            match=match,
-            message=f"Found equivalent! Save ${match.savings_amount:.2f} ({match.savings_percent:.0f}%)"
-        )
-    else:
-        return MatchResponse(
-            found_match=False,
-            original_product=title,
-            original_price=price,
-            match=None,
-            message="No cheaper men's equivalent found."
-        )
+    return _match_response(title, price, matches, "No cheaper men's equivalent found.", catalog.version)
 
 
 # =============================================================================
@@ -185,7 +339,11 @@ async def get_size(request: SizeMatchRequest):
         size_chart_url=request.size_chart_url,
         size_chart_data=request.size_chart_data
     )
+    return _size_response(recommendation)
 
+
+def _size_response(recommendation: Optional[SizeRecommendation]) -> SizeResponse:
+    """Wrap a size recommendation (or lack of one) in the API response."""
     if recommendation:
         return SizeResponse(
             found_recommendation=True,
@@ -200,6 +358,65 @@ async def get_size(request: SizeMatchRequest):
         )
 
 
+def _job_response(job: OcrJob) -> SizeJobResponse:
+    """Report a size job's state, with the size response once it is done."""
+    return SizeJobResponse(
+        job_id=job.id,
+        status=job.status,
+        result=_size_response(job.recommendation) if job.status == DONE else None,
+        error=job.error
+    )
+
+
+@app.post("/api/v1/size/jobs", response_model=SizeJobResponse, tags=["Sizing"])
+async def submit_size_job(request: SizeMatchRequest, response: Response):
+    """
+    Get a size recommendation without holding the request open for OCR.
+
+    Pre-parsed and already-read size charts are answered at once (200,
+    status "done", no job id). A chart that needs GPT-4o OCR is queued
+    (202): poll `/api/v1/size/jobs/{job_id}` for the result. Returns 503
+    when the OCR queue is full.
+    """
+    needs_ocr = bool(
+        request.size_chart_url and not request.size_chart_data
+        and await cached_size_chart(request.size_chart_url) is None
+    )
+    if not needs_ocr:
+        recommendation = await get_size_recommendation(
+            product_title=request.product_title,
+            user_measurements=request.user_measurements,
+            size_chart_url=request.size_chart_url,
+            size_chart_data=request.size_chart_data
+        )
+        return SizeJobResponse(status=DONE, result=_size_response(recommendation))
+
+    try:
+        job = OCR_JOBS.submit(request)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+    response.status_code = 202
+    return _job_response(job)
+
+
+@app.get("/api/v1/size/jobs/{job_id}", response_model=SizeJobResponse, tags=["Sizing"])
+async def get_size_job(job_id: str, wait: float = Query(0, ge=0)):
+    """
+    Poll a size job.
+
+    Pass `wait` (seconds, capped at MAX_JOB_WAIT) to long-poll: the request
+    returns as soon as the job finishes, or with its current status when
+    the wait runs out.
+    """
+    job = OCR_JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired size job")
+
+    await OCR_JOBS.wait(job, min(wait, MAX_JOB_WAIT))
+    return _job_response(job)
+
+
 @app.post("/api/v1/clothing/match", tags=["Sizing"])
 async def match_clothing_with_size(
     womens_product_title: str,
@@ -224,9 +441,11 @@ async def match_clothing_with_size(
         chest_inches=chest
     )
 
-    mens_product, size_rec = find_mens_clothing_equivalent(
+    catalog = get_catalog()
+    womens_product, mens_product, size_rec = await find_mens_clothing_equivalent(
         womens_product_title,
-        measurements
+        measurements,
+        catalog
     )
 
     if not mens_product:
@@ -235,10 +454,7 @@ async def match_clothing_with_size(
             detail="No men's equivalent found for this clothing item"
         )
 
-    # Get women's product for comparison
-    from .mock_data import WOMENS_CLOTHING, find_matching_key
-    womens_key = find_matching_key(womens_product_title, WOMENS_CLOTHING)
-    womens_product = WOMENS_CLOTHING.get(womens_key, {})
+    # The women's product the match was found from, for comparison
     womens_price = womens_product.get("price", 0)
 
     savings = womens_price - mens_product["price"] if womens_price else 0
@@ -259,7 +475,8 @@ async def match_clothing_with_size(
             "fit_notes": size_rec.fit_notes if size_rec else [],
             "measurements": size_rec.measurements_comparison if size_rec else {}
         },
-        "message": f"Buy Men's {size_rec.recommended_size if size_rec else 'Unknown'} - Save ${savings:.2f}!"
+        "message": f"Buy Men's {size_rec.recommended_size if size_rec else 'Unknown'} - Save ${savings:.2f}!",
+        "catalog_version": catalog.version
     }
 
 
@@ -267,48 +484,185 @@ async def match_clothing_with_size(
 # Product Catalog API
 # =============================================================================
 
-@app.get("/api/v1/products/womens", tags=["Catalog"])
-async def list_womens_products(category: str = None):
-    """List all women's products in the database."""
-    products = get_all_womens_products()
+def _ndjson_stream(pages):
+    """Encode product pages as NDJSON, one chunk per page."""
+    for page in pages:
+        yield "".join(json.dumps(dict(product)) + "\n" for product in page)
+
+
+def _facet_filters(
+    category: Optional[str],
+    subcategory: Optional[list[str]],
+    brand: Optional[list[str]],
+    retailer: Optional[list[str]],
+    price_band: Optional[list[str]]
+) -> dict[str, list[str]]:
+    """Collect facet query params into FacetIndex filters, dropping unset facets."""
+    filters = {
+        "category": [category] if category else [],
+        "subcategory": subcategory or [],
+        "brand": brand or [],
+        "retailer": [normalize_retailer(r) for r in retailer or []],
+        "price_band": price_band or []
+    }
+    return {facet: values for facet, values in filters.items() if values}
 
-    if category:
-        products = {k: v for k, v in products.items() if v.get("category") == category}
 
-    return {
-        "count": len(products),
-        "products": list(products.values())
-    }
+# Catalog reads can block on SQLite queries or index builds, so the listing,
+# search and suggest endpoints are plain `def`s that FastAPI runs in its threadpool
 
+def _product_listing(
+    side: str,
+    filters: dict[str, list[str]],
+    limit: Optional[int],
+    cursor: Optional[str],
+    accept: Optional[str]
+):
+    """
+    Page through one side of the catalog in product id order.
 
-@app.get("/api/v1/products/mens", tags=["Catalog"])
-async def list_mens_products(category: str = None):
-    """List all men's products in the database."""
-    products = get_all_mens_products()
+    The cursor is the id of the last product already seen. With
+    `Accept: application/x-ndjson` products are streamed one per line from
+    the cursor to the end (or `limit`), a bounded page at a time.
 
-    if category:
-        products = {k: v for k, v in products.items() if v.get("category") == category}
+    The first page of a JSON listing also carries facet counts for the side.
+    """
+    catalog = get_catalog()
+    category = filters["category"][0] if "category" in filters else None
+    # A bare category listing is served by the backend's own listing index
+    faceted = any(facet != "category" for facet in filters)
+
+    if accept and NDJSON_MEDIA_TYPE in accept:
+        return StreamingResponse(
+            _ndjson_stream(catalog.iter_pages(side, category, cursor, limit, filters if faceted else None)),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers={"X-Catalog-Version": str(catalog.version)}
+        )
 
-    return {
-        "count": len(products),
-        "products": list(products.values())
+    limit = min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    # One extra product tells whether another page follows
+    if faceted:
+        products = catalog.filtered_page(side, filters, cursor, limit + 1)
+    else:
+        products = catalog.list_page(side, category, cursor, limit + 1)
+    page = products[:limit]
+
+    response = {
+        "catalog_version": catalog.version,
+        "count": len(page),
+        "products": page,
+        "next_cursor": page[-1]["id"] if len(products) > limit else None
     }
+    if cursor is None:
+        facets = catalog.facet_index
+        response["facets"] = facets.counts(facets.side_bitsets[side], filters, side)
+    return response
+
+
+@app.get("/api/v1/products/womens", tags=["Catalog"])
+def list_womens_products(
+    category: str = None,
+    subcategory: Optional[list[str]] = Query(None),
+    brand: Optional[list[str]] = Query(None),
+    retailer: Optional[list[str]] = Query(None),
+    price_band: Optional[list[str]] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    accept: Optional[str] = Header(None)
+):
+    """
+    List women's products in product id order, a page at a time.
+
+    Facet params can be repeated to accept any of several values, e.g.
+    `?brand=Dove&brand=Nivea&price_band=under-10`. Pass `next_cursor` from
+    the previous page as `cursor` to continue.
+    """
+    filters = _facet_filters(category, subcategory, brand, retailer, price_band)
+    return _product_listing("womens", filters, limit, cursor, accept)
+
+
+@app.get("/api/v1/products/mens", tags=["Catalog"])
+def list_mens_products(
+    category: str = None,
+    subcategory: Optional[list[str]] = Query(None),
+    brand: Optional[list[str]] = Query(None),
+    retailer: Optional[list[str]] = Query(None),
+    price_band: Optional[list[str]] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    accept: Optional[str] = Header(None)
+):
+    """
+    List men's products in product id order, a page at a time.
+
+    Facet params can be repeated to accept any of several values, e.g.
+    `?brand=Dove&brand=Nivea&price_band=under-10`. Pass `next_cursor` from
+    the previous page as `cursor` to continue.
+    """
+    filters = _facet_filters(category, subcategory, brand, retailer, price_band)
+    return _product_listing("mens", filters, limit, cursor, accept)
 
 
 @app.get("/api/v1/products/search", tags=["Catalog"])
-async def search_products(q: str, category: str = None):
-    """Search products by title."""
+def search_products(
+    q: str,
+    category: str = None,
+    subcategory: Optional[list[str]] = Query(None),
+    brand: Optional[list[str]] = Query(None),
+    retailer: Optional[list[str]] = Query(None),
+    price_band: Optional[list[str]] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0)
+):
+    """
+    Search products by title, brand, subcategory and ingredients, best match first.
+
+    Accepts the same repeatable facet filters as the listings, and returns
+    facet counts over every product matching the query.
+    """
     try:
         cat = ProductCategory(category) if category else None
     except ValueError:
         cat = None
 
-    results = search_products_by_title(q, cat)
+    catalog = get_catalog()
+    # Search only narrows to the clothing and personal care categories
+    searched = cat.value if cat in (ProductCategory.CLOTHING, ProductCategory.PERSONAL_CARE) else None
+    filters = _facet_filters(searched, subcategory, brand, retailer, price_band)
+    total, results = search_products_by_title(q, cat, catalog, limit, offset, filters)
+
+    facets = catalog.facet_index
+    matches = facets.bitset_of(catalog.search_index.matches(q))
 
     return {
+        "catalog_version": catalog.version,
         "query": q,
+        "total": total,
+        "offset": offset,
         "count": len(results),
-        "results": results
+        "results": results,
+        "facets": facets.counts(matches, filters)
+    }
+
+
+@app.get("/api/v1/products/suggest", tags=["Catalog"])
+def suggest_products(
+    prefix: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=MAX_SUGGESTIONS)
+):
+    """
+    Typeahead suggestions for products whose title words or brand start with `prefix`.
+
+    Ranked by the savings a product is known to offer, then by title.
+    """
+    catalog = get_catalog()
+    suggestions = catalog.suggest_index.suggest(prefix, limit)
+
+    return {
+        "catalog_version": catalog.version,
+        "prefix": prefix,
+        "count": len(suggestions),
+        "suggestions": [suggestion.to_dict() for suggestion in suggestions]
     }
 
 
@@ -320,9 +674,49 @@ async def list_golden_pairs():
     These are the "Golden Examples" with manually verified
     similarity scores and match reasons.
     """
+    catalog = get_catalog()
+    return {
+        "catalog_version": catalog.version,
+        "count": len(catalog.golden_pairs),
+        "pairs": catalog.golden_pairs
+    }
+
+
+# =============================================================================
+# Admin API
+# =============================================================================
+
+@app.post("/api/v1/admin/catalog/reload", tags=["Admin"])
+async def reload_catalog_endpoint(x_admin_token: Optional[str] = Header(None)):
+    """
+    Build a new catalog version from the configured backend and switch to it.
+
+    Requests already in flight finish against the previous version. If the
+    build fails, the previous version keeps serving. Disabled (404) unless
+    ADMIN_TOKEN is set.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not secrets.compare_digest((x_admin_token or "").encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+    previous = get_catalog()
+    start = time.perf_counter()
+    try:
+        catalog = await asyncio.to_thread(reload_catalog)
+    except Exception as e:
+        print(f"Catalog reload failed, keeping version {previous.version}: {e}")
+        raise HTTPException(status_code=500, detail="Catalog reload failed")
+    _log_catalog(catalog)
+
     return {
-        "count": len(GOLDEN_PAIRS),
-        "pairs": GOLDEN_PAIRS
+        "reloaded": True,
+        "catalog_version": catalog.version,
+        "previous_version": previous.version,
+        "womens_products_loaded": catalog.count_womens(),
+        "mens_products_loaded": catalog.count_mens(),
+        "precomputed_matches_loaded": len(catalog.match_table),
+        "elapsed_seconds": round(time.perf_counter() - start, 3)
     }
 
 
@@ -4,6 +4,8 @@ Mock Product Database for PinkVanity Demo.
 This contains the "Golden Examples" and additional demo data for hackathon presentation.
 In production, this would be replaced by Supabase queries.
 """
+from .services.automaton import get_key_matcher
+
 
 # =============================================================================
 # PERSONAL CARE PRODUCTS - Pink Tax Examples
@@ -591,31 +593,15 @@ def find_matching_key(title: str, products_dict: dict) -> str | None:
         The matching key if found, None otherwise
     """
     title_lower = title.lower()
+    matcher = get_key_matcher(products_dict)
 
-    # First try exact key match
-    for key in products_dict:
-        if key in title_lower or title_lower in key:
-            return key
-
-    # Then try matching against product titles
-    for key, product in products_dict.items():
-        product_title = product.get("title", "").lower()
-        if title_lower in product_title or product_title in title_lower:
-            return key
+    # First try exact key match, then matching against product titles
+    key_match, title_match = matcher.first_substring(title_lower)
+    if key_match is not None:
+        return matcher.keys[key_match]
+    if title_match is not None:
+        return matcher.keys[title_match]
 
     # Try word overlap for partial matches
-    title_words = set(title_lower.split())
-    best_match = None
-    best_score = 0
-
-    for key, product in products_dict.items():
-        key_words = set(key.split())
-        product_words = set(product.get("title", "").lower().split())
-        all_words = key_words | product_words
-
-        overlap = len(title_words & all_words)
-        if overlap > best_score and overlap >= 2:
-            best_score = overlap
-            best_match = key
-
-    return best_match
+    best_match = matcher.best_word_overlap(title_lower)
+    return matcher.keys[best_match] if best_match is not None else None
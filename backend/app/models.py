@@ -1,5 +1,5 @@
 """Pydantic models for PinkVanity API."""
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional
 from enum import Enum
 
@@ -25,7 +25,9 @@ class ProductMatchRequest(BaseModel):
     category: ProductCategory = Field(..., description="Product category")
     ingredients: Optional[list[str]] = Field(None, description="List of ingredients/materials")
     brand: Optional[str] = Field(None, description="Product brand")
-    retailer: Optional[str] = Field(None, description="Retailer name (e.g., Target, Uniqlo)")
+    retailer: Optional[str] = Field(None, description="Only match products sold at this retailer (e.g., Target, Uniqlo)")
+    any_retailer: bool = Field(False, description="Match at any retailer if this one sells no cheaper equivalent")
+    k: int = Field(1, ge=1, le=10, description="Number of ranked equivalents to return")
 
 
 class SizeMatchRequest(BaseModel):
@@ -46,6 +48,7 @@ class ProductMatch(BaseModel):
     match_reasons: list[str]
     product_url: Optional[str] = None
     image_url: Optional[str] = None
+    retailers: Optional[list[str]] = Field(default=None, description="Retailers selling the men's product")
 
 
 class SizeRecommendation(BaseModel):
@@ -61,7 +64,16 @@ class MatchResponse(BaseModel):
     original_product: str
     original_price: float
     match: Optional[ProductMatch] = None
+    matches: list[ProductMatch] = Field(default_factory=list, description="Top-k equivalents, best first")
     message: str
+    catalog_version: Optional[int] = Field(default=None, description="Catalog snapshot the matches came from")
+
+
+class BatchMatchResponse(BaseModel):
+    """Response for a batch of product match requests, in request order."""
+    count: int
+    results: list[MatchResponse]
+    catalog_version: Optional[int] = None
 
 
 class SizeResponse(BaseModel):
@@ -71,9 +83,38 @@ class SizeResponse(BaseModel):
     message: str
 
 
+class SizeJobResponse(BaseModel):
+    """State of a size request answered in the background."""
+    job_id: Optional[str] = Field(default=None, description="Poll /api/v1/size/jobs/{job_id}; None if answered at once")
+    status: str = Field(..., description="queued, running, done or failed")
+    result: Optional[SizeResponse] = None
+    error: Optional[str] = None
+
+
 class SavingsStats(BaseModel):
     """User's lifetime savings statistics."""
     total_saved: float
     total_transactions: int
     avg_savings_percent: float
     top_categories: list[dict]
+
+
+class CatalogProduct(BaseModel):
+    """A product row from a catalog feed, as accepted by the ingestion pipeline."""
+    model_config = ConfigDict(str_strip_whitespace=True)
+
+    id: str = Field(..., min_length=1, description="Stable product id")
+    title: str = Field(..., min_length=1, description="Product title")
+    price: float = Field(..., gt=0, description="Product price")
+    category: ProductCategory = Field(..., description="Product category")
+    subcategory: Optional[str] = Field(None, description="Product subcategory (e.g., razors, hoodies)")
+    key: Optional[str] = Field(None, description="Catalog key (defaults to the normalized title)")
+    brand: Optional[str] = None
+    ingredients: Optional[list[str]] = Field(None, description="Personal care ingredients")
+    materials: Optional[list[str]] = Field(None, description="Clothing materials")
+    attributes: Optional[dict] = None
+    size_chart: Optional[dict[str, dict[str, float]]] = None
+    available_sizes: Optional[list[str]] = None
+    retailers: Optional[list[str]] = None
+    image_url: Optional[str] = None
+    matches_womens: Optional[list[str]] = None
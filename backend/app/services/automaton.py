@@ -0,0 +1,242 @@
+"""
+Aho-Corasick key resolution for find_matching_key.
+
+A product title is resolved to a catalog key by checking which catalog keys
+and product titles occur inside it. Instead of running `key in title` for
+every key, a multi-pattern automaton built once per catalog finds every
+occurrence in a single pass over the input, so resolution costs O(len(title))
+regardless of catalog size.
+
+The reverse direction (the input occurring inside a key or title) is served
+from trigram postings over the patterns: only patterns sharing the input's
+rarest trigram are checked, in ordinal order, stopping at the first hit.
+Inputs shorter than a trigram are answered from a table of the first pattern
+containing each one- and two-character string.
+"""
+import threading
+from array import array
+from collections import Counter, deque
+from typing import Iterable, Optional
+from .text import tokenize_title
+
+# Automaton channels: catalog keys and lowercased product titles
+KEYS = 0
+TITLES = 1
+
+# Substring length indexed for reverse containment; shorter inputs use a lookup table
+_GRAM = 3
+
+
+class AhoCorasick:
+    """
+    Multi-pattern substring automaton.
+
+    Patterns are added with a channel and a rank; first() reports, per channel,
+    the lowest rank of any pattern that occurs in the text.
+
+    Nodes are numbered in creation order; goto, fail and ranks are per node
+    (snapshot.py writes them out as flat arrays).
+    """
+
+    def __init__(self, patterns: Iterable[tuple[str, int, int]], channels: int = 2):
+        self.channels = channels
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        # Lowest rank per channel of any pattern ending at the node or one of its suffixes
+        self.ranks: list[list[Optional[int]]] = [[None] * channels]
+
+        for pattern, channel, rank in patterns:
+            node = 0
+            for char in pattern:
+                next_node = self.goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self.goto)
+                    self.goto[node][char] = next_node
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.ranks.append([None] * channels)
+                node = next_node
+            self.ranks[node][channel] = _min_rank(self.ranks[node][channel], rank)
+
+        # Breadth-first failure links; each node inherits the best ranks of its suffixes
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                if node:
+                    fail = self.fail[node]
+                    while fail and char not in self.goto[fail]:
+                        fail = self.fail[fail]
+                    self.fail[child] = self.goto[fail].get(char, 0)
+                for channel in range(channels):
+                    self.ranks[child][channel] = _min_rank(
+                        self.ranks[child][channel], self.ranks[self.fail[child]][channel]
+                    )
+                queue.append(child)
+
+    def first(self, text: str) -> list[Optional[int]]:
+        """Get the lowest rank of any pattern occurring in the text, per channel."""
+        best = list(self.ranks[0])
+        node = 0
+        for char in text:
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for channel, rank in enumerate(self.ranks[node]):
+                best[channel] = _min_rank(best[channel], rank)
+        return best
+
+
+def _min_rank(a: Optional[int], b: Optional[int]) -> Optional[int]:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a, b)
+
+
+class KeyMatcher:
+    """Precomputed key resolution structures for one product dictionary."""
+
+    def __init__(self, products: dict):
+        self.products = products
+        self.size = len(products)
+        self.keys = list(products.keys())
+        self.titles = [product.get("title", "").lower() for product in products.values()]
+
+        patterns = [(key, KEYS, ordinal) for ordinal, key in enumerate(self.keys)]
+        patterns += [(title, TITLES, ordinal) for ordinal, title in enumerate(self.titles)]
+        self.automaton = AhoCorasick(patterns)
+
+        # Reverse containment (input inside a key/title): trigram postings in ordinal order,
+        # plus the first pattern containing each shorter string
+        self.gram_postings: dict[int, dict[str, array]] = {}
+        self.first_short: dict[int, dict[str, int]] = {}
+        for channel, patterns in ((KEYS, self.keys), (TITLES, self.titles)):
+            postings: dict[str, array] = {}
+            first_short: dict[str, int] = {}
+            for ordinal, pattern in enumerate(patterns):
+                for gram in {pattern[i:i + _GRAM] for i in range(len(pattern) - _GRAM + 1)}:
+                    posting = postings.get(gram)
+                    if posting is None:
+                        posting = postings[gram] = array("I")
+                    posting.append(ordinal)
+                for n in range(_GRAM):
+                    for i in range(len(pattern) - n + 1):
+                        first_short.setdefault(pattern[i:i + n], ordinal)
+            self.gram_postings[channel] = postings
+            self.first_short[channel] = first_short
+
+        # Whitespace-word postings over key + title words (mock_data word overlap)
+        self.word_postings: dict[str, list[int]] = {}
+        for ordinal, (key, title) in enumerate(zip(self.keys, self.titles)):
+            for word in set(key.split()) | set(title.split()):
+                self.word_postings.setdefault(word, []).append(ordinal)
+
+        # Title token postings and token counts (matching.title_similarity word overlap)
+        self.token_postings: dict[str, list[int]] = {}
+        self.title_token_counts = array("I")
+        for ordinal, (key, product) in enumerate(products.items()):
+            tokens = tokenize_title(product.get("title", key))
+            self.title_token_counts.append(len(tokens))
+            for token in tokens:
+                self.token_postings.setdefault(token, []).append(ordinal)
+
+    def _first_containing(self, channel: int, text: str, limit: Optional[int]) -> Optional[int]:
+        """Lowest ordinal below `limit` whose pattern contains the text."""
+        if len(text) < _GRAM:
+            return _min_rank(limit, self.first_short[channel].get(text))
+
+        postings = self.gram_postings[channel]
+        rarest = None
+        for i in range(len(text) - _GRAM + 1):
+            posting = postings.get(text[i:i + _GRAM])
+            if posting is None:
+                return limit
+            if rarest is None or len(posting) < len(rarest):
+                rarest = posting
+
+        patterns = self.keys if channel == KEYS else self.titles
+        for ordinal in rarest:
+            if limit is not None and ordinal >= limit:
+                break
+            if text in patterns[ordinal]:
+                return ordinal
+        return limit
+
+    def first_substring(self, title_lower: str) -> tuple[Optional[int], Optional[int]]:
+        """
+        Find the first key and the first title that contain, or are contained by, the input.
+
+        Returns:
+            (key ordinal, title ordinal), each None if nothing matched
+        """
+        found = self.automaton.first(title_lower)
+        return (
+            self._first_containing(KEYS, title_lower, found[KEYS]),
+            self._first_containing(TITLES, title_lower, found[TITLES])
+        )
+
+    def best_word_overlap(self, title_lower: str) -> Optional[int]:
+        """First product sharing the most (at least 2) whitespace words with the input."""
+        counts = Counter()
+        for word in set(title_lower.split()):
+            counts.update(self.word_postings.get(word, ()))
+
+        best_match = None
+        best_score = 0
+        for ordinal, overlap in counts.items():
+            if overlap >= 2 and (overlap > best_score or (overlap == best_score and ordinal < best_match)):
+                best_score = overlap
+                best_match = ordinal
+        return best_match
+
+    def best_title_similarity(self, title: str, min_score: float = 0.3) -> Optional[int]:
+        """First product whose title Jaccard similarity with the input is highest (above min_score)."""
+        tokens = tokenize_title(title)
+        counts = Counter()
+        for token in tokens:
+            counts.update(self.token_postings.get(token, ()))
+
+        best_match = None
+        best_score = 0
+        for ordinal, shared in counts.items():
+            score = shared / (len(tokens) + self.title_token_counts[ordinal] - shared)
+            if score > min_score and (score > best_score or (score == best_score and ordinal < best_match)):
+                best_score = score
+                best_match = ordinal
+        return best_match
+
+
+# Matchers for plain dicts, rebuilt when a dict is replaced; bounded so retired catalogs are released
+_MAX_MATCHERS = 16
+_matchers: dict[int, KeyMatcher] = {}
+
+# Serializes builds and evictions (lookups run in worker threads); hits don't take it
+_matchers_lock = threading.Lock()
+
+
+def _current(matcher: Optional[KeyMatcher], products: dict) -> bool:
+    return matcher is not None and matcher.products is products and matcher.size == len(products)
+
+
+def get_key_matcher(products: dict) -> KeyMatcher:
+    """Get (building on first use) the key matcher for a product dictionary."""
+    # Snapshot partitions carry a matcher mapped from the file, other mappings the one built for them
+    matcher = getattr(products, "key_matcher", None) or _matchers.get(id(products))
+    if _current(matcher, products):
+        return matcher
+
+    with _matchers_lock:
+        matcher = getattr(products, "key_matcher", None) or _matchers.get(id(products))
+        if not _current(matcher, products):
+            matcher = KeyMatcher(products)
+            if isinstance(products, dict):
+                if len(_matchers) >= _MAX_MATCHERS:
+                    _matchers.pop(next(iter(_matchers)))
+                _matchers[id(products)] = matcher
+            else:
+                # Catalog-owned mappings (SQLite, columnar) keep their matcher, so the
+                # cache doesn't hold a replaced catalog and its open files alive
+                products.key_matcher = matcher
+    return matcher
@@ -0,0 +1,99 @@
+"""
+In-process LRU cache with per-entry TTL and catalog-version invalidation.
+
+Used in front of the matching engine so that revisits and SPA re-renders of
+the same product page don't recompute matches from scratch.
+
+Catalog versions only ever increase. A newer version clears the cache; a
+request still running against an older catalog after a reload neither reads
+nor writes entries, so it can't thrash or poison the cache.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version: Optional[int] = None
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_version(self, version: Optional[int]) -> bool:
+        """Move to a newer catalog version; False if `version` is already superseded."""
+        if version is None or version == self.version:
+            return True
+        if self.version is not None and version < self.version:
+            return False
+
+        # Entries computed against an older catalog version are all stale
+        if self._data:
+            self.invalidations += 1
+        self._data.clear()
+        self.version = version
+        return True
+
+    def get(self, key: Hashable, version: Optional[int] = None) -> Optional[Any]:
+        """Get a cached value, or None on a miss."""
+        with self._lock:
+            entry = self._data.get(key) if self._check_version(version) else None
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, version: Optional[int] = None, ttl: Optional[float] = None):
+        """Cache a value (for `ttl` seconds if given), evicting the least recently used entry if full."""
+        with self._lock:
+            if not self._check_version(version):
+                return
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """Get counters for health reporting."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "catalog_version": self.version
+        }
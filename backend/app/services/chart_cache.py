@@ -0,0 +1,183 @@
+"""
+Two-tier cache for size charts read off chart images.
+
+Many products on a retailer share one size chart image, and reading it with
+GPT-4o takes seconds. Parsed charts are kept in an in-process LRU in front
+of a SQLite file, so repeat lookups are a dict hit, and charts survive
+restarts and are shared by every worker on the host. Async callers use
+aget()/aset(), which keep SQLite work (and its lock) off the event loop.
+
+Charts are keyed by their normalized image URL and, optionally, by a
+SHA-256 of the image bytes, so the same chart served from different URLs
+(CDN hosts, cache-busting params) is only read once.
+"""
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .cache import TTLCache
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def url_key(url: str) -> str:
+    """
+    Cache key for a chart image URL.
+
+    Scheme and host are lowercased, default ports, fragments and utm_*
+    tracking params dropped, and the remaining query params sorted. Inline
+    data: URLs are keyed by a hash of their payload.
+    """
+    url = url.strip()
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme == "data":
+        return "data:" + hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    host = (parts.hostname or "").lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host if port is None or _DEFAULT_PORTS.get(scheme) == port else f"{host}:{port}"
+    query = urlencode(sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not name.lower().startswith("utm_")
+    ))
+    return "url:" + urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+
+def image_key(image: bytes) -> str:
+    """Cache key for chart image contents."""
+    return "sha256:" + hashlib.sha256(image).hexdigest()
+
+
+class ChartCache:
+    """
+    Parsed size charts by key, in memory and (optionally) on disk.
+
+    Disk errors are logged and treated as misses; the cache never fails a
+    size lookup. Returned charts are shared and must not be modified.
+    """
+
+    def __init__(self, path: Optional[str] = None, maxsize: int = 1000, ttl: float = 30 * 86400):
+        """
+        Args:
+            path: SQLite file for the disk tier (memory only if empty)
+            maxsize: Charts kept in memory
+            ttl: Seconds a parsed chart stays valid
+        """
+        self.path = path
+        self.ttl = ttl
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+        self.disk_hits = 0
+        self.disk_misses = 0
+        self.disk_errors = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the disk tier on first use, dropping expired charts."""
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS charts ("
+                "key TEXT PRIMARY KEY, chart TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("DELETE FROM charts WHERE expires_at <= ?", (time.time(),))
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[dict]:
+        """Get a parsed chart, or None on a miss (blocks on the disk tier; see aget)."""
+        chart = self.memory.get(key)
+        if chart is not None or not self.path:
+            return chart
+        return self._disk_get(key)
+
+    async def aget(self, key: str) -> Optional[dict]:
+        """get() for the event loop: memory hits are answered inline, disk reads run in a worker thread."""
+        chart = self.memory.get(key)
+        if chart is not None or not self.path:
+            return chart
+        return await asyncio.to_thread(self._disk_get, key)
+
+    def set(self, keys: list[str], chart: dict):
+        """Cache a parsed chart under every key it was found by (blocks on the disk tier; see aset)."""
+        for key in keys:
+            self.memory.set(key, chart)
+        if self.path:
+            self._disk_set(keys, chart)
+
+    async def aset(self, keys: list[str], chart: dict):
+        """set() for the event loop: the disk write runs in a worker thread."""
+        for key in keys:
+            self.memory.set(key, chart)
+        if self.path:
+            await asyncio.to_thread(self._disk_set, keys, chart)
+
+    def _disk_get(self, key: str) -> Optional[dict]:
+        """Look a chart up on disk, promoting a hit to memory."""
+        with self._lock:
+            try:
+                row = self._connection().execute(
+                    "SELECT chart, expires_at FROM charts WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                self.disk_errors += 1
+                print(f"Chart cache read failed: {e}")
+                return None
+
+        remaining = row[1] - time.time() if row else 0
+        if remaining <= 0:
+            self.disk_misses += 1
+            return None
+
+        self.disk_hits += 1
+        chart = json.loads(row[0])
+        # Keep the disk expiry when promoting to memory
+        self.memory.set(key, chart, ttl=remaining)
+        return chart
+
+    def _disk_set(self, keys: list[str], chart: dict):
+        """Write a chart to disk under every key."""
+        expires_at = time.time() + self.ttl
+        encoded = json.dumps(chart)
+        with self._lock:
+            try:
+                conn = self._connection()
+                conn.executemany(
+                    "INSERT OR REPLACE INTO charts (key, chart, expires_at) VALUES (?, ?, ?)",
+                    [(key, encoded, expires_at) for key in keys]
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                self.disk_errors += 1
+                print(f"Chart cache write failed: {e}")
+
+    def close(self):
+        """Close the disk tier; it reopens on next use."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> dict:
+        """Get counters for health reporting."""
+        memory = self.memory.stats()
+        memory.pop("catalog_version", None)
+        return {
+            "memory": memory,
+            "disk_path": self.path or None,
+            "disk_hits": self.disk_hits,
+            "disk_misses": self.disk_misses,
+            "disk_errors": self.disk_errors
+        }
@@ -0,0 +1,191 @@
+"""
+Bitmap facets for catalog browsing.
+
+Every facet value (a category, subcategory, brand, retailer or price band)
+keeps a bitset of the products that have it, as a Python int with one bit per
+product, built once per catalog version. Filtering on several facets is one
+OR per facet across its selected values and one AND between facets, and a
+facet count is a bit_count() of an AND, so neither scans products.
+
+Products are numbered in listing order: women's products by id, then men's
+products by id. Ascending bits of a filter are therefore a filtered listing
+page, and the same numbering is used for search documents (see search.py).
+"""
+import math
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Iterator, Optional
+
+from .text import normalize_retailer
+
+FACETS = ("category", "subcategory", "brand", "retailer", "price_band")
+
+# Upper price bound (exclusive) and label of each price band
+PRICE_BANDS = ((10, "under-10"), (25, "10-25"), (50, "25-50"), (100, "50-100"), (math.inf, "100-plus"))
+
+# Facet values returned per facet, most frequent first
+MAX_FACET_VALUES = 20
+
+# Bits examined at a time when walking a bitset
+_WINDOW = 4096
+
+
+def price_band(price: float) -> str:
+    """Label of the price band a price falls in."""
+    for bound, label in PRICE_BANDS:
+        if price < bound:
+            return label
+    return PRICE_BANDS[-1][1]
+
+
+def facet_values(product: dict) -> dict[str, list[str]]:
+    """Facet values of one product."""
+    return {
+        "category": [product["category"]] if product.get("category") else [],
+        "subcategory": [product["subcategory"]] if product.get("subcategory") else [],
+        "brand": [product["brand"]] if product.get("brand") else [],
+        # "hm" and "hm.com" are one retailer
+        "retailer": list(dict.fromkeys(filter(None, map(normalize_retailer, product.get("retailers") or ())))),
+        "price_band": [price_band(product["price"])]
+    }
+
+
+def _bitset(positions: Iterable[int], size: int) -> int:
+    """Pack product positions into an int bitset."""
+    packed = bytearray((size + 7) // 8)
+    for position in positions:
+        packed[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(packed, "little")
+
+
+def iter_bits(bitset: int, start: int = 0) -> Iterator[int]:
+    """Yield the set bit positions of a bitset from `start` upwards, in order."""
+    window_start = start
+    remaining = bitset >> start
+    while remaining:
+        window = remaining & ((1 << _WINDOW) - 1)
+        while window:
+            lowest = window & -window
+            yield window_start + lowest.bit_length() - 1
+            window ^= lowest
+        remaining >>= _WINDOW
+        window_start += _WINDOW
+
+
+class FacetIndex:
+    """Per-value product bitsets for each facet, immutable once built."""
+
+    def __init__(self, sides: Iterable[tuple[str, Iterable[dict]]]):
+        """
+        Args:
+            sides: (side, products in id order) for "womens" then "mens"
+        """
+        self.ids: list[str] = []
+        self.sides: dict[str, tuple[int, int]] = {}
+        positions: dict[str, dict[str, list[int]]] = {facet: {} for facet in FACETS}
+
+        for side, products in sides:
+            start = len(self.ids)
+            for product in products:
+                position = len(self.ids)
+                self.ids.append(product["id"])
+                for facet, values in facet_values(product).items():
+                    for value in values:
+                        positions[facet].setdefault(value, []).append(position)
+            self.sides[side] = (start, len(self.ids))
+
+        size = len(self.ids)
+        self.bitsets: dict[str, dict[str, int]] = {
+            facet: {value: _bitset(members, size) for value, members in values.items()}
+            for facet, values in positions.items()
+        }
+        self.everything = (1 << size) - 1
+        self.side_bitsets = {
+            side: ((1 << end) - 1) ^ ((1 << start) - 1) for side, (start, end) in self.sides.items()
+        }
+
+    @classmethod
+    def from_catalog(cls, catalog) -> "FacetIndex":
+        """Index every product of a CatalogRepository in listing order."""
+        return cls(
+            (side, (product for page in catalog.iter_pages(side) for product in page))
+            for side in ("womens", "mens")
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def select(
+        self,
+        filters: dict[str, list[str]],
+        side: Optional[str] = None,
+        skip: Optional[str] = None
+    ) -> int:
+        """
+        Bitset of the products matching every filtered facet.
+
+        Args:
+            filters: Facet -> accepted values (any of them); empty lists are ignored
+            side: Optional side to restrict to
+            skip: A facet to leave out, for counting that facet's own values
+        """
+        selected = self.side_bitsets.get(side, 0) if side else self.everything
+        for facet, values in filters.items():
+            if facet == skip or not values:
+                continue
+            accepted = 0
+            for value in values:
+                accepted |= self.bitsets[facet].get(value, 0)
+            selected &= accepted
+        return selected
+
+    def counts(self, matches: int, filters: dict[str, list[str]], side: Optional[str] = None) -> dict[str, dict[str, int]]:
+        """
+        Count facet values among matching products.
+
+        Each facet is counted under every filter except its own, so the
+        values a shopper could switch to keep their counts.
+
+        Args:
+            matches: Bitset of products matching the query, before facet filters
+            filters: Facet -> accepted values
+            side: Optional side to restrict to
+        """
+        counts = {}
+        for facet in FACETS:
+            base = matches & self.select(filters, side, skip=facet)
+            values = [
+                (value, count) for value, bitset in self.bitsets[facet].items()
+                if (count := (base & bitset).bit_count())
+            ]
+            values.sort(key=lambda item: (-item[1], item[0]))
+            counts[facet] = dict(values[:MAX_FACET_VALUES])
+        return counts
+
+    def page(self, bitset: int, side: str, after: Optional[str] = None, limit: int = 100) -> list[str]:
+        """Ids of one page of a side's products in a bitset, in id order after the cursor."""
+        start, end = self.sides.get(side, (0, 0))
+        if after is not None:
+            start = bisect_right(self.ids, after, start, end)
+
+        ids = []
+        for position in iter_bits(bitset, start):
+            if position >= end or len(ids) == limit:
+                break
+            ids.append(self.ids[position])
+        return ids
+
+    def position(self, product_id: str) -> Optional[int]:
+        """Position of a product by id, or None if it isn't indexed."""
+        for start, end in self.sides.values():
+            position = bisect_left(self.ids, product_id, start, end)
+            if position < end and self.ids[position] == product_id:
+                return position
+        return None
+
+    def bitset_of(self, positions: Iterable[int]) -> int:
+        """Pack product positions (e.g. search hits) into a bitset."""
+        return _bitset(positions, len(self.ids))
+
+    def membership(self, bitset: int) -> bytes:
+        """A bitset as little-endian bytes, for O(1) membership tests in tight loops."""
+        return bitset.to_bytes((len(self.ids) + 7) // 8, "little")
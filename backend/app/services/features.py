@@ -0,0 +1,91 @@
+"""
+Precomputed matching features for catalog products and incoming queries.
+
+The feature store is built once per catalog at load time so the scoring loop
+never re-normalizes catalog data. Queries are compiled once per request, which
+leaves only set operations in the per-candidate path.
+"""
+from typing import NamedTuple, Optional
+from .text import normalize_ingredient, tokenize_title
+
+
+class ProductFeatures(NamedTuple):
+    """Catalog-side features for one product."""
+    ingredients: frozenset[str]
+    first_3: frozenset[str]
+    title_tokens: frozenset[str]
+    brand: str
+    brand_raw: Optional[str]
+    attributes: Optional[dict]
+
+    @classmethod
+    def from_product(cls, product: dict) -> "ProductFeatures":
+        # Clothing is compared on materials the same way personal care is on ingredients
+        ingredients = product.get("ingredients") or product.get("materials", [])
+        return cls(
+            ingredients=frozenset(normalize_ingredient(i) for i in ingredients),
+            first_3=frozenset(normalize_ingredient(i) for i in ingredients[:3]),
+            title_tokens=frozenset(tokenize_title(product.get("title", ""))),
+            brand=(product.get("brand") or "").lower(),
+            brand_raw=product.get("brand"),
+            attributes=product.get("attributes")
+        )
+
+    def terms(self) -> set[tuple[str, str]]:
+        """Get the inverted index posting terms for this product."""
+        terms = {("title", token) for token in self.title_tokens}
+        terms.update(("ingredient", ingredient) for ingredient in self.ingredients)
+        terms.add(("brand", self.brand))
+        return terms
+
+
+class MatchQuery(NamedTuple):
+    """Query-side features for one incoming women's product."""
+    title_tokens: frozenset[str]
+    ingredients: Optional[frozenset[str]]
+    first_3: Optional[frozenset[str]]
+    attributes: Optional[dict]
+    # Lowercased brand when the caller supplied one, compared case-insensitively
+    brand: Optional[str]
+    # Catalog brand of the resolved women's product, compared as-is
+    brand_raw: Optional[str]
+    has_womens_product: bool
+
+    @classmethod
+    def compile(
+        cls,
+        title: str,
+        ingredients: Optional[list[str]] = None,
+        womens_product: Optional[dict] = None,
+        brand: Optional[str] = None
+    ) -> "MatchQuery":
+        womens_ingredients = ingredients or (womens_product.get("ingredients") if womens_product else None)
+        attributes = womens_product.get("attributes") if womens_product else None
+
+        return cls(
+            title_tokens=frozenset(tokenize_title(title)),
+            ingredients=(
+                frozenset(normalize_ingredient(i) for i in womens_ingredients)
+                if womens_ingredients else None
+            ),
+            first_3=(
+                frozenset(normalize_ingredient(i) for i in womens_ingredients[:3])
+                if womens_ingredients else None
+            ),
+            attributes=attributes,
+            brand=brand.lower() if brand else None,
+            brand_raw=womens_product.get("brand") if womens_product and not brand else None,
+            has_womens_product=bool(womens_product)
+        )
+
+    def terms(self) -> set[tuple[str, str]]:
+        """Get the inverted index posting terms for this query."""
+        terms = {("title", token) for token in self.title_tokens}
+        if self.ingredients:
+            terms.update(("ingredient", ingredient) for ingredient in self.ingredients)
+
+        if self.brand is not None:
+            terms.add(("brand", self.brand))
+        elif self.has_womens_product:
+            terms.add(("brand", (self.brand_raw or "").lower()))
+        return terms
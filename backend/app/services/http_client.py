@@ -0,0 +1,139 @@
+"""
+Shared outbound HTTP client.
+
+One httpx.AsyncClient per process, opened in the app lifespan and closed on
+shutdown, so outbound calls (GPT-4o OCR, chart image downloads) reuse
+keep-alive connections instead of paying a TCP and TLS handshake each time.
+HTTP/2 multiplexes concurrent calls to one host over a single connection
+when the `h2` package is installed (httpx[http2]).
+
+A per-host semaphore caps concurrent calls to any one host, so a burst of
+chart reads can't take every pooled connection or trip the host's rate limit.
+Waiting for a slot is bounded by HTTP_HOST_WAIT_TIMEOUT, and a host's
+semaphore is dropped once no call holds or awaits it, so hosts taken from
+request URLs don't accumulate.
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+# Connection pool limits
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30))
+
+# Concurrent requests allowed to any one host, and seconds a call may wait for a slot
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", 10))
+HTTP_HOST_WAIT_TIMEOUT = float(os.getenv("HTTP_HOST_WAIT_TIMEOUT", 10))
+
+HTTP2 = os.getenv("HTTP2", "true").lower() == "true"
+
+
+class _HostSlots:
+    """One host's request semaphore and the number of calls holding or awaiting it."""
+    __slots__ = ("semaphore", "users")
+
+    def __init__(self):
+        self.semaphore = asyncio.Semaphore(HTTP_MAX_PER_HOST)
+        self.users = 0
+
+
+_client: Optional[httpx.AsyncClient] = None
+_host_slots: dict[str, _HostSlots] = {}
+
+
+def _http2_available() -> bool:
+    """Whether httpx can speak HTTP/2 (needs the optional h2 package)."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _new_client() -> httpx.AsyncClient:
+    """Create a pooled client from the HTTP_* settings."""
+    http2 = HTTP2 and _http2_available()
+    if HTTP2 and not http2:
+        print("HTTP/2 requested but h2 is not installed (pip install httpx[http2]); using HTTP/1.1")
+    print(f"HTTP client: {'HTTP/2' if http2 else 'HTTP/1.1'}, "
+          f"{HTTP_MAX_CONNECTIONS} connections, {HTTP_MAX_PER_HOST} per host")
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(30.0)
+    )
+
+
+async def open_client():
+    """Open the shared client (called from the app lifespan)."""
+    get_client()
+
+
+async def close_client():
+    """Close the shared client and its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _host_slots.clear()
+
+
+def get_client() -> httpx.AsyncClient:
+    """Get the shared client, opening one on first use outside the app (scripts)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _new_client()
+    return _client
+
+
+@asynccontextmanager
+async def host_slot(url: str):
+    """
+    Hold one of the host's HTTP_MAX_PER_HOST request slots.
+
+    Raises:
+        httpx.PoolTimeout: If no slot frees up within HTTP_HOST_WAIT_TIMEOUT
+    """
+    host = (urlsplit(url).hostname or "").lower()
+    slots = _host_slots.get(host)
+    if slots is None:
+        slots = _host_slots[host] = _HostSlots()
+
+    slots.users += 1
+    try:
+        try:
+            async with asyncio.timeout(HTTP_HOST_WAIT_TIMEOUT):
+                await slots.semaphore.acquire()
+        except TimeoutError:
+            raise httpx.PoolTimeout(f"Timed out waiting for a request slot to {host}")
+        try:
+            yield
+        finally:
+            slots.semaphore.release()
+    finally:
+        slots.users -= 1
+        if not slots.users and _host_slots.get(host) is slots:
+            del _host_slots[host]
+
+
+@asynccontextmanager
+async def stream(method: str, url: str, **kwargs):
+    """Stream a response on the shared client, within the host's concurrency limit."""
+    async with host_slot(url):
+        async with get_client().stream(method, url, **kwargs) as response:
+            yield response
+
+
+async def request(method: str, url: str, **kwargs) -> httpx.Response:
+    """Send a request on the shared client, within the host's concurrency limit."""
+    async with host_slot(url):
+        return await get_client().request(method, url, **kwargs)
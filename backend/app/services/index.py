@@ -0,0 +1,175 @@
+"""
+Inverted index for match candidate generation.
+
+Built once per men's catalog when the catalog loads. Postings are keyed by
+normalized ingredient/material, title token and lowercased brand, so a query
+only has to fully score the products that share at least one posting with it.
+Products that share nothing with the query can never clear the engine's
+similarity threshold, which keeps the result identical to a full scan.
+
+Each subcategory also keeps its products sorted by price, so the "strictly
+cheaper than the women's product" rule becomes a bisect instead of a check
+after scoring. Retailers get posting lists too, so a "sold at this store"
+restriction is a set intersection before anything is scored.
+"""
+from bisect import bisect_left
+from typing import Iterator, Optional
+from .features import MatchQuery, ProductFeatures
+from .minhash import LSHIndex
+from .text import normalize_retailer
+
+
+# Shared result for retailers with no products
+_NOWHERE: frozenset[int] = frozenset()
+
+
+class PriceScope:
+    """A set of catalog ordinals with a price-sorted view for cheaper-than cuts."""
+
+    def __init__(self, ordinals: list[int], prices: list[float]):
+        self.ordinals = frozenset(ordinals)
+        self.by_price = sorted(ordinals, key=lambda ordinal: (prices[ordinal], ordinal))
+        self.prices = [prices[ordinal] for ordinal in self.by_price]
+
+    def __len__(self) -> int:
+        return len(self.by_price)
+
+    def __contains__(self, ordinal: int) -> bool:
+        return ordinal in self.ordinals
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.by_price)
+
+    def cheaper_than(self, price: float) -> int:
+        """Count of products priced strictly below `price` (a prefix of by_price)."""
+        return bisect_left(self.prices, price)
+
+
+class CatalogIndex:
+    """Feature store and inverted index over a product dictionary, keyed by catalog order."""
+
+    def __init__(self, products: dict):
+        self.keys = list(products.keys())
+        self.products = list(products.values())
+        self.features = [ProductFeatures.from_product(p) for p in self.products]
+        self.postings: dict[tuple[str, str], list[int]] = {}
+        self.prices = [product["price"] for product in self.products]
+        self.subcategories: dict[Optional[str], PriceScope] = {}
+        self.everything = PriceScope(list(range(len(self.products))), self.prices)
+        self.lsh: Optional[LSHIndex] = None
+        self.retailer_scopes: dict[str, frozenset[int]] = {}
+
+        for ordinal, features in enumerate(self.features):
+            for term in features.terms():
+                self.postings.setdefault(term, []).append(ordinal)
+
+        # Retailer postings are never query terms; they only restrict candidates
+        for ordinal, product in enumerate(self.products):
+            for retailer in {normalize_retailer(r) for r in product.get("retailers") or ()} - {""}:
+                self.postings.setdefault(("retailer", retailer), []).append(ordinal)
+
+        by_subcategory: dict[Optional[str], list[int]] = {}
+        for ordinal, product in enumerate(self.products):
+            by_subcategory.setdefault(product.get("subcategory"), []).append(ordinal)
+        self.subcategories = {
+            sub: PriceScope(ordinals, self.prices) for sub, ordinals in by_subcategory.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def subcategory(self, subcategory: Optional[str]) -> PriceScope:
+        """Get the price-sorted scope of one subcategory (empty if unknown)."""
+        scope = self.subcategories.get(subcategory)
+        return scope if scope is not None else PriceScope([], self.prices)
+
+    def sold_at(self, retailer: str) -> frozenset[int]:
+        """Ordinals of the products sold at a retailer (empty if unknown)."""
+        retailer = normalize_retailer(retailer)
+        ordinals = self.retailer_scopes.get(retailer)
+        if ordinals is None:
+            posting = self.postings.get(("retailer", retailer))
+            if not posting:
+                # Retailers come from requests: only remember ones the catalog has
+                return _NOWHERE
+            ordinals = self.retailer_scopes[retailer] = frozenset(posting)
+        return ordinals
+
+    def _restrict(
+        self,
+        found: set[int],
+        scope: Optional[PriceScope],
+        max_price: Optional[float],
+        sold_at: Optional[frozenset[int]] = None
+    ) -> list[int]:
+        """Intersect candidates with a scope, a retailer and a strict price cap, in catalog order."""
+        if sold_at is not None:
+            found = found & sold_at
+        if scope is None:
+            scope = self.everything
+        if max_price is None:
+            return sorted(ordinal for ordinal in found if ordinal in scope)
+
+        # Walk whichever side is smaller: the cheaper prefix or the candidates
+        cheaper = scope.cheaper_than(max_price)
+        if cheaper <= len(found):
+            return sorted(ordinal for ordinal in scope.by_price[:cheaper] if ordinal in found)
+        prices = self.prices
+        return sorted(
+            ordinal for ordinal in found
+            if prices[ordinal] < max_price and ordinal in scope
+        )
+
+    def candidates(
+        self,
+        terms: set[tuple[str, str]],
+        scope: Optional[PriceScope] = None,
+        max_price: Optional[float] = None,
+        sold_at: Optional[frozenset[int]] = None
+    ) -> list[int]:
+        """
+        Find products sharing at least one posting with the query terms.
+
+        Args:
+            terms: Query posting terms
+            scope: Optional ordinals to restrict to (e.g. one subcategory)
+            max_price: Optional exclusive price cap
+            sold_at: Optional ordinals of one retailer's products (see sold_at())
+
+        Returns catalog ordinals in catalog order, so callers that break ties
+        by "first seen" behave exactly as a scan over the original dict.
+        """
+        found = set()
+        for term in terms:
+            found.update(self.postings.get(term, ()))
+        return self._restrict(found, scope, max_price, sold_at)
+
+    def build_lsh(self, bands: int, rows: int):
+        """Build MinHash/LSH buckets over the ingredient sets for approximate matching."""
+        lsh = LSHIndex(bands, rows)
+        for ordinal, features in enumerate(self.features):
+            lsh.add(ordinal, features.ingredients)
+        self.lsh = lsh
+
+    def lsh_candidates(
+        self,
+        query: MatchQuery,
+        scope: Optional[PriceScope] = None,
+        max_price: Optional[float] = None,
+        sold_at: Optional[frozenset[int]] = None
+    ) -> list[int]:
+        """
+        Find products with likely-high ingredient Jaccard, in catalog order.
+
+        Queries without ingredients have nothing to hash and fall back to the
+        exact postings.
+        """
+        if self.lsh is None or not query.ingredients:
+            return self.candidates(query.terms(), scope, max_price, sold_at)
+
+        return self._restrict(set(self.lsh.candidates(query.ingredients)), scope, max_price, sold_at)
+
+    def items(self, ordinals: list[int]) -> Iterator[tuple[str, dict, ProductFeatures]]:
+        """Yield (key, product, features) for the given catalog ordinals."""
+        for ordinal in ordinals:
+            yield self.keys[ordinal], self.products[ordinal], self.features[ordinal]
@@ -3,24 +3,63 @@ Pink Tax Matching Engine - Find men's equivalents for women's products.
 
 Uses Jaccard Similarity on ingredient lists and fuzzy matching on product attributes.
 """
-import re
+import asyncio
+import hashlib
+import heapq
+import os
 from typing import Optional
-from ..models import ProductMatch, ProductCategory
-from ..mock_data import (
-    WOMENS_PRODUCTS, MENS_PRODUCTS,
-    WOMENS_CLOTHING, MENS_CLOTHING,
-    get_golden_pair, get_all_womens_products, get_all_mens_products
+from ..catalog import CatalogRepository, MATCHING_MODE, get_catalog
+from ..models import ProductMatch, ProductMatchRequest, ProductCategory
+from .automaton import get_key_matcher
+from .cache import TTLCache
+from .features import MatchQuery, ProductFeatures
+from .index import CatalogIndex, PriceScope
+from .singleflight import SingleFlight
+from .text import normalize_ingredient, normalize_retailer, tokenize_title
+
+
+# Ranked match results, invalidated whenever the catalog version changes
+MATCH_CACHE = TTLCache(
+    maxsize=int(os.getenv("MATCH_CACHE_SIZE", 10000)),
+    ttl=float(os.getenv("MATCH_CACHE_TTL", 300))
 )
 
+# Match computations in progress, by catalog version and match cache key
+MATCH_FLIGHTS = SingleFlight()
 
-def normalize_ingredient(ingredient: str) -> str:
-    """Normalize an ingredient string for comparison."""
-    # Lowercase, remove extra whitespace, remove common filler words
-    normalized = ingredient.lower().strip()
-    normalized = re.sub(r'\s+', ' ', normalized)
-    # Remove percentages and numbers
-    normalized = re.sub(r'\d+%?\s*', '', normalized)
-    return normalized
+
+def match_cache_key(
+    title: str,
+    price: float,
+    category: ProductCategory,
+    ingredients: Optional[list[str]],
+    brand: Optional[str],
+    k: int,
+    retailer: Optional[str] = None,
+    any_retailer: bool = False
+) -> tuple:
+    """
+    Build the result cache key for a match request.
+
+    Titles and brands are only ever compared case-insensitively, so they are
+    lowercased here. Prices are bucketed to the cent, since savings are
+    reported per cent. Retailers are expected already normalized.
+    """
+    ingredients_hash = (
+        hashlib.sha1("\x1f".join(ingredients).encode("utf-8")).hexdigest()
+        if ingredients else None
+    )
+    catalog_side = ProductCategory.CLOTHING if category == ProductCategory.CLOTHING else ProductCategory.PERSONAL_CARE
+    return (
+        title.lower(),
+        catalog_side.value,
+        ingredients_hash,
+        brand.lower() if brand else None,
+        round(price * 100),
+        k,
+        retailer,
+        any_retailer and retailer is not None
+    )
 
 
 def jaccard_similarity(set1: set, set2: set) -> float:
@@ -107,46 +146,397 @@ def title_similarity(title1: str, title2: str) -> float:
     """
     Calculate similarity between product titles using word overlap.
     """
-    # Extract meaningful words (remove common filler words)
-    stop_words = {'the', 'a', 'an', 'and', 'or', 'for', 'with', 'in', 'of', 'to'}
+    return jaccard_similarity(tokenize_title(title1), tokenize_title(title2))
+
+
+def _overlap(set1: frozenset, set2: frozenset) -> float:
+    """Jaccard similarity of two precomputed sets, without building the union."""
+    if not set1 or not set2:
+        return 0.0
+
+    intersection = len(set1 & set2)
+    return intersection / (len(set1) + len(set2) - intersection)
+
+
+def score_features(query: MatchQuery, features: ProductFeatures) -> list[tuple[str, float, float]]:
+    """
+    Score a compiled query against one men's product's precomputed features.
+
+    Returns (signal, score, weight) tuples for the weighted average.
+    """
+    scores = []
+
+    # 1. Title similarity (weight: 20%)
+    scores.append(("title", _overlap(query.title_tokens, features.title_tokens), 0.2))
+
+    # 2. Ingredient similarity (weight: 50%)
+    if query.ingredients and features.ingredients:
+        # 60% overall Jaccard, 40% first-3 match (often the most important)
+        ing_sim = (
+            _overlap(query.ingredients, features.ingredients) * 0.6
+            + _overlap(query.first_3, features.first_3) * 0.4
+        )
+        scores.append(("ingredients", ing_sim, 0.5))
+
+    # 3. Attribute similarity (weight: 20%)
+    if query.attributes is not None and features.attributes is not None:
+        scores.append(("attributes", attribute_similarity(query.attributes, features.attributes), 0.2))
+
+    # 4. Brand match bonus (weight: 10%)
+    brand_match = 0
+    if query.brand is not None:
+        brand_match = 1.0 if query.brand == features.brand else 0
+    elif query.has_womens_product:
+        brand_match = 1.0 if query.brand_raw == features.brand_raw else 0
+    scores.append(("brand", brand_match, 0.1))
+
+    return scores
+
+
+def _overlap_bound(set1: frozenset, set2: frozenset) -> float:
+    """Upper bound on _overlap from set sizes alone: |A ∩ B| / |A ∪ B| <= min / max."""
+    if not set1 or not set2:
+        return 0.0
+    return min(len(set1), len(set2)) / max(len(set1), len(set2))
+
+
+def score_bound(query: MatchQuery, features: ProductFeatures) -> float:
+    """
+    Upper bound on the weighted score of a product, without intersecting any sets.
 
-    words1 = {w.lower() for w in re.findall(r'\w+', title1) if w.lower() not in stop_words}
-    words2 = {w.lower() for w in re.findall(r'\w+', title2) if w.lower() not in stop_words}
+    Mirrors score_features signal by signal (same weights, same arithmetic),
+    so the bound is never below the real score, even in floating point.
+    """
+    bounds = [("title", _overlap_bound(query.title_tokens, features.title_tokens), 0.2)]
+
+    if query.ingredients and features.ingredients:
+        bounds.append(("ingredients", (
+            _overlap_bound(query.ingredients, features.ingredients) * 0.6
+            + _overlap_bound(query.first_3, features.first_3) * 0.4
+        ), 0.5))
+
+    if query.attributes is not None and features.attributes is not None:
+        bounds.append(("attributes", 1.0, 0.2))
+
+    brand_match = 0
+    if query.brand is not None:
+        brand_match = 1.0 if query.brand == features.brand else 0
+    elif query.has_womens_product:
+        brand_match = 1.0 if query.brand_raw == features.brand_raw else 0
+    bounds.append(("brand", brand_match, 0.1))
+
+    return _weighted_score(bounds)
 
-    return jaccard_similarity(words1, words2)
+
+def _weighted_score(scores: list[tuple[str, float, float]]) -> float:
+    """Weighted average of (signal, score, weight) tuples."""
+    total_weight = sum(s[2] for s in scores)
+    return sum(s[1] * s[2] for s in scores) / total_weight if total_weight > 0 else 0
 
 
 def find_matching_key(title: str, products_dict: dict) -> Optional[str]:
     """Find the best matching product key based on title."""
-    title_lower = title.lower()
+    matcher = get_key_matcher(products_dict)
 
     # First try exact key match
-    for key in products_dict:
-        if key in title_lower or title_lower in key:
-            return key
+    key_match, _ = matcher.first_substring(title.lower())
+    if key_match is not None:
+        return matcher.keys[key_match]
 
     # Then try word overlap
-    best_match = None
-    best_score = 0
+    best_match = matcher.best_title_similarity(title)
+    return matcher.keys[best_match] if best_match is not None else None
 
-    for key, product in products_dict.items():
-        score = title_similarity(title, product.get("title", key))
-        if score > best_score and score > 0.3:
-            best_score = score
-            best_match = key
 
-    return best_match
+def top_dynamic_matches(
+    query: MatchQuery,
+    womens_product: Optional[dict],
+    womens_price: float,
+    mens_index: CatalogIndex,
+    candidates: list[int],
+    k: int = 1,
+    exclude_ids: frozenset[str] = frozenset()
+) -> list[tuple[str, dict, list, float]]:
+    """
+    Score candidate men's products and select the k best cheaper equivalents.
 
+    Candidates are scored in decreasing order of score_bound(), and scoring
+    stops once the k-th best score kept so far beats every remaining bound.
+    Selection uses a bounded min-heap, so memory stays O(k) however many
+    candidates are scored. Ties go to the earliest product in catalog order.
 
-def find_mens_equivalent(
+    Returns:
+        (mens_key, mens_product, scores, weighted_score) tuples, best first
+    """
+    subcategory = womens_product.get("subcategory") if womens_product else None
+
+    bounded = []
+    for ordinal in candidates:
+        mens_product = mens_index.products[ordinal]
+
+        # Skip if different subcategory, excluded, or not cheaper
+        if womens_product and subcategory != mens_product.get("subcategory"):
+            continue
+        if mens_product["id"] in exclude_ids or mens_product["price"] >= womens_price:
+            continue
+
+        bound = score_bound(query, mens_index.features[ordinal])
+        if bound > 0.4:
+            bounded.append((-bound, ordinal))
+    bounded.sort()
+
+    # Entries are (score, -ordinal, ...) so the heap root is the weakest kept match
+    heap = []
+
+    for negative_bound, ordinal in bounded:
+        # Every remaining candidate is bounded below the weakest kept match
+        if len(heap) == k and -negative_bound < heap[0][0]:
+            break
+
+        scores = score_features(query, mens_index.features[ordinal])
+        weighted_score = _weighted_score(scores)
+
+        # Only consider if similarity is reasonable
+        if weighted_score <= 0.4:
+            continue
+
+        entry = (weighted_score, -ordinal, mens_index.keys[ordinal], mens_index.products[ordinal], scores)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+
+    return [
+        (mens_key, mens_product, scores, weighted_score)
+        for weighted_score, _, mens_key, mens_product, scores in sorted(heap, key=lambda e: e[:2], reverse=True)
+    ]
+
+
+def best_dynamic_match(
+    query: MatchQuery,
+    womens_product: Optional[dict],
+    womens_price: float,
+    mens_index: CatalogIndex,
+    candidates: list[int]
+) -> Optional[tuple[str, dict, list, float]]:
+    """
+    Score candidate men's products and pick the best cheaper equivalent.
+
+    Returns:
+        (mens_key, mens_product, scores, weighted_score) or None
+    """
+    matches = top_dynamic_matches(query, womens_product, womens_price, mens_index, candidates)
+    return matches[0] if matches else None
+
+
+def _catalogs_for(catalog: CatalogRepository, category: ProductCategory) -> tuple[dict, dict, CatalogIndex]:
+    """Get the (womens_db, mens_db, mens_index) used for a product category."""
+    return catalog.womens_db(category), catalog.mens_db(category), catalog.mens_index(category)
+
+
+def _sells(product: dict, retailer: Optional[str]) -> bool:
+    """Whether a product is sold at a (normalized) retailer; any product qualifies if None."""
+    return retailer is None or retailer in {normalize_retailer(r) for r in product.get("retailers") or ()}
+
+
+def _golden_match(
+    catalog: CatalogRepository,
+    womens_product: dict,
+    womens_price: float,
+    mens_db: dict,
+    retailer: Optional[str] = None
+) -> Optional[ProductMatch]:
+    """Build a match from the pre-computed golden pair for a women's product, if any."""
+    golden_pair = catalog.golden_pair(womens_product["id"])
+    if not golden_pair:
+        return None
+
+    # The men's product must be in the catalog searched for this category
+    mens_key = catalog.get_key(golden_pair["mens_id"])
+    mens_product = mens_db.get(mens_key) if mens_key else None
+    if not mens_product or mens_product["id"] != golden_pair["mens_id"]:
+        return None
+    if not _sells(mens_product, retailer):
+        return None
+
+    savings = womens_price - mens_product["price"]
+    savings_pct = (savings / womens_price) * 100 if womens_price > 0 else 0
+
+    return ProductMatch(
+        title=mens_product["title"],
+        price=mens_product["price"],
+        savings_amount=round(savings, 2),
+        savings_percent=round(savings_pct, 1),
+        similarity_score=golden_pair["similarity_score"],
+        match_reasons=golden_pair["match_reasons"],
+        product_url=None,
+        image_url=mens_product.get("image_url"),
+        retailers=mens_product.get("retailers")
+    )
+
+
+def _scored_match(womens_price: float, mens_product: dict, scores: list, score: float) -> ProductMatch:
+    """Build a ProductMatch, with match reasons, from a dynamically scored product."""
+    savings = womens_price - mens_product["price"]
+    savings_pct = (savings / womens_price) * 100 if womens_price > 0 else 0
+
+    # Generate match reasons
+    match_reasons = []
+    for score_name, score_val, _ in scores:
+        if score_val > 0.7:
+            if score_name == "ingredients":
+                match_reasons.append("Highly similar ingredient formula")
+            elif score_name == "brand":
+                match_reasons.append(f"Same brand ({mens_product.get('brand', 'Unknown')})")
+            elif score_name == "attributes":
+                match_reasons.append("Similar product specifications")
+
+    if not match_reasons:
+        match_reasons.append("Functionally equivalent product")
+
+    if savings_pct > 30:
+        match_reasons.append(f"Significant savings opportunity ({savings_pct:.0f}%)")
+
+    return ProductMatch(
+        title=mens_product["title"],
+        price=mens_product["price"],
+        savings_amount=round(savings, 2),
+        savings_percent=round(savings_pct, 1),
+        similarity_score=round(score, 2),
+        match_reasons=match_reasons,
+        product_url=None,
+        image_url=mens_product.get("image_url"),
+        retailers=mens_product.get("retailers")
+    )
+
+
+def _table_matches(
+    match_table: dict[str, dict],
+    womens_product: dict,
+    womens_price: float,
+    mens_db: dict,
+    k: int,
+    exclude_ids: frozenset[str],
+    retailer: Optional[str] = None
+) -> Optional[list[ProductMatch]]:
+    """
+    Serve ranked matches for a known women's product from the match table.
+
+    The table ranks candidates without a price or retailer cut, so the
+    shopper's price and store are applied here. Only valid for requests whose
+    title tokenizes like the catalog title. Returns None when the table
+    can't answer exactly (no entry, stale entry, or too few qualifying
+    matches in a truncated list).
+    """
+    entry = match_table.get(womens_product["id"])
+    if entry is None:
+        return None
+
+    matches = []
+    for row in entry["matches"]:
+        mens_product = mens_db.get(row["mens_key"])
+        if mens_product is None or mens_product["id"] != row["mens_id"]:
+            return None
+        if row["mens_id"] in exclude_ids or mens_product["price"] >= womens_price:
+            continue
+        if not _sells(mens_product, retailer):
+            continue
+
+        matches.append(_scored_match(womens_price, mens_product, row["scores"], row["score"]))
+        if len(matches) == k:
+            return matches
+
+    return matches if entry["complete"] else None
+
+
+def _ranked_matches(
+    catalog: CatalogRepository,
+    womens_title: str,
+    womens_price: float,
+    womens_product: Optional[dict],
+    ingredients: Optional[list[str]],
+    brand: Optional[str],
+    mens_db: dict,
+    mens_index: CatalogIndex,
+    scope: Optional[PriceScope],
+    k: int,
+    retailer: Optional[str] = None,
+    any_retailer: bool = False
+) -> list[ProductMatch]:
+    """
+    Rank up to k men's equivalents for a resolved women's product, golden pair first.
+
+    With a (normalized) retailer, only men's products sold there are
+    considered; `any_retailer` retries across every retailer when that store
+    has no cheaper equivalent.
+    """
+    if retailer is not None and any_retailer:
+        args = (catalog, womens_title, womens_price, womens_product, ingredients, brand, mens_db, mens_index, scope, k)
+        return _ranked_matches(*args, retailer) or _ranked_matches(*args)
+
+    matches = []
+    golden_ids = frozenset()
+
+    # Check for pre-computed golden pair
+    if womens_product:
+        golden = _golden_match(catalog, womens_product, womens_price, mens_db, retailer)
+        if golden:
+            matches.append(golden)
+            if k == 1:
+                return matches
+            golden_ids = frozenset([catalog.golden_pair(womens_product["id"])["mens_id"]])
+
+    # Known products without request-supplied overrides come from the match table,
+    # which was scored with the catalog title: a differently worded request title
+    # scores (and may rank) differently, so it is matched dynamically
+    if (
+        womens_product and not ingredients and not brand
+        and frozenset(tokenize_title(womens_title)) == frozenset(tokenize_title(womens_product["title"]))
+    ):
+        table_matches = _table_matches(
+            catalog.match_table, womens_product, womens_price, mens_db, k - len(matches), golden_ids, retailer
+        )
+        if table_matches is not None:
+            return matches + table_matches
+
+    # Fall back to dynamic matching
+    query = MatchQuery.compile(womens_title, ingredients, womens_product, brand)
+    # The retailer's postings narrow candidates before anything is scored
+    sold_at = mens_index.sold_at(retailer) if retailer is not None else None
+    if MATCHING_MODE == "lsh":
+        candidates = mens_index.lsh_candidates(query, scope, womens_price, sold_at)
+    else:
+        # Only cheaper products sharing a posting with the query can qualify
+        candidates = mens_index.candidates(query.terms(), scope, womens_price, sold_at)
+
+    for _, mens_product, scores, score in top_dynamic_matches(
+        query, womens_product, womens_price, mens_index, candidates, k - len(matches), golden_ids
+    ):
+        matches.append(_scored_match(womens_price, mens_product, scores, score))
+
+    return matches
+
+
+def _subcategory_scope(womens_product: Optional[dict], mens_index: CatalogIndex) -> Optional[PriceScope]:
+    """Men's products sharing the women's product's subcategory, or None if unrestricted."""
+    if not womens_product:
+        return None
+    return mens_index.subcategory(womens_product.get("subcategory"))
+
+
+def find_mens_equivalents(
     womens_title: str,
     womens_price: float,
     category: ProductCategory,
     ingredients: Optional[list[str]] = None,
-    brand: Optional[str] = None
-) -> Optional[ProductMatch]:
+    brand: Optional[str] = None,
+    k: int = 1,
+    catalog: Optional[CatalogRepository] = None,
+    retailer: Optional[str] = None,
+    any_retailer: bool = False
+) -> list[ProductMatch]:
     """
-    Find the best men's equivalent for a women's product.
+    Find the top-k men's equivalents for a women's product.
 
     Args:
         womens_title: Title of the women's product
@@ -154,147 +544,199 @@ def find_mens_equivalent(
         category: Product category
         ingredients: List of ingredients/materials (if available)
         brand: Product brand (if known)
+        k: Maximum number of equivalents to return
+        catalog: Catalog version to match against (defaults to the current one)
+        retailer: Only recommend men's products sold at this retailer
+        any_retailer: Fall back to every retailer if that one has no equivalent
 
     Returns:
-        ProductMatch if a suitable equivalent is found, None otherwise
+        Up to k ProductMatches, best first (a golden pair always ranks first)
     """
+    catalog = catalog or get_catalog()
+    retailer = normalize_retailer(retailer or "") or None
+    cache_key = match_cache_key(womens_title, womens_price, category, ingredients, brand, k, retailer, any_retailer)
+    cached = MATCH_CACHE.get(cache_key, catalog.version)
+    if cached is not None:
+        return list(cached)
+    return _uncached_equivalents(
+        cache_key, womens_title, womens_price, category, ingredients, brand, k, catalog, retailer, any_retailer
+    )
+
+
+def _uncached_equivalents(
+    cache_key: tuple,
+    womens_title: str,
+    womens_price: float,
+    category: ProductCategory,
+    ingredients: Optional[list[str]],
+    brand: Optional[str],
+    k: int,
+    catalog: CatalogRepository,
+    retailer: Optional[str],
+    any_retailer: bool
+) -> list[ProductMatch]:
+    """Rank and cache equivalents after a result cache miss (retailer already normalized)."""
     # Determine which product databases to use
-    if category == ProductCategory.CLOTHING:
-        womens_db = WOMENS_CLOTHING
-        mens_db = MENS_CLOTHING
-    else:
-        womens_db = WOMENS_PRODUCTS
-        mens_db = MENS_PRODUCTS
+    womens_db, mens_db, mens_index = _catalogs_for(catalog, category)
 
     # Try to find the women's product in our database
     womens_key = find_matching_key(womens_title, womens_db)
     womens_product = womens_db.get(womens_key) if womens_key else None
 
-    # Check for pre-computed golden pair
-    if womens_product:
-        golden_pair = get_golden_pair(womens_product["id"])
-        if golden_pair:
-            # Find the men's product from the golden pair
-            for mens_key, mens_product in mens_db.items():
-                if mens_product["id"] == golden_pair["mens_id"]:
-                    savings = womens_price - mens_product["price"]
-                    savings_pct = (savings / womens_price) * 100 if womens_price > 0 else 0
-
-                    return ProductMatch(
-                        title=mens_product["title"],
-                        price=mens_product["price"],
-                        savings_amount=round(savings, 2),
-                        savings_percent=round(savings_pct, 1),
-                        similarity_score=golden_pair["similarity_score"],
-                        match_reasons=golden_pair["match_reasons"],
-                        product_url=None,
-                        image_url=mens_product.get("image_url")
-                    )
+    matches = _ranked_matches(
+        catalog, womens_title, womens_price, womens_product, ingredients, brand,
+        mens_db, mens_index, _subcategory_scope(womens_product, mens_index), k, retailer, any_retailer
+    )
+    MATCH_CACHE.set(cache_key, tuple(matches), catalog.version)
+    return matches
 
-    # Fall back to dynamic matching
-    best_match = None
-    best_score = 0
 
-    for mens_key, mens_product in mens_db.items():
-        # Skip if different subcategory
-        if womens_product and womens_product.get("subcategory") != mens_product.get("subcategory"):
-            continue
+async def find_mens_equivalents_shared(
+    womens_title: str,
+    womens_price: float,
+    category: ProductCategory,
+    ingredients: Optional[list[str]] = None,
+    brand: Optional[str] = None,
+    k: int = 1,
+    catalog: Optional[CatalogRepository] = None,
+    retailer: Optional[str] = None,
+    any_retailer: bool = False
+) -> list[ProductMatch]:
+    """
+    find_mens_equivalents() for async callers.
 
-        # Calculate similarity scores
-        scores = []
-
-        # 1. Title similarity (weight: 20%)
-        title_sim = title_similarity(womens_title, mens_product["title"])
-        scores.append(("title", title_sim, 0.2))
-
-        # 2. Ingredient similarity (weight: 50%)
-        mens_ingredients = mens_product.get("ingredients") or mens_product.get("materials", [])
-        womens_ingredients = ingredients or (womens_product.get("ingredients") if womens_product else None)
-
-        if womens_ingredients and mens_ingredients:
-            ing_sim = ingredient_similarity(womens_ingredients, mens_ingredients)
-            scores.append(("ingredients", ing_sim, 0.5))
-
-        # 3. Attribute similarity (weight: 20%)
-        if womens_product and "attributes" in womens_product and "attributes" in mens_product:
-            attr_sim = attribute_similarity(womens_product["attributes"], mens_product["attributes"])
-            scores.append(("attributes", attr_sim, 0.2))
-
-        # 4. Brand match bonus (weight: 10%)
-        brand_match = 0
-        if brand:
-            brand_match = 1.0 if brand.lower() == mens_product.get("brand", "").lower() else 0
-        elif womens_product:
-            brand_match = 1.0 if womens_product.get("brand") == mens_product.get("brand") else 0
-        scores.append(("brand", brand_match, 0.1))
-
-        # Calculate weighted average
-        total_weight = sum(s[2] for s in scores)
-        weighted_score = sum(s[1] * s[2] for s in scores) / total_weight if total_weight > 0 else 0
-
-        # Only consider if price is lower and similarity is reasonable
-        if mens_product["price"] < womens_price and weighted_score > best_score and weighted_score > 0.4:
-            best_score = weighted_score
-            best_match = (mens_key, mens_product, scores)
-
-    if best_match:
-        mens_key, mens_product, scores = best_match
-        savings = womens_price - mens_product["price"]
-        savings_pct = (savings / womens_price) * 100 if womens_price > 0 else 0
-
-        # Generate match reasons
-        match_reasons = []
-        for score_name, score_val, _ in scores:
-            if score_val > 0.7:
-                if score_name == "ingredients":
-                    match_reasons.append("Highly similar ingredient formula")
-                elif score_name == "brand":
-                    match_reasons.append(f"Same brand ({mens_product.get('brand', 'Unknown')})")
-                elif score_name == "attributes":
-                    match_reasons.append("Similar product specifications")
-
-        if not match_reasons:
-            match_reasons.append("Functionally equivalent product")
-
-        if savings_pct > 30:
-            match_reasons.append(f"Significant savings opportunity ({savings_pct:.0f}%)")
-
-        return ProductMatch(
-            title=mens_product["title"],
-            price=mens_product["price"],
-            savings_amount=round(savings, 2),
-            savings_percent=round(savings_pct, 1),
-            similarity_score=round(best_score, 2),
-            match_reasons=match_reasons,
-            product_url=None,
-            image_url=mens_product.get("image_url")
-        )
+    Result cache hits are answered on the event loop. Misses are scored in
+    a worker thread so they don't block it, and concurrent identical misses
+    against the same catalog version share one computation.
+    """
+    catalog = catalog or get_catalog()
+    retailer = normalize_retailer(retailer or "") or None
+    cache_key = match_cache_key(womens_title, womens_price, category, ingredients, brand, k, retailer, any_retailer)
+    cached = MATCH_CACHE.get(cache_key, catalog.version)
+    if cached is not None:
+        return list(cached)
 
-    return None
+    matches = await MATCH_FLIGHTS.do((catalog.version,) + cache_key, lambda: asyncio.to_thread(
+        _uncached_equivalents, cache_key, womens_title, womens_price, category, ingredients, brand, k,
+        catalog, retailer, any_retailer
+    ))
+    return list(matches)
 
 
-def search_products_by_title(query: str, category: Optional[ProductCategory] = None) -> list[dict]:
+def find_mens_equivalent(
+    womens_title: str,
+    womens_price: float,
+    category: ProductCategory,
+    ingredients: Optional[list[str]] = None,
+    brand: Optional[str] = None,
+    catalog: Optional[CatalogRepository] = None
+) -> Optional[ProductMatch]:
     """
-    Search for products by title query.
+    Find the best men's equivalent for a women's product.
 
-    Returns a list of matching products from both women's and men's databases.
+    Args:
+        womens_title: Title of the women's product
+        womens_price: Price of the women's product
+        category: Product category
+        ingredients: List of ingredients/materials (if available)
+        brand: Product brand (if known)
+        catalog: Catalog version to match against (defaults to the current one)
+
+    Returns:
+        ProductMatch if a suitable equivalent is found, None otherwise
     """
-    results = []
-    query_lower = query.lower()
+    matches = find_mens_equivalents(womens_title, womens_price, category, ingredients, brand, catalog=catalog)
+    return matches[0] if matches else None
 
-    all_products = {**get_all_womens_products(), **get_all_mens_products()}
 
-    for key, product in all_products.items():
-        # Filter by category if specified
-        if category:
-            prod_cat = product.get("category", "")
-            if category == ProductCategory.CLOTHING and prod_cat != "clothing":
-                continue
-            elif category == ProductCategory.PERSONAL_CARE and prod_cat != "personal_care":
-                continue
+def find_mens_equivalents_batch(
+    requests: list[ProductMatchRequest],
+    catalog: Optional[CatalogRepository] = None
+) -> list[list[ProductMatch]]:
+    """
+    Find men's equivalents for many women's products at once.
 
-        # Check if query matches
-        if query_lower in key or query_lower in product.get("title", "").lower():
-            results.append(product)
+    Requests are grouped by catalog and subcategory so each group's men's
+    catalog and candidate scope are resolved once, then scored per item.
+
+    Returns:
+        The top-k ProductMatches for each request, in request order
+    """
+    catalog = catalog or get_catalog()
+    results: list[list[ProductMatch]] = [[] for _ in requests]
+    groups: dict[tuple, list[tuple[int, ProductMatchRequest, Optional[dict]]]] = {}
+    cache_keys = {}
+    retailers = {}
+
+    for position, request in enumerate(requests):
+        retailer = retailers[position] = normalize_retailer(request.retailer or "") or None
+        cache_key = match_cache_key(
+            request.title, request.price, request.category, request.ingredients, request.brand, request.k,
+            retailer, request.any_retailer
+        )
+        cached = MATCH_CACHE.get(cache_key, catalog.version)
+        if cached is not None:
+            results[position] = list(cached)
+            continue
+        cache_keys[position] = cache_key
+
+        womens_db = catalog.womens_db(request.category)
+        womens_key = find_matching_key(request.title, womens_db)
+        womens_product = womens_db.get(womens_key) if womens_key else None
+
+        clothing = request.category == ProductCategory.CLOTHING
+        subcategory = womens_product.get("subcategory") if womens_product else None
+        groups.setdefault((clothing, bool(womens_product), subcategory), []).append(
+            (position, request, womens_product)
+        )
+
+    for (clothing, _, _), members in groups.items():
+        category = ProductCategory.CLOTHING if clothing else ProductCategory.PERSONAL_CARE
+        _, mens_db, mens_index = _catalogs_for(catalog, category)
+        # Every member shares the same resolved subcategory
+        scope = _subcategory_scope(members[0][2], mens_index)
+
+        for position, request, womens_product in members:
+            results[position] = _ranked_matches(
+                catalog, request.title, request.price, womens_product, request.ingredients,
+                request.brand, mens_db, mens_index, scope, request.k, retailers[position], request.any_retailer
+            )
+            MATCH_CACHE.set(cache_keys[position], tuple(results[position]), catalog.version)
 
     return results
+
+
+def search_products_by_title(
+    query: str,
+    category: Optional[ProductCategory] = None,
+    catalog: Optional[CatalogRepository] = None,
+    limit: int = 20,
+    offset: int = 0,
+    filters: Optional[dict[str, list[str]]] = None
+) -> tuple[int, list[dict]]:
+    """
+    Search products by title, brand, subcategory and ingredients.
+
+    Args:
+        filters: Optional facet filters (facet -> accepted values, see services/facets.py)
+
+    Returns:
+        (total matching products, the requested page of products ranked by BM25)
+    """
+    catalog = catalog or get_catalog()
+    # Filter by category if specified
+    filter_category = category.value if category in (ProductCategory.CLOTHING, ProductCategory.PERSONAL_CARE) else None
+
+    allowed = None
+    if filters and any(values for facet, values in filters.items() if facet != "category"):
+        facets = catalog.facet_index
+        allowed = facets.membership(facets.select(filters, skip="category"))
+
+    results = catalog.search_index.search(query, filter_category, limit, offset, allowed)
+
+    products = []
+    for product_id, _ in results.hits:
+        product = catalog.get_product(product_id)
+        if product is not None:
+            products.append(product)
+    return results.total, products
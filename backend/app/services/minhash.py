@@ -0,0 +1,239 @@
+"""
+MinHash signatures and banded LSH for approximate ingredient Jaccard matching.
+
+Each product's normalized ingredient set is compressed into a MinHash signature
+of `bands * rows` values. Two sets collide in a band with probability J^rows,
+so products with high Jaccard similarity land in a shared bucket with high
+probability while lookups touch only a handful of buckets.
+
+The knob is `rows` (per band): more rows per band raises the similarity
+threshold (~ (1/bands)^(1/rows)), returning fewer candidates faster at the cost
+of recall. More bands lowers it again.
+
+Run `python -m app.services.minhash` to report recall against exact scoring.
+"""
+import argparse
+import hashlib
+import random
+import time
+from typing import Iterable, Optional
+
+# Mersenne prime for universal hashing of 64-bit token hashes
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def token_hash(token: str) -> int:
+    """Stable 64-bit hash of a token (Python's hash() is salted per process)."""
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class MinHasher:
+    """Computes fixed-length MinHash signatures for token sets."""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.permutations = [
+            (rng.randrange(1, _PRIME), rng.randrange(0, _PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, tokens: Iterable[str]) -> tuple[int, ...]:
+        """Get the MinHash signature of a token set."""
+        hashes = [token_hash(t) for t in set(tokens)]
+        if not hashes:
+            return (_MAX_HASH,) * self.num_perm
+
+        return tuple(
+            min(((a * h + b) % _PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self.permutations
+        )
+
+
+def estimate_jaccard(sig1: tuple[int, ...], sig2: tuple[int, ...]) -> float:
+    """Estimate Jaccard similarity from two signatures of the same hasher."""
+    return sum(1 for x, y in zip(sig1, sig2) if x == y) / len(sig1)
+
+
+class LSHIndex:
+    """Banded locality-sensitive hash buckets over MinHash signatures."""
+
+    def __init__(self, bands: int = 32, rows: int = 4, seed: int = 1):
+        self.bands = bands
+        self.rows = rows
+        self.hasher = MinHasher(bands * rows, seed)
+        self.buckets: dict[tuple, list[int]] = {}
+
+    @property
+    def threshold(self) -> float:
+        """Approximate Jaccard similarity where collision probability is 50%."""
+        return (1 / self.bands) ** (1 / self.rows)
+
+    def _band_keys(self, signature: tuple[int, ...]) -> Iterable[tuple]:
+        for band in range(self.bands):
+            start = band * self.rows
+            yield (band, signature[start:start + self.rows])
+
+    def add(self, ordinal: int, tokens: Iterable[str]):
+        """Index a product's token set under its catalog ordinal."""
+        tokens = frozenset(tokens)
+        if not tokens:
+            return
+
+        for key in self._band_keys(self.hasher.signature(tokens)):
+            self.buckets.setdefault(key, []).append(ordinal)
+
+    def candidates(self, tokens: Iterable[str]) -> list[int]:
+        """Find products sharing at least one band bucket, in catalog order."""
+        tokens = frozenset(tokens)
+        if not tokens:
+            return []
+
+        found = set()
+        for key in self._band_keys(self.hasher.signature(tokens)):
+            found.update(self.buckets.get(key, ()))
+        return sorted(found)
+
+
+# =============================================================================
+# Recall evaluation
+# =============================================================================
+
+def evaluate_golden_pairs(bands: int, rows: int) -> dict:
+    """
+    Compare LSH against exact scoring on the pre-verified golden pairs.
+
+    For each pair, checks whether the curated men's product is among the LSH
+    candidates, and whether dynamic matching picks the same product in both modes.
+    """
+    from ..catalog import get_catalog
+    from ..models import ProductCategory
+    from .features import MatchQuery
+    from .index import CatalogIndex
+    from .matching import best_dynamic_match
+
+    catalog = get_catalog()
+    indexes = {}
+    for category in (ProductCategory.PERSONAL_CARE, ProductCategory.CLOTHING):
+        index = CatalogIndex(catalog.mens_db(category))
+        index.build_lsh(bands, rows)
+        indexes[category] = index
+
+    found = agreed = 0
+    for pair in catalog.golden_pairs:
+        womens_product = catalog.get_product(pair["womens_id"])
+        index = indexes[ProductCategory(womens_product["category"])]
+
+        # Clothing is compared on materials the same way personal care is on ingredients
+        ingredients = womens_product.get("ingredients") or womens_product.get("materials")
+        query = MatchQuery.compile(womens_product["title"], ingredients, womens_product)
+
+        exact = index.candidates(query.terms())
+        approx = index.lsh_candidates(query)
+        golden = next(i for i, p in enumerate(index.products) if p["id"] == pair["mens_id"])
+        found += golden in approx
+
+        exact_best = best_dynamic_match(query, womens_product, womens_product["price"], index, exact)
+        approx_best = best_dynamic_match(query, womens_product, womens_product["price"], index, approx)
+        agreed += (exact_best and exact_best[0]) == (approx_best and approx_best[0])
+
+    return {
+        "pairs": len(catalog.golden_pairs),
+        "golden_recall": found / len(catalog.golden_pairs),
+        "top1_agreement": agreed / len(catalog.golden_pairs)
+    }
+
+
+def evaluate_synthetic(
+    bands: int,
+    rows: int,
+    catalog_size: int = 10000,
+    queries: int = 200,
+    min_jaccard: float = 0.5,
+    seed: int = 7
+) -> dict:
+    """
+    Measure LSH recall on a synthetic catalog against exact Jaccard.
+
+    Products draw 5-12 ingredients from a skewed vocabulary, and queries are
+    perturbed copies of catalog products. Ground truth is every product whose
+    exact ingredient Jaccard with the query is at least `min_jaccard`.
+    """
+    rng = random.Random(seed)
+    vocabulary = [f"ingredient {i}" for i in range(2000)]
+    weights = [1 / (i + 1) for i in range(len(vocabulary))]
+
+    def draw(n: int) -> frozenset[str]:
+        return frozenset(rng.choices(vocabulary, weights, k=n))
+
+    catalog = [draw(rng.randint(5, 12)) for _ in range(catalog_size)]
+
+    start = time.perf_counter()
+    lsh = LSHIndex(bands, rows)
+    for ordinal, ingredients in enumerate(catalog):
+        lsh.add(ordinal, ingredients)
+    build_seconds = time.perf_counter() - start
+
+    relevant = retrieved = scanned = 0
+    exact_seconds = lsh_seconds = 0.0
+    for _ in range(queries):
+        base = list(rng.choice(catalog))
+        rng.shuffle(base)
+        query = frozenset(base[:max(1, len(base) - rng.randint(0, 2))]) | draw(rng.randint(0, 2))
+
+        start = time.perf_counter()
+        truth = {
+            i for i, ingredients in enumerate(catalog)
+            if len(query & ingredients) / len(query | ingredients) >= min_jaccard
+        }
+        exact_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        candidates = lsh.candidates(query)
+        lsh_seconds += time.perf_counter() - start
+
+        relevant += len(truth)
+        retrieved += len(truth.intersection(candidates))
+        scanned += len(candidates)
+
+    return {
+        "catalog_size": catalog_size,
+        "queries": queries,
+        "min_jaccard": min_jaccard,
+        "recall": retrieved / relevant if relevant else 1.0,
+        "candidates_per_query": scanned / queries,
+        "build_seconds": round(build_seconds, 3),
+        "exact_ms_per_query": round(exact_seconds / queries * 1000, 3),
+        "lsh_ms_per_query": round(lsh_seconds / queries * 1000, 3)
+    }
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Evaluate MinHash/LSH recall against exact scoring.")
+    parser.add_argument("--bands", type=int, default=32)
+    parser.add_argument("--rows", type=int, default=4)
+    parser.add_argument("--catalog-size", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--min-jaccard", type=float, default=0.5)
+    args = parser.parse_args(argv)
+
+    lsh = LSHIndex(args.bands, args.rows)
+    print(f"LSH: {args.bands} bands x {args.rows} rows (threshold ~{lsh.threshold:.2f})")
+
+    golden = evaluate_golden_pairs(args.bands, args.rows)
+    print(f"Golden pairs ({golden['pairs']}): "
+          f"recall={golden['golden_recall']:.2f} top1_agreement={golden['top1_agreement']:.2f}")
+
+    synthetic = evaluate_synthetic(
+        args.bands, args.rows, args.catalog_size, args.queries, args.min_jaccard
+    )
+    print(f"Synthetic ({synthetic['catalog_size']} products, {synthetic['queries']} queries, "
+          f"J>={synthetic['min_jaccard']}): recall={synthetic['recall']:.3f} "
+          f"candidates/query={synthetic['candidates_per_query']:.1f} "
+          f"exact={synthetic['exact_ms_per_query']}ms lsh={synthetic['lsh_ms_per_query']}ms "
+          f"build={synthetic['build_seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Background size chart jobs.
+
+Reading a size chart image with GPT-4o can take up to 30 seconds, too long
+to hold an extension request open. A size request that needs OCR is queued
+as a job instead: the caller gets a job id at once and polls (or long-polls)
+for the recommendation.
+
+A fixed pool of asyncio workers drains a bounded queue, so OCR concurrency
+and memory stay bounded however many charts are submitted; a full queue
+rejects new jobs rather than growing. Workers read charts through the chart
+cache (see sizing.read_size_chart), so a finished job also serves every
+later request for the same chart synchronously. Unlike the synchronous size
+endpoint, a job whose chart can't be read fails instead of falling back to
+the catalog's chart.
+"""
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+from ..models import SizeMatchRequest, SizeRecommendation
+from .sizing import SizeChartError, recommend_size
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at its depth limit."""
+
+
+class OcrJob:
+    """One queued size request and, once finished, its recommendation."""
+
+    def __init__(self, request: SizeMatchRequest):
+        self.id = uuid.uuid4().hex
+        self.request = request
+        self.status = QUEUED
+        self.recommendation: Optional[SizeRecommendation] = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self.finished = asyncio.Event()
+
+
+class OcrJobQueue:
+    """Bounded job queue drained by a fixed pool of asyncio workers."""
+
+    def __init__(self, workers: int = 4, maxsize: int = 100, ttl: float = 600.0):
+        """
+        Args:
+            workers: Jobs processed concurrently
+            maxsize: Jobs allowed to wait in the queue before submits are rejected
+            ttl: Seconds a finished job stays available to poll
+        """
+        self.workers = workers
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list[asyncio.Task] = []
+        self._jobs: dict[str, OcrJob] = {}
+        # Finished jobs in finishing order, for expiry
+        self._finished: OrderedDict[str, OcrJob] = OrderedDict()
+        self.running = 0
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def start(self):
+        """Start the workers (called from the app lifespan)."""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stop the workers; unfinished jobs are dropped."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def submit(self, request: SizeMatchRequest) -> OcrJob:
+        """
+        Queue a size request.
+
+        Raises:
+            QueueFullError: If the queue is at its depth limit
+        """
+        if self._queue is None:
+            raise RuntimeError("OCR job queue is not running")
+        self._expire()
+
+        job = OcrJob(request)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFullError(f"OCR queue is full ({self.maxsize} jobs waiting)")
+        self._jobs[job.id] = job
+        self.submitted += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[OcrJob]:
+        """Get a job by id, or None if unknown or expired."""
+        self._expire()
+        return self._jobs.get(job_id)
+
+    async def wait(self, job: OcrJob, timeout: float) -> OcrJob:
+        """Wait up to `timeout` seconds for a job to finish (long polling)."""
+        if timeout > 0 and not job.finished.is_set():
+            try:
+                await asyncio.wait_for(job.finished.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job
+
+    def _expire(self):
+        """Forget finished jobs older than the TTL, oldest first; queued and running jobs are kept."""
+        cutoff = time.monotonic() - self.ttl
+        while self._finished:
+            job = next(iter(self._finished.values()))
+            if job.finished_at > cutoff:
+                break
+            self._finished.popitem(last=False)
+            del self._jobs[job.id]
+
+    async def _work(self):
+        """Worker loop: run queued jobs one at a time."""
+        while True:
+            job = await self._queue.get()
+            job.status = RUNNING
+            self.running += 1
+            try:
+                request = job.request
+                job.recommendation = await recommend_size(
+                    product_title=request.product_title,
+                    user_measurements=request.user_measurements,
+                    size_chart_url=request.size_chart_url,
+                    size_chart_data=request.size_chart_data
+                )
+                job.status = DONE
+                self.completed += 1
+            except Exception as e:
+                print(f"OCR job {job.id} failed: {e!r} (cause: {e.__cause__!r})")
+                # Only our own chart error messages are shown to clients
+                job.error = str(e) if isinstance(e, SizeChartError) else "Size recommendation failed"
+                job.status = FAILED
+                self.failed += 1
+            finally:
+                self.running -= 1
+                job.finished_at = time.monotonic()
+                self._finished[job.id] = job
+                job.finished.set()
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        """Get counters for health reporting."""
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "max_queued": self.maxsize,
+            "running": self.running,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected
+        }
@@ -0,0 +1,134 @@
+"""
+Offline all-pairs match precomputation.
+
+Scores every women's product against every men's product in the same
+subcategory and writes a materialized match table (top-k per women's product)
+that the API loads at startup. Request-time matching for known catalog
+products then becomes a dictionary lookup.
+
+Usage:
+    python -m app.services.precompute --output match_table.json --k 10 --workers 4
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from ..models import ProductCategory
+
+# Bump when the table layout changes so stale files are rejected at load
+MATCH_TABLE_FORMAT = 1
+
+
+def _score_group(category: str, womens_keys: list[str], depth: int) -> dict[str, dict]:
+    """
+    Rank same-subcategory men's products for a group of women's products.
+
+    Runs in a worker process. Candidates are ranked without a price cut so the
+    API can apply the shopper's actual price at lookup time.
+    """
+    from ..catalog import get_catalog
+    from . import matching
+    from .features import MatchQuery
+
+    womens_db, mens_db, mens_index = matching._catalogs_for(get_catalog(), ProductCategory(category))
+    table = {}
+
+    for womens_key in womens_keys:
+        womens_product = womens_db[womens_key]
+        scope = matching._subcategory_scope(womens_product, mens_index)
+        query = MatchQuery.compile(womens_product["title"], None, womens_product)
+
+        # Rank one extra candidate to learn whether the list was truncated
+        ranked = matching.top_dynamic_matches(
+            query, womens_product, float("inf"), mens_index, sorted(scope), depth + 1
+        )
+        table[womens_product["id"]] = {
+            "complete": len(ranked) <= depth,
+            "matches": [
+                {
+                    "mens_key": mens_key,
+                    "mens_id": mens_product["id"],
+                    "score": score,
+                    "scores": scores
+                }
+                for mens_key, mens_product, scores, score in ranked[:depth]
+            ]
+        }
+
+    return table
+
+
+def build_match_table(depth: int = 10, workers: Optional[int] = None) -> dict:
+    """
+    Score the whole catalog, fanning subcategory groups out across processes.
+
+    Args:
+        depth: Matches kept per women's product (the largest k served from the table)
+        workers: Worker process count (defaults to the CPU count)
+
+    Returns:
+        The match table, ready to be written with write_match_table
+    """
+    from ..catalog import get_catalog
+
+    catalog = get_catalog()
+    jobs = []
+    for category in (ProductCategory.PERSONAL_CARE, ProductCategory.CLOTHING):
+        womens_db = catalog.womens_db(category)
+        groups: dict[Optional[str], list[str]] = {}
+        for key, product in womens_db.items():
+            groups.setdefault(product.get("subcategory"), []).append(key)
+        jobs.extend((category.value, keys) for keys in groups.values())
+
+    matches = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_score_group, category, keys, depth) for category, keys in jobs]
+        for future in futures:
+            matches.update(future.result())
+
+    return {
+        "format": MATCH_TABLE_FORMAT,
+        "depth": depth,
+        "generated_at": time.time(),
+        "matches": matches
+    }
+
+
+def write_match_table(table: dict, path: str):
+    """Write a match table atomically, so a running API never reads a partial file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(table, f)
+    os.replace(tmp_path, path)
+
+
+def read_match_table(path: str) -> dict:
+    """Read a match table written by this job (per-product entries under "matches")."""
+    with open(path) as f:
+        table = json.load(f)
+
+    if table.get("format") != MATCH_TABLE_FORMAT:
+        raise ValueError(f"Unsupported match table format: {table.get('format')}")
+    return table
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Precompute the top-k match table for the whole catalog.")
+    parser.add_argument("--output", default=os.getenv("MATCH_TABLE_PATH", "match_table.json"))
+    parser.add_argument("--k", type=int, default=10, help="Matches kept per women's product")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    table = build_match_table(args.k, args.workers)
+    write_match_table(table, args.output)
+
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {len(table['matches'])} women's products to {args.output} in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
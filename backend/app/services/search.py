@@ -0,0 +1,234 @@
+"""
+BM25 product search.
+
+An inverted index over product titles, brands, subcategories and
+ingredients/materials, built once per catalog version. Documents are numbered
+category by category, so a category filter narrows each posting list to one
+contiguous range with a bisect instead of checking every hit.
+
+Each document also records its position in the input stream. Indexes built
+from the same catalog stream (see facets.py) share those positions, so a
+facet bitset can filter search hits directly.
+"""
+import heapq
+import math
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from .text import tokenize
+
+# BM25 term-frequency saturation and document-length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# How much one occurrence of a word counts, by the field it appears in
+FIELD_WEIGHTS = {"title": 2.0, "brand": 1.5, "subcategory": 1.0, "ingredients": 0.5}
+
+
+def _field_texts(product: dict) -> Iterator[tuple[str, str]]:
+    """Searchable text of a product, as (field, text) pairs."""
+    yield "title", product.get("title", "")
+    yield "brand", product.get("brand") or ""
+    yield "subcategory", (product.get("subcategory") or "").replace("_", " ")
+    # Clothing is searched on materials the same way personal care is on ingredients
+    for ingredient in product.get("ingredients") or product.get("materials") or ():
+        yield "ingredients", ingredient
+
+
+class SearchResults(NamedTuple):
+    """One page of ranked search hits."""
+    total: int
+    # (product id, BM25 score), best first
+    hits: list[tuple[str, float]]
+
+
+class SearchIndex:
+    """BM25 inverted index over catalog products, immutable once built."""
+
+    def __init__(self, products: Iterable[dict]):
+        # Brands, subcategories and ingredients repeat across products: weigh each text once
+        weighted: dict[tuple[str, str], list[tuple[str, float]]] = {}
+        # Per category: ids, input positions, document lengths and postings numbered within the category
+        groups: dict[str, tuple[list[str], list[int], list[float], dict[str, tuple[list[int], list[float]]]]] = {}
+
+        for input_position, product in enumerate(products):
+            category = product.get("category") or ""
+            group = groups.get(category)
+            if group is None:
+                group = groups[category] = ([], [], [], {})
+            ids, positions, lengths, postings = group
+
+            weights: dict[str, float] = {}
+            for field_text in _field_texts(product):
+                terms = weighted.get(field_text)
+                if terms is None:
+                    field, text = field_text
+                    terms = [(word, FIELD_WEIGHTS[field]) for word in tokenize(text)]
+                    # Titles are mostly unique; caching them would only cost memory
+                    if field != "title":
+                        weighted[field_text] = terms
+                for word, weight in terms:
+                    weights[word] = weights.get(word, 0.0) + weight
+
+            doc = len(ids)
+            ids.append(product["id"])
+            positions.append(input_position)
+            lengths.append(sum(weights.values()))
+            for term, weight in weights.items():
+                posting = postings.get(term)
+                if posting is None:
+                    posting = postings[term] = ([], [])
+                posting[0].append(doc)
+                posting[1].append(weight)
+
+        all_lengths = [length for _, _, lengths, _ in groups.values() for length in lengths]
+        average = sum(all_lengths) / len(all_lengths) if all_lengths else 0.0
+
+        self.ids: list[str] = []
+        self.positions = array("I")
+        self.categories: dict[str, tuple[int, int]] = {}
+        # term -> (ascending doc numbers, BM25 term impacts tf * (k1 + 1) / (tf + norm))
+        self.postings: dict[str, tuple[array, array]] = {}
+
+        # Number documents category by category, so each category is one doc range
+        for category in sorted(groups):
+            ids, positions, lengths, postings = groups.pop(category)
+            base = len(self.ids)
+            self.categories[category] = (base, base + len(ids))
+            self.ids.extend(ids)
+            self.positions.extend(positions)
+
+            # Per-document BM25 length normalization: k1 * (1 - b + b * |d| / avgdl)
+            norms = [BM25_K1 * (1 - BM25_B + BM25_B * length / average) for length in lengths]
+            for term, (docs, weights) in postings.items():
+                posting = self.postings.get(term)
+                if posting is None:
+                    posting = self.postings[term] = (array("I"), array("f"))
+                posting[0].extend([doc + base for doc in docs])
+                posting[1].extend([
+                    tf * (BM25_K1 + 1) / (tf + norms[doc]) for doc, tf in zip(docs, weights)
+                ])
+
+        # Largest impact per term, for the MaxScore upper bounds in search()
+        self.max_impacts = {term: max(impacts) for term, (_, impacts) in self.postings.items()}
+
+    @classmethod
+    def from_catalog(cls, catalog) -> "SearchIndex":
+        """Index every product of a CatalogRepository, women's first, each side in id order."""
+        return cls(
+            product
+            for side in ("womens", "mens")
+            for page in catalog.iter_pages(side)
+            for product in page
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _terms(self, query: str, category: Optional[str]) -> list[tuple]:
+        """(df, term, idf, docs, impacts, first, last) for each query term with hits, rarest first."""
+        start, end = self.categories.get(category, (0, 0)) if category else (0, len(self.ids))
+        terms = []
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            docs, impacts = posting
+            first = bisect_left(docs, start)
+            last = bisect_left(docs, end, first)
+            if first < last:
+                idf = math.log(1 + (len(self.ids) - len(docs) + 0.5) / (len(docs) + 0.5))
+                terms.append((last - first, term, idf, docs, impacts, first, last))
+        terms.sort()
+        return terms
+
+    def search(
+        self,
+        query: str,
+        category: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+        allowed: Optional[bytes] = None
+    ) -> SearchResults:
+        """
+        Rank products against a free-text query.
+
+        Query terms are scored rarest first. Once `offset + limit` products
+        are in hand and the remaining (common) terms can't lift an unseen
+        product past the current cut-off, those terms are only looked up for
+        the products still in contention (MaxScore). A product's score is
+        always summed in the same term order, so pruning never changes the
+        ranking.
+
+        Args:
+            query: Search text; any query word can match (OR semantics)
+            category: Optional category to restrict to
+            limit: Maximum hits to return
+            offset: Hits to skip, for paging
+            allowed: Optional little-endian bitmap of input positions to keep
+                (see FacetIndex.membership)
+
+        Returns:
+            The total number of matching products and the requested window of
+            hits, ordered by score (ties in index order)
+        """
+        terms = self._terms(query, category)
+        if not terms:
+            return SearchResults(0, [])
+        depth = offset + limit
+        positions = self.positions
+
+        def admits(doc: int) -> bool:
+            return allowed is None or allowed[positions[doc] >> 3] >> (positions[doc] & 7) & 1
+
+        if len(terms) == 1:
+            _, _, idf, docs, impacts, first, last = terms[0]
+            hits = range(first, last) if allowed is None else [p for p in range(first, last) if admits(docs[p])]
+            # Stable: equal impacts keep doc order
+            top = heapq.nlargest(depth, hits, key=impacts.__getitem__)
+            return SearchResults(len(hits), [(self.ids[docs[p]], idf * impacts[p]) for p in top[offset:]])
+
+        matched = set().union(*(docs[first:last] for _, _, _, docs, _, first, last in terms))
+        total = len(matched) if allowed is None else sum(1 for doc in matched if admits(doc))
+        bounds = [idf * self.max_impacts[term] for _, term, idf, _, _, _, _ in terms]
+
+        scores: dict[int, float] = {}
+        for position, (_, _, idf, docs, impacts, first, last) in enumerate(terms):
+            if len(scores) >= depth:
+                remaining = sum(bounds[position:]) * (1 + 1e-9)
+                cutoff = heapq.nlargest(depth, scores.values())[-1]
+                if remaining < cutoff:
+                    # Products not seen yet can't reach the cut-off: finish only the contenders
+                    scores = self._finish(scores, terms[position:], cutoff - remaining)
+                    break
+            for p in range(first, last):
+                doc = docs[p]
+                if allowed is not None and not admits(doc):
+                    continue
+                scores[doc] = scores.get(doc, 0.0) + idf * impacts[p]
+
+        top = heapq.nsmallest(depth, scores.items(), key=lambda item: (-item[1], item[0]))
+        return SearchResults(total, [(self.ids[doc], score) for doc, score in top[offset:]])
+
+    def matches(self, query: str, category: Optional[str] = None) -> set[int]:
+        """Input positions of every product matching a query, for facet counting."""
+        matched = set()
+        for _, _, _, docs, _, first, last in self._terms(query, category):
+            matched.update(docs[first:last])
+        positions = self.positions
+        return {positions[doc] for doc in matched}
+
+    @staticmethod
+    def _finish(scores: dict[int, float], terms: list[tuple], floor: float) -> dict[int, float]:
+        """Add the remaining terms' scores to the products scoring at least `floor` so far."""
+        finished = {}
+        for doc, score in scores.items():
+            if score < floor:
+                continue
+            for _, _, idf, docs, impacts, first, last in terms:
+                p = bisect_left(docs, doc, first, last)
+                if p < last and docs[p] == doc:
+                    score += idf * impacts[p]
+            finished[doc] = score
+        return finished
@@ -0,0 +1,90 @@
+"""
+Single-flight coalescing of concurrent identical work.
+
+When a product page trends, many shoppers ask for the same size chart or
+match at once, all before the first answer lands in a cache. The first
+caller for a key starts the work as an asyncio task; callers arriving while
+it runs await that same task and get its result or exception.
+
+A caller that goes away (client disconnect, timeout) stops waiting without
+cancelling the shared task. Only when every caller has gone is the task
+cancelled, so the work is never wasted on behalf of someone still waiting.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class _Flight:
+    """One in-flight task and the number of callers waiting on it."""
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Run at most one task per key at a time, sharing it with concurrent callers."""
+
+    def __init__(self):
+        self._flights: dict[Hashable, _Flight] = {}
+
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.failures = 0
+        self.cancellations = 0
+
+    async def do(self, key: Hashable, work: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await the result of `work()` for a key, sharing any call already in flight.
+
+        Args:
+            key: Identifies identical work (must be hashable)
+            work: Starts the work; only called if nothing is in flight for `key`
+
+        Returns:
+            The shared result (callers must not modify it)
+        """
+        self.calls += 1
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight(asyncio.ensure_future(work()))
+            flight.task.add_done_callback(lambda task: self._finished(key, flight))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            # Shielded: cancelling one caller must not cancel the others' task
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Everyone has gone: stop the work, and let the next caller start afresh
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+                self.cancellations += 1
+
+    def _finished(self, key: Hashable, flight: _Flight):
+        """Forget a finished task, so later callers start new work."""
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled() and flight.task.exception() is not None:
+            self.failures += 1
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def stats(self) -> dict:
+        """Get counters for health reporting."""
+        return {
+            "in_flight": len(self._flights),
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "failures": self.failures,
+            "cancellations": self.cancellations
+        }
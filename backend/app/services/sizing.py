@@ -3,17 +3,52 @@ Universal Fit Decoder - AI-powered size chart reading and translation.
 
 Uses GPT-4o Vision to OCR size charts and translates women's sizing to men's measurements.
 """
+import asyncio
+import ipaddress
 import os
 import json
+import socket
 import httpx
 from typing import Optional
-from ..models import UserMeasurements, SizeRecommendation
-from ..mock_data import MENS_CLOTHING, WOMENS_CLOTHING, find_matching_key
+from ..catalog import CatalogRepository, get_catalog
+from ..models import UserMeasurements, SizeRecommendation, ProductCategory
+from ..mock_data import find_matching_key
+from . import http_client
+from .chart_cache import ChartCache, image_key, url_key
+from .singleflight import SingleFlight
 
 
 # OpenAI API configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_API_URL = "https://api.openai.com/v1/chat/completions"
+# Point OPENAI_BASE_URL at a local stand-in server to test without the real API
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+OPENAI_API_URL = f"{OPENAI_BASE_URL.rstrip('/')}/chat/completions"
+
+# Parsed size charts, in memory and in a SQLite file shared across workers and restarts
+CHART_CACHE = ChartCache(
+    path=os.getenv("CHART_CACHE_PATH", "chart_cache.db"),
+    maxsize=int(os.getenv("CHART_CACHE_SIZE", 1000)),
+    ttl=float(os.getenv("CHART_CACHE_TTL", 30 * 86400))
+)
+
+# Also key charts by image contents, so one chart behind many URLs is read once
+# (costs an image download on each URL miss)
+CHART_CACHE_HASH_IMAGES = os.getenv("CHART_CACHE_HASH_IMAGES", "false").lower() == "true"
+
+# Chart reads in progress, by URL cache key
+CHART_FLIGHTS = SingleFlight()
+
+# Chart image downloads: largest image accepted, and redirect hops followed
+CHART_IMAGE_MAX_BYTES = int(os.getenv("CHART_IMAGE_MAX_BYTES", 10 * 2**20))
+CHART_IMAGE_MAX_REDIRECTS = 3
+
+
+class ChartImageError(Exception):
+    """Raised when a chart image URL must not be downloaded."""
+
+
+class SizeChartError(Exception):
+    """Raised when the size chart behind a URL can't be read; the message is safe to show clients."""
 
 
 async def ocr_size_chart_with_gpt4o(image_url: str) -> dict:
@@ -54,45 +89,176 @@ Example output format:
 If a measurement is in centimeters, convert to inches (divide by 2.54).
 Only return the JSON, no other text."""
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            OPENAI_API_URL,
-            headers={
-                "Authorization": f"Bearer {OPENAI_API_KEY}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": "gpt-4o",
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {"url": image_url}
-                            }
-                        ]
-                    }
-                ],
-                "max_tokens": 1000
-            },
-            timeout=30.0
-        )
-
-        if response.status_code != 200:
-            raise Exception(f"OpenAI API error: {response.text}")
-
-        result = response.json()
-        content = result["choices"][0]["message"]["content"]
-
-        # Parse JSON from response (handle markdown code blocks)
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0]
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0]
-
-        return json.loads(content.strip())
+    response = await http_client.request(
+        "POST",
+        OPENAI_API_URL,
+        headers={
+            "Authorization": f"Bearer {OPENAI_API_KEY}",
+            "Content-Type": "application/json"
+        },
+        json={
+            "model": "gpt-4o",
+            "messages": [
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": prompt},
+                        {
+                            "type": "image_url",
+                            "image_url": {"url": image_url}
+                        }
+                    ]
+                }
+            ],
+            "max_tokens": 1000
+        },
+        timeout=30.0
+    )
+
+    if response.status_code != 200:
+        raise Exception(f"OpenAI API error: {response.text}")
+
+    result = response.json()
+    content = result["choices"][0]["message"]["content"]
+
+    # Parse JSON from response (handle markdown code blocks)
+    if "```json" in content:
+        content = content.split("```json")[1].split("```")[0]
+    elif "```" in content:
+        content = content.split("```")[1].split("```")[0]
+
+    return json.loads(content.strip())
+
+
+def _is_public(ip: str) -> bool:
+    """Whether an IP address is globally routable (IPv4-mapped IPv6 judged as IPv4)."""
+    address = ipaddress.ip_address(ip)
+    if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+        address = address.ipv4_mapped
+    return address.is_global
+
+
+async def _check_public_url(url: str):
+    """
+    Reject a chart image URL that isn't http(s) or whose host resolves to a
+    private, loopback, link-local or otherwise non-public address.
+
+    Raises:
+        ChartImageError: If the URL must not be downloaded
+    """
+    parsed = httpx.URL(url)
+    if parsed.scheme not in ("http", "https") or not parsed.host:
+        raise ChartImageError(f"Unsupported chart image URL: {url}")
+
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    try:
+        addresses = await asyncio.get_running_loop().getaddrinfo(parsed.host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise ChartImageError(f"Can't resolve chart image host {parsed.host}: {e}")
+
+    for *_, sockaddr in addresses:
+        if not _is_public(sockaddr[0]):
+            raise ChartImageError(f"Chart image host {parsed.host} is not a public address")
+
+
+async def _check_public_peer(event: str, info: dict):
+    """
+    httpcore trace hook that checks the address a chart download actually
+    connected to, before the request is sent.
+
+    The connection resolves the host again after _check_public_url, so a
+    host whose DNS answer changes in between (DNS rebinding) is caught here.
+
+    Raises:
+        ChartImageError: If the connection's peer isn't a public address
+    """
+    if event != "connection.connect_tcp.complete":
+        return
+    connection = info["return_value"]
+    peer = connection.get_extra_info("server_addr")
+    if peer is None or not _is_public(peer[0]):
+        await connection.aclose()
+        raise ChartImageError("Chart image host connected to a non-public address")
+
+
+async def fetch_chart_image(image_url: str) -> bytes:
+    """
+    Download a size chart image from a public http(s) URL.
+
+    Redirects are followed one hop at a time so each target is checked like
+    the original URL, every new connection's peer address is checked before
+    the request goes out, and the body is streamed and abandoned once it
+    passes CHART_IMAGE_MAX_BYTES.
+
+    Raises:
+        ChartImageError: If a URL isn't public http(s), or the image is too large
+        httpx.HTTPError: If the download fails
+    """
+    url = image_url
+    for _ in range(CHART_IMAGE_MAX_REDIRECTS + 1):
+        await _check_public_url(url)
+        async with http_client.stream(
+            "GET", url, timeout=10.0, extensions={"trace": _check_public_peer}
+        ) as response:
+            if response.is_redirect:
+                url = str(response.url.join(response.headers["location"]))
+                continue
+            response.raise_for_status()
+
+            too_large = ChartImageError(f"Chart image is larger than {CHART_IMAGE_MAX_BYTES} bytes: {image_url}")
+            length = response.headers.get("content-length", "")
+            if length.isdigit() and int(length) > CHART_IMAGE_MAX_BYTES:
+                raise too_large
+            image = bytearray()
+            async for chunk in response.aiter_bytes():
+                image += chunk
+                if len(image) > CHART_IMAGE_MAX_BYTES:
+                    raise too_large
+            return bytes(image)
+
+    raise ChartImageError(f"Too many redirects for chart image: {image_url}")
+
+
+async def cached_size_chart(image_url: str) -> Optional[dict]:
+    """The parsed chart behind an image URL if it has been read before, else None."""
+    return await CHART_CACHE.aget(url_key(image_url))
+
+
+async def read_size_chart(image_url: str) -> dict:
+    """
+    Get the parsed size chart behind an image URL, from the chart cache if
+    it has been read before, otherwise with GPT-4o.
+
+    Returns:
+        Dictionary mapping sizes to measurements (shared; don't modify)
+    """
+    key = url_key(image_url)
+    chart = await CHART_CACHE.aget(key)
+    if chart is not None:
+        return chart
+
+    # Shoppers opening the same page at once share one read of its chart
+    return await CHART_FLIGHTS.do(key, lambda: _read_uncached_chart(image_url, key))
+
+
+async def _read_uncached_chart(image_url: str, key: str) -> dict:
+    """Read a chart missing from the URL cache, by image contents or with GPT-4o."""
+    keys = [key]
+    if CHART_CACHE_HASH_IMAGES and not image_url.startswith("data:"):
+        try:
+            keys.append(image_key(await fetch_chart_image(image_url)))
+        except (httpx.HTTPError, ChartImageError) as e:
+            print(f"Chart image download failed: {e}")
+        else:
+            chart = await CHART_CACHE.aget(keys[1])
+            if chart is not None:
+                # Same chart under a new URL: remember the URL too
+                await CHART_CACHE.aset(keys[:1], chart)
+                return chart
+
+    chart = await ocr_size_chart_with_gpt4o(image_url)
+    await CHART_CACHE.aset(keys, chart)
+    return chart
 
 
 def find_best_size(
@@ -230,20 +396,46 @@ async def get_size_recommendation(
     product_title: str,
     user_measurements: UserMeasurements,
     size_chart_url: Optional[str] = None,
-    size_chart_data: Optional[dict] = None
+    size_chart_data: Optional[dict] = None,
+    catalog: Optional[CatalogRepository] = None
 ) -> Optional[SizeRecommendation]:
     """
     Get a size recommendation for a men's clothing item.
 
+    If the chart at `size_chart_url` can't be read, falls back to the
+    catalog's chart for the product (see recommend_size for the raising form).
+
     Args:
         product_title: Title of the men's product
         user_measurements: User's body measurements
-        size_chart_url: Optional URL to size chart image (uses GPT-4o OCR)
+        size_chart_url: Optional URL to size chart image (cached GPT-4o OCR)
         size_chart_data: Optional pre-parsed size chart data
+        catalog: Catalog version to fall back to (defaults to the current one)
 
     Returns:
         SizeRecommendation if successful, None otherwise
     """
+    try:
+        return await recommend_size(product_title, user_measurements, size_chart_url, size_chart_data, catalog)
+    except SizeChartError as e:
+        print(f"OCR failed: {e.__cause__}")
+        # Fall back to the catalog's chart
+        return await recommend_size(product_title, user_measurements, catalog=catalog)
+
+
+async def recommend_size(
+    product_title: str,
+    user_measurements: UserMeasurements,
+    size_chart_url: Optional[str] = None,
+    size_chart_data: Optional[dict] = None,
+    catalog: Optional[CatalogRepository] = None
+) -> Optional[SizeRecommendation]:
+    """
+    Get a size recommendation, like get_size_recommendation, without hiding chart read failures.
+
+    Raises:
+        SizeChartError: If the chart at `size_chart_url` can't be read
+    """
     # Get size chart data
     chart_data = None
 
@@ -251,16 +443,16 @@ async def get_size_recommendation(
         chart_data = size_chart_data
     elif size_chart_url:
         try:
-            chart_data = await ocr_size_chart_with_gpt4o(size_chart_url)
+            chart_data = await read_size_chart(size_chart_url)
         except Exception as e:
-            print(f"OCR failed: {e}")
-            # Fall back to mock data
+            raise SizeChartError("Size chart could not be read") from e
 
     # If no external data, try to find in our mock database
     if not chart_data:
-        product_key = find_matching_key(product_title, MENS_CLOTHING)
-        if product_key and product_key in MENS_CLOTHING:
-            chart_data = MENS_CLOTHING[product_key].get("size_chart")
+        mens_clothing = (catalog or get_catalog()).mens_db(ProductCategory.CLOTHING)
+        product_key = await asyncio.to_thread(find_matching_key, product_title, mens_clothing)
+        if product_key and product_key in mens_clothing:
+            chart_data = mens_clothing[product_key].get("size_chart")
 
     if not chart_data:
         return None
@@ -292,51 +484,49 @@ async def get_size_recommendation(
     )
 
 
-def find_mens_clothing_equivalent(
+def _clothing_pair(catalog: CatalogRepository, womens_product_title: str) -> tuple[Optional[dict], Optional[dict]]:
+    """Resolve a women's clothing title and its men's equivalent (blocking catalog lookups)."""
+    # Find the women's product
+    womens_clothing = catalog.womens_db(ProductCategory.CLOTHING)
+    womens_key = find_matching_key(womens_product_title, womens_clothing)
+    if not womens_key:
+        return None, None
+
+    womens_product = womens_clothing[womens_key]
+
+    # Find matching men's product by brand and subcategory
+    candidates = catalog.mens_by_brand(womens_product.get("brand"), womens_product.get("subcategory"))
+    return womens_product, candidates[0] if candidates else None
+
+
+async def find_mens_clothing_equivalent(
     womens_product_title: str,
-    user_measurements: UserMeasurements
-) -> tuple[Optional[dict], Optional[SizeRecommendation]]:
+    user_measurements: UserMeasurements,
+    catalog: Optional[CatalogRepository] = None
+) -> tuple[Optional[dict], Optional[dict], Optional[SizeRecommendation]]:
     """
     Find a men's clothing equivalent and the right size for the user.
 
     This is the main function for the "Universal Fit Decoder" feature.
+    Catalog lookups run in a worker thread, so the event loop never waits
+    on them.
 
     Returns:
-        Tuple of (mens_product_info, size_recommendation)
+        Tuple of (womens_product, mens_product_info, size_recommendation)
     """
-    # Find the women's product
-    womens_key = find_matching_key(womens_product_title, WOMENS_CLOTHING)
-    if not womens_key:
-        return None, None
-
-    womens_product = WOMENS_CLOTHING[womens_key]
-
-    # Find matching men's product
-    mens_product = None
-    for mens_key, product in MENS_CLOTHING.items():
-        # Match by brand and subcategory
-        if (product.get("brand") == womens_product.get("brand") and
-            product.get("subcategory") == womens_product.get("subcategory")):
-            mens_product = product
-            break
+    catalog = catalog or get_catalog()
 
+    # Each step needs the one before: the men's search keys on the women's
+    # brand and subcategory, and the size on the men's chart
+    womens_product, mens_product = await asyncio.to_thread(_clothing_pair, catalog, womens_product_title)
     if not mens_product:
-        return None, None
+        return womens_product, None, None
 
-    # Get size recommendation
-    import asyncio
-    try:
-        loop = asyncio.get_event_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-
-    size_rec = loop.run_until_complete(
-        get_size_recommendation(
-            mens_product["title"],
-            user_measurements,
-            size_chart_data=mens_product.get("size_chart")
-        )
+    size_rec = await get_size_recommendation(
+        mens_product["title"],
+        user_measurements,
+        size_chart_data=mens_product.get("size_chart"),
+        catalog=catalog
     )
 
-    return mens_product, size_rec
+    return womens_product, mens_product, size_rec
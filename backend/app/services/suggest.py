@@ -0,0 +1,191 @@
+"""
+Typeahead product suggestions.
+
+A sorted-array prefix index over normalized product titles and brands, built
+with each catalog version. Every word start of a title is a key ("gillette
+venus razor", "venus razor", "razor"), so typing any word of a title finds it.
+
+Products are numbered by rank (largest known savings first), so the top
+suggestions for a prefix are just the smallest product numbers in its key
+range. Short prefixes, and any prefix whose range is too wide to rank per
+keystroke, have their top suggestions stored at build time; every other
+prefix bisects into the key array and ranks a short range.
+"""
+import heapq
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from .text import normalize_phrase
+
+# Prefixes up to this many characters always have their suggestions precomputed
+PRECOMPUTED_PREFIX_LENGTH = 3
+
+# Longer prefixes matching more keys than this are precomputed too
+MAX_SCAN_KEYS = 512
+
+# Suggestions kept per precomputed prefix, and the most a request can ask for
+MAX_SUGGESTIONS = 20
+
+# Sorts after any key starting with a given prefix
+_PREFIX_END = "\U0010ffff"
+
+
+class Suggestion(NamedTuple):
+    """One suggested product."""
+    product_id: str
+    title: str
+    side: str
+    category: Optional[str]
+    price: float
+    # Largest known saving against a cheaper equivalent (0 if none)
+    savings: float
+
+    def to_dict(self) -> dict:
+        return {
+            "product_id": self.product_id,
+            "title": self.title,
+            "side": self.side,
+            "category": self.category,
+            "price": self.price,
+            "savings_amount": round(self.savings, 2)
+        }
+
+
+def _catalog_suggestions(catalog) -> Iterator[tuple[Suggestion, Optional[str]]]:
+    """(suggestion, brand) for every product of a CatalogRepository, with its savings."""
+
+    def price_of(product_id: str) -> Optional[float]:
+        product = catalog.get_product(product_id)
+        return product["price"] if product is not None else None
+
+    # A men's product saves what its golden-pair partners overpay
+    mens_savings: dict[str, float] = {}
+    for pair in catalog.golden_pairs:
+        womens_price, mens_price = price_of(pair["womens_id"]), price_of(pair["mens_id"])
+        if womens_price is not None and mens_price is not None:
+            saving = max(womens_price - mens_price, 0.0)
+            mens_savings[pair["mens_id"]] = max(mens_savings.get(pair["mens_id"], 0.0), saving)
+
+    for page in catalog.iter_pages("womens"):
+        for product in page:
+            price = product["price"]
+            saving = 0.0
+
+            pair = catalog.golden_pair(product["id"])
+            mens_price = price_of(pair["mens_id"]) if pair else None
+            if mens_price is not None:
+                saving = max(saving, price - mens_price)
+
+            # Best precomputed match the shopper would be shown at this price
+            entry = catalog.match_table.get(product["id"])
+            for row in entry["matches"] if entry else ():
+                mens_price = price_of(row["mens_id"])
+                if mens_price is not None and mens_price < price:
+                    saving = max(saving, price - mens_price)
+                    break
+
+            yield Suggestion(
+                product["id"], product.get("title", ""), "womens", product.get("category"), price, saving
+            ), product.get("brand")
+
+    for page in catalog.iter_pages("mens"):
+        for product in page:
+            yield Suggestion(
+                product["id"], product.get("title", ""), "mens", product.get("category"),
+                product["price"], mens_savings.get(product["id"], 0.0)
+            ), product.get("brand")
+
+
+class SuggestIndex:
+    """Prefix index over product titles and brands, immutable once built."""
+
+    def __init__(self, suggestions: Iterable[tuple[Suggestion, Optional[str]]]):
+        ranked = sorted(
+            suggestions,
+            key=lambda item: (-item[0].savings, item[0].title.lower(), item[0].product_id)
+        )
+        self.suggestions = [suggestion for suggestion, _ in ranked]
+
+        entries = []
+        for number, (suggestion, brand) in enumerate(ranked):
+            words = normalize_phrase(suggestion.title).split()
+            keys = {" ".join(words[start:]) for start in range(len(words))}
+            if brand:
+                keys.add(normalize_phrase(brand))
+            keys.discard("")
+            entries.extend((key, number) for key in keys)
+        entries.sort()
+
+        self.keys = [key for key, _ in entries]
+        self.numbers = array("I", (number for _, number in entries))
+        self.top: dict[str, list[int]] = self._precompute()
+
+    @classmethod
+    def from_catalog(cls, catalog) -> "SuggestIndex":
+        """Index every product of a CatalogRepository, ranked by savings."""
+        return cls(_catalog_suggestions(catalog))
+
+    def _range(self, prefix: str, lo: int = 0, hi: Optional[int] = None) -> tuple[int, int]:
+        """Key positions [start, end) starting with `prefix`."""
+        hi = len(self.keys) if hi is None else hi
+        start = bisect_left(self.keys, prefix, lo, hi)
+        return start, bisect_left(self.keys, prefix + _PREFIX_END, start, hi)
+
+    def _precompute(self) -> dict[str, list[int]]:
+        """
+        Store the top suggestions of short and wide prefixes.
+
+        Walks the prefix tree one character at a time, only descending into
+        key ranges that are still short prefixes or too wide to rank per
+        request.
+        """
+        top = {}
+        ranges = [(0, len(self.keys))]
+        length = 1
+        while ranges:
+            wide = []
+            for lo, hi in ranges:
+                position = lo
+                while position < hi:
+                    key = self.keys[position]
+                    if len(key) < length:
+                        position += 1
+                        continue
+                    prefix = key[:length]
+                    start, end = self._range(prefix, position, hi)
+                    if length <= PRECOMPUTED_PREFIX_LENGTH or end - start > MAX_SCAN_KEYS:
+                        top[prefix] = heapq.nsmallest(MAX_SUGGESTIONS, set(self.numbers[start:end]))
+                        if length < PRECOMPUTED_PREFIX_LENGTH or end - start > MAX_SCAN_KEYS:
+                            wide.append((start, end))
+                    position = end
+            ranges = wide
+            length += 1
+        return top
+
+    def __len__(self) -> int:
+        return len(self.suggestions)
+
+    def suggest(self, prefix: str, limit: int = 10) -> list[Suggestion]:
+        """
+        Suggest products with a title word or brand starting with `prefix`.
+
+        Args:
+            prefix: What the user has typed so far (case and punctuation ignored)
+            limit: Maximum suggestions, capped at MAX_SUGGESTIONS
+
+        Returns:
+            Suggestions ranked by savings, then title
+        """
+        query = normalize_phrase(prefix)
+        if not query:
+            return []
+        limit = min(limit, MAX_SUGGESTIONS)
+
+        numbers = self.top.get(query)
+        if numbers is None:
+            if len(query) <= PRECOMPUTED_PREFIX_LENGTH:
+                return []
+            start, end = self._range(query)
+            numbers = heapq.nsmallest(limit, set(self.numbers[start:end]))
+        return [self.suggestions[number] for number in numbers[:limit]]
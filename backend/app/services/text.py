@@ -0,0 +1,48 @@
+"""
+Text normalization shared by the matching engine and its indexes.
+
+Anything that is compared across products (ingredients, title words) goes
+through these helpers so that catalog-side and query-side tokens agree.
+"""
+import re
+
+
+# Common filler words ignored when comparing titles
+STOP_WORDS = frozenset({'the', 'a', 'an', 'and', 'or', 'for', 'with', 'in', 'of', 'to'})
+
+_WORD_RE = re.compile(r'\w+')
+_WHITESPACE_RE = re.compile(r'\s+')
+_NUMBER_RE = re.compile(r'\d+%?\s*')
+_NON_WORD_RE = re.compile(r'[\W_]+')
+
+
+def normalize_ingredient(ingredient: str) -> str:
+    """Normalize an ingredient string for comparison."""
+    # Lowercase, remove extra whitespace, remove common filler words
+    normalized = ingredient.lower().strip()
+    normalized = _WHITESPACE_RE.sub(' ', normalized)
+    # Remove percentages and numbers
+    normalized = _NUMBER_RE.sub('', normalized)
+    return normalized
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into its meaningful lowercase words, repeats included."""
+    words = (w.lower() for w in _WORD_RE.findall(text))
+    return [w for w in words if w not in STOP_WORDS]
+
+
+def tokenize_title(title: str) -> set[str]:
+    """Extract the meaningful lowercase words from a product title."""
+    return set(tokenize(title))
+
+
+def normalize_retailer(retailer: str) -> str:
+    """Normalize a retailer name ("H&M", "hm.com", "American Eagle") to a bare lowercase key."""
+    normalized = retailer.strip().lower().removesuffix('.com')
+    return _NON_WORD_RE.sub('', normalized)
+
+
+def normalize_phrase(text: str) -> str:
+    """Lowercase the words of a text and join them with single spaces (stop words kept)."""
+    return " ".join(w.lower() for w in _WORD_RE.findall(text))
@@ -0,0 +1,955 @@
+"""
+Memory-mapped binary catalog snapshots.
+
+A snapshot is one file holding everything a worker needs to serve the
+catalog: the columnar product columns (see columnar.py), a sorted string
+table, id and category lookups, id-sorted listings, the men's match indexes (feature token
+lists, postings and price-sorted subcategory scopes), the key matchers behind
+find_matching_key (automaton tables and string postings), and the BM25 search,
+facet and suggest indexes (posting lists, per-value product positions and
+ranked prefix keys). Workers mmap it
+read-only and wrap the sections in memoryviews, so opening a snapshot costs a
+header parse whatever the catalog size, and every worker on a host shares the
+same page-cache pages instead of holding its own copy.
+
+Layout (native byte order, recorded in the header):
+
+    magic (8 bytes) | header length (uint64) | header JSON | sections...
+
+Each section is a typed array aligned to 8 bytes; the header maps section
+names to (offset, length, typecode) and carries the small non-array metadata.
+
+Build a snapshot with:
+    python -m app.snapshot --output catalog.snap
+    python -m app.snapshot --output catalog.snap --sqlite catalog.db
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterator, Mapping, Optional, Sequence
+
+from .catalog import (
+    CatalogRepository, CatalogStore, LSH_BANDS, LSH_ROWS, MATCH_TABLE_PATH, MATCHING_MODE, next_version
+)
+from .columnar import ColumnarProducts, StringPool
+from .models import ProductCategory
+from .services.automaton import KEYS, TITLES, AhoCorasick, KeyMatcher, get_key_matcher
+from .services.facets import FACETS, FacetIndex, iter_bits
+from .services.features import ProductFeatures
+from .services.index import CatalogIndex, PriceScope
+from .services.precompute import read_match_table
+from .services.search import SearchIndex
+from .services.suggest import Suggestion, SuggestIndex
+
+MAGIC = b"PVSNAP\x00\x01"
+SNAPSHOT_FORMAT = 5
+
+_ALIGN = 8
+_HEADER_LENGTH = struct.Struct("<Q")
+
+PARTITIONS = ("womens_products", "mens_products", "womens_clothing", "mens_clothing")
+MATCH_PARTITIONS = ("mens_products", "mens_clothing")
+FEATURE_LISTS = ("title_tokens", "ingredients", "first_3")
+TERM_KINDS = ("title", "ingredient", "brand", "retailer")
+
+# Product references in lookups: side code + position in that side's merged order
+_SIDES = ("womens", "mens")
+
+# Key matcher channels by section name
+_CHANNELS = (("keys", KEYS), ("titles", TITLES))
+
+
+class StringTable(Sequence):
+    """
+    Packed UTF-8 string table; a string's id is its position.
+
+    Tables written in sort order support find() and bisect_right().
+    """
+
+    def __init__(self, blob: Sequence[int], offsets: Sequence[int]):
+        self._blob = blob
+        self._offsets = offsets
+
+    def raw(self, string_id: int) -> bytes:
+        return bytes(self._blob[self._offsets[string_id]:self._offsets[string_id + 1]])
+
+    def __getitem__(self, string_id: int) -> str:
+        return self.raw(string_id).decode("utf-8")
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def find(self, value: str) -> Optional[int]:
+        """Binary search for a string's id."""
+        target = value.encode("utf-8")
+        position = bisect_left(range(len(self)), target, key=self.raw)
+        if position < len(self) and self.raw(position) == target:
+            return position
+        return None
+
+    def bisect_right(self, value: str) -> int:
+        """Count of strings sorting at or before `value`."""
+        return bisect_right(range(len(self)), value.encode("utf-8"), key=self.raw)
+
+
+class _LazySequence(Sequence):
+    """Read-only sequence computing items on access."""
+
+    def __init__(self, length: int, getter):
+        self._length = length
+        self._getter = getter
+
+    def __getitem__(self, index: int):
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        return self._getter(index)
+
+    def __len__(self) -> int:
+        return self._length
+
+
+# =============================================================================
+# Builder
+# =============================================================================
+
+class _SnapshotWriter:
+    """Collects named typed sections and writes them behind a JSON header."""
+
+    def __init__(self):
+        self.sections: dict[str, tuple[str, bytes]] = {}
+
+    def add(self, name: str, buffer):
+        if isinstance(buffer, (bytes, bytearray)):
+            self.sections[name] = ("B", bytes(buffer))
+        else:
+            self.sections[name] = (buffer.typecode, buffer.tobytes())
+
+    def write(self, path: str, meta: dict):
+        # Section offsets are relative to the first aligned byte after the header
+        index = {}
+        offset = 0
+        for name, (typecode, data) in self.sections.items():
+            index[name] = [offset, len(data), typecode]
+            offset = _align(offset + len(data))
+        header = json.dumps({**meta, "sections": index}).encode("utf-8")
+        base = _align(len(MAGIC) + _HEADER_LENGTH.size + len(header))
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(_HEADER_LENGTH.pack(len(header)))
+            f.write(header)
+            for name, (_, data) in self.sections.items():
+                f.write(b"\x00" * (base + index[name][0] - f.tell()))
+                f.write(data)
+        os.replace(tmp_path, path)
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _running_offsets(lengths) -> array:
+    offsets = array("Q", [0])
+    for length in lengths:
+        offsets.append(offsets[-1] + length)
+    return offsets
+
+
+def _packed_strings(strings: Sequence[str]) -> tuple[bytearray, array]:
+    blob = bytearray()
+    offsets = array("Q", [0])
+    for string in strings:
+        blob += string.encode("utf-8")
+        offsets.append(len(blob))
+    return blob, offsets
+
+
+def _utf8(string: str) -> bytes:
+    return string.encode("utf-8")
+
+
+def _add_string_postings(writer: _SnapshotWriter, name: str, postings: Mapping[str, Sequence[int]]):
+    """Write string -> ordinals postings as a sorted term table, offsets and ordinals."""
+    terms = sorted(postings, key=_utf8)
+    blob, offsets = _packed_strings(terms)
+    writer.add(f"{name}.terms.blob", blob)
+    writer.add(f"{name}.terms.offsets", offsets)
+    writer.add(f"{name}.offsets", _running_offsets(len(postings[term]) for term in terms))
+    writer.add(f"{name}.ordinals", array("I", (o for term in terms for o in postings[term])))
+
+
+def _write_key_matcher(writer: _SnapshotWriter, prefix: str, matcher: KeyMatcher):
+    """Write a key matcher: automaton node tables, lowercased titles and string postings."""
+    automaton = matcher.automaton
+    edges = [sorted((ord(char), child) for char, child in goto.items()) for goto in automaton.goto]
+    writer.add(f"{prefix}.automaton.offsets", _running_offsets(len(node) for node in edges))
+    writer.add(f"{prefix}.automaton.chars", array("I", (code for node in edges for code, _ in node)))
+    writer.add(f"{prefix}.automaton.targets", array("I", (child for node in edges for _, child in node)))
+    writer.add(f"{prefix}.automaton.fail", array("I", automaton.fail))
+    # Ranks per node and channel; -1 where no pattern ends
+    writer.add(f"{prefix}.automaton.ranks", array("i", (
+        -1 if rank is None else rank for ranks in automaton.ranks for rank in ranks
+    )))
+
+    blob, offsets = _packed_strings(matcher.titles)
+    writer.add(f"{prefix}.titles.blob", blob)
+    writer.add(f"{prefix}.titles.offsets", offsets)
+    for name, channel in _CHANNELS:
+        _add_string_postings(writer, f"{prefix}.grams.{name}", matcher.gram_postings[channel])
+        first_short = matcher.first_short[channel]
+        strings = sorted(first_short, key=_utf8)
+        blob, offsets = _packed_strings(strings)
+        writer.add(f"{prefix}.short.{name}.blob", blob)
+        writer.add(f"{prefix}.short.{name}.offsets", offsets)
+        writer.add(f"{prefix}.short.{name}.firsts", array("I", (first_short[string] for string in strings)))
+    _add_string_postings(writer, f"{prefix}.words", matcher.word_postings)
+    _add_string_postings(writer, f"{prefix}.tokens", matcher.token_postings)
+    writer.add(f"{prefix}.title_token_counts", matcher.title_token_counts)
+
+
+def _write_suggest_index(writer: _SnapshotWriter, index: SuggestIndex) -> dict:
+    """Write ranked suggestions, sorted prefix keys and precomputed top lists; returns header metadata."""
+    suggestions = index.suggestions
+    categories = sorted({s.category for s in suggestions}, key=lambda category: (category is not None, category or ""))
+    category_codes = {category: code for code, category in enumerate(categories)}
+
+    for name, strings in (
+        ("ids", [s.product_id for s in suggestions]),
+        ("titles", [s.title for s in suggestions]),
+        ("keys", index.keys)
+    ):
+        blob, offsets = _packed_strings(strings)
+        writer.add(f"suggest.{name}.blob", blob)
+        writer.add(f"suggest.{name}.offsets", offsets)
+    writer.add("suggest.sides", array("B", (_SIDES.index(s.side) for s in suggestions)))
+    writer.add("suggest.categories", array("H", (category_codes[s.category] for s in suggestions)))
+    writer.add("suggest.prices", array("d", (s.price for s in suggestions)))
+    writer.add("suggest.savings", array("d", (s.savings for s in suggestions)))
+    writer.add("suggest.numbers", index.numbers)
+    _add_string_postings(writer, "suggest.top", index.top)
+    return {"categories": categories}
+
+
+def build_snapshot(catalog: CatalogStore, path: str) -> dict:
+    """
+    Write a snapshot of an in-memory catalog.
+
+    Returns:
+        Summary counts for reporting
+    """
+    writer = _SnapshotWriter()
+    pool = StringPool()
+
+    # Intern everything first; string ids are renumbered into sort order below
+    partitions = {name: ColumnarProducts(getattr(catalog, name), pool) for name in PARTITIONS}
+
+    indexes = {}
+    for name in MATCH_PARTITIONS:
+        category = ProductCategory.CLOTHING if name == "mens_clothing" else ProductCategory.PERSONAL_CARE
+        index = catalog.mens_index(category)
+        features = {
+            field: [[pool.intern(token) for token in getattr(f, field)] for f in index.features]
+            for field in FEATURE_LISTS
+        }
+        postings = {kind: [] for kind in TERM_KINDS}
+        for (kind, token), ordinals in index.postings.items():
+            postings[kind].append((pool.intern(token), ordinals))
+        indexes[name] = (index, features, postings)
+
+    order = sorted(range(len(pool)), key=lambda string_id: pool[string_id].encode("utf-8"))
+    renumber = array("I", [0] * len(pool))
+    for new_id, old_id in enumerate(order):
+        renumber[old_id] = new_id
+
+    blob, offsets = _packed_strings([pool[old_id] for old_id in order])
+    writer.add("strings.blob", blob)
+    writer.add("strings.offsets", offsets)
+
+    partition_meta = {}
+    for name, products in partitions.items():
+        for column, buffer in products.columns().items():
+            if column.startswith("symbols.") or (column.startswith("lists.") and column.endswith(".ids")):
+                buffer = array("I", (renumber[string_id] for string_id in buffer))
+            writer.add(f"{name}.{column}", buffer)
+        partition_meta[name] = products.metadata()
+
+    # Match indexes: feature token lists, postings sorted by string id, price scopes
+    index_meta = {}
+    for name, (index, features, postings) in indexes.items():
+        prefix = f"{name}.index"
+
+        for field, token_lists in features.items():
+            writer.add(f"{prefix}.{field}.ids", array("I", (
+                string_id for ids in token_lists for string_id in sorted(renumber[i] for i in ids)
+            )))
+            writer.add(f"{prefix}.{field}.offsets", _running_offsets(len(ids) for ids in token_lists))
+
+        for kind, entries in postings.items():
+            entries.sort(key=lambda entry: renumber[entry[0]])
+            writer.add(f"{prefix}.postings.{kind}.terms", array("I", (renumber[i] for i, _ in entries)))
+            writer.add(f"{prefix}.postings.{kind}.offsets", _running_offsets(len(o) for _, o in entries))
+            writer.add(f"{prefix}.postings.{kind}.ordinals", array("I", (o for _, ordinals in entries for o in ordinals)))
+
+        scopes, by_price, prices = [], array("I"), array("d")
+        scope_of = array("I", [0] * len(index))
+        for scope_id, (subcategory, scope) in enumerate(index.subcategories.items()):
+            scopes.append([subcategory, len(by_price), len(by_price) + len(scope)])
+            by_price.extend(scope.by_price)
+            prices.extend(scope.prices)
+            for ordinal in scope:
+                scope_of[ordinal] = scope_id
+        writer.add(f"{prefix}.scopes.by_price", by_price)
+        writer.add(f"{prefix}.scopes.prices", prices)
+        writer.add(f"{prefix}.scopes.scope_of", scope_of)
+        writer.add(f"{prefix}.everything.by_price", array("I", index.everything.by_price))
+        writer.add(f"{prefix}.everything.prices", array("d", index.everything.prices))
+        index_meta[name] = {"scopes": scopes}
+
+    # Product references: position in the side's merged (products, then clothing) order
+    def reference(side: str, key: str) -> int:
+        products, clothing = partitions[f"{side}_products"], partitions[f"{side}_clothing"]
+        ordinal = clothing.ordinal_of(key)
+        return len(products) + ordinal if ordinal is not None else products.ordinal_of(key)
+
+    groups: dict[tuple, list[int]] = {}
+    by_id: dict[str, tuple[int, int]] = {}
+    for side_code, side in enumerate(_SIDES):
+        merged = catalog.all_womens if side == "womens" else catalog.all_mens
+        for key, product in merged.items():
+            ref = reference(side, key)
+            category, subcategory = product.get("category"), product.get("subcategory")
+            by_id[product["id"]] = (side_code, ref)
+            groups.setdefault((side, "all"), []).append(ref)
+            groups.setdefault((side, "category", category), []).append(ref)
+            groups.setdefault((side, "subcategory", category, subcategory), []).append(ref)
+            if side == "mens":
+                groups.setdefault((side, "brand", product.get("brand"), subcategory), []).append(ref)
+
+    group_meta, group_refs = [], array("I")
+    for group, refs in groups.items():
+        group_meta.append([list(group), len(group_refs), len(group_refs) + len(refs)])
+        group_refs.extend(refs)
+    writer.add("groups.refs", group_refs)
+
+    ids = sorted(by_id, key=lambda product_id: product_id.encode("utf-8"))
+    blob, offsets = _packed_strings(ids)
+    writer.add("ids.blob", blob)
+    writer.add("ids.offsets", offsets)
+    writer.add("ids.side", array("B", (by_id[i][0] for i in ids)))
+    writer.add("ids.ref", array("I", (by_id[i][1] for i in ids)))
+
+    # Listings: positions in the id table (so already in id order) per side and category
+    id_position = {product_id: position for position, product_id in enumerate(ids)}
+    listings: dict[tuple, list[int]] = {}
+    for side in _SIDES:
+        merged = catalog.all_womens if side == "womens" else catalog.all_mens
+        for product in merged.values():
+            position = id_position[product["id"]]
+            listings.setdefault((side, "all"), []).append(position)
+            if product.get("category"):
+                listings.setdefault((side, "category", product["category"]), []).append(position)
+
+    listing_meta, listing_positions = [], array("I")
+    for group, positions in listings.items():
+        listing_meta.append([list(group), len(listing_positions), len(listing_positions) + len(positions)])
+        listing_positions.extend(sorted(positions))
+    writer.add("listings.positions", listing_positions)
+
+    # Search and facet indexes, so workers don't rebuild them from every product
+    search, facets = catalog.search_index, catalog.facet_index
+
+    terms = sorted(search.postings, key=lambda term: term.encode("utf-8"))
+    blob, offsets = _packed_strings(terms)
+    writer.add("search.terms.blob", blob)
+    writer.add("search.terms.offsets", offsets)
+    writer.add("search.offsets", _running_offsets(len(search.postings[term][0]) for term in terms))
+    writer.add("search.docs", array("I", (doc for term in terms for doc in search.postings[term][0])))
+    writer.add("search.impacts", array("f", (impact for term in terms for impact in search.postings[term][1])))
+    writer.add("search.max_impacts", array("f", (search.max_impacts[term] for term in terms)))
+    writer.add("search.positions", search.positions)
+
+    # Facet ids are in listing order (id order within each side), not globally sorted
+    blob, offsets = _packed_strings(facets.ids)
+    writer.add("facets.ids.blob", blob)
+    writer.add("facets.ids.offsets", offsets)
+    for facet in FACETS:
+        values = sorted(facets.bitsets[facet], key=lambda value: value.encode("utf-8"))
+        members = [list(iter_bits(facets.bitsets[facet][value])) for value in values]
+        blob, offsets = _packed_strings(values)
+        writer.add(f"facets.{facet}.values.blob", blob)
+        writer.add(f"facets.{facet}.values.offsets", offsets)
+        writer.add(f"facets.{facet}.offsets", _running_offsets(len(positions) for positions in members))
+        writer.add(f"facets.{facet}.positions", array("I", (p for positions in members for p in positions)))
+
+    # Key matchers, so workers don't each build an automaton on their first match
+    for name in PARTITIONS:
+        _write_key_matcher(writer, f"{name}.matcher", get_key_matcher(getattr(catalog, name)))
+
+    # Suggestions are ranked with the match table attached to the catalog, if any
+    suggest_meta = _write_suggest_index(writer, catalog.suggest_index)
+    suggest_meta["match_table"] = catalog.match_table_generated_at
+
+    writer.write(path, {
+        "format": SNAPSHOT_FORMAT,
+        "byteorder": sys.byteorder,
+        "built_at": time.time(),
+        "partitions": partition_meta,
+        "indexes": index_meta,
+        "groups": group_meta,
+        "listings": listing_meta,
+        "search": {"categories": search.categories},
+        "facets": {"sides": facets.sides},
+        "suggest": suggest_meta,
+        "golden_pairs": catalog.golden_pairs
+    })
+
+    return {"products": len(by_id), "strings": len(pool), "bytes": os.path.getsize(path)}
+
+
+# =============================================================================
+# Reader
+# =============================================================================
+
+class _SnapshotScope(PriceScope):
+    """Price-sorted subcategory scope over snapshot sections."""
+
+    def __init__(self, by_price: Sequence[int], prices: Sequence[float], scope_of: Optional[Sequence[int]], scope_id: int):
+        self.by_price = by_price
+        self.prices = prices
+        self._scope_of = scope_of
+        self._scope_id = scope_id
+
+    def __contains__(self, ordinal: int) -> bool:
+        if self._scope_of is None:
+            return 0 <= ordinal < len(self.by_price)
+        return self._scope_of[ordinal] == self._scope_id
+
+
+class _SnapshotPostings:
+    """Posting lists looked up by (kind, token) through the string table."""
+
+    def __init__(self, strings: StringTable, sections: dict[str, dict[str, Sequence[int]]]):
+        self._strings = strings
+        self._sections = sections
+
+    def get(self, term: tuple[str, str], default=()):
+        kind, token = term
+        sections = self._sections.get(kind)
+        string_id = self._strings.find(token) if sections else None
+        if string_id is None:
+            return default
+
+        terms = sections["terms"]
+        position = bisect_left(terms, string_id)
+        if position == len(terms) or terms[position] != string_id:
+            return default
+        offsets = sections["offsets"]
+        return sections["ordinals"][offsets[position]:offsets[position + 1]]
+
+
+class SnapshotIndex(CatalogIndex):
+    """Match candidate index served from snapshot sections; nothing is built at load."""
+
+    def __init__(self, products: ColumnarProducts, strings: StringTable, section, meta: dict):
+        size = len(products)
+        self._products = products
+        self._strings = strings
+        self._features = {
+            field: (section(f"{field}.ids"), section(f"{field}.offsets")) for field in FEATURE_LISTS
+        }
+
+        self.keys = _LazySequence(size, products.key_at)
+        self.products = _LazySequence(size, products.product_at)
+        self.features = _LazySequence(size, self._feature_at)
+        self.prices = products.columns()["numbers.price"]
+        self.postings = _SnapshotPostings(strings, {
+            kind: {
+                part: section(f"postings.{kind}.{part}") for part in ("terms", "offsets", "ordinals")
+            }
+            for kind in TERM_KINDS
+        })
+
+        by_price, prices, scope_of = section("scopes.by_price"), section("scopes.prices"), section("scopes.scope_of")
+        self.subcategories = {
+            subcategory: _SnapshotScope(by_price[start:end], prices[start:end], scope_of, scope_id)
+            for scope_id, (subcategory, start, end) in enumerate(meta["scopes"])
+        }
+        self.everything = _SnapshotScope(section("everything.by_price"), section("everything.prices"), None, 0)
+        self.lsh = None
+        self.retailer_scopes = {}
+
+    def _tokens(self, field: str, ordinal: int) -> frozenset[str]:
+        ids, offsets = self._features[field]
+        return frozenset(self._strings[i] for i in ids[offsets[ordinal]:offsets[ordinal + 1]])
+
+    def _feature_at(self, ordinal: int) -> ProductFeatures:
+        product = self._products.product_at(ordinal)
+        brand = product.get("brand")
+        return ProductFeatures(
+            ingredients=self._tokens("ingredients", ordinal),
+            first_3=self._tokens("first_3", ordinal),
+            title_tokens=self._tokens("title_tokens", ordinal),
+            brand=(brand or "").lower(),
+            brand_raw=brand,
+            attributes=product.get("attributes")
+        )
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+
+class _SnapshotSearchPostings:
+    """BM25 posting lists and largest impacts, looked up by term through a sorted term table."""
+
+    def __init__(self, terms: StringTable, section):
+        self._terms = terms
+        self._offsets = section("offsets")
+        self._docs = section("docs")
+        self._impacts = section("impacts")
+        self._max_impacts = section("max_impacts")
+
+    def get(self, term: str, default=None):
+        number = self._terms.find(term)
+        if number is None:
+            return default
+        start, end = self._offsets[number], self._offsets[number + 1]
+        return self._docs[start:end], self._impacts[start:end]
+
+    def max_impact(self, term: str) -> float:
+        number = self._terms.find(term)
+        if number is None:
+            raise KeyError(term)
+        return self._max_impacts[number]
+
+
+class _TermLookup:
+    """Read-only term -> value mapping backed by a lookup function."""
+
+    def __init__(self, lookup):
+        self._lookup = lookup
+
+    def __getitem__(self, term: str):
+        return self._lookup(term)
+
+
+class SnapshotSearchIndex(SearchIndex):
+    """BM25 index served from snapshot sections; nothing is built at load."""
+
+    def __init__(self, ids: Sequence[str], section, meta: dict):
+        """
+        Args:
+            ids: Product ids by input position (the facet index ids)
+            section: Section getter for the search.* sections
+            meta: Header metadata written with the sections
+        """
+        positions = self.positions = section("positions")
+        self.ids = _LazySequence(len(positions), lambda doc: ids[positions[doc]])
+        self.categories = {category: tuple(bounds) for category, bounds in meta["categories"].items()}
+        self.postings = _SnapshotSearchPostings(
+            StringTable(section("terms.blob"), section("terms.offsets")), section
+        )
+        self.max_impacts = _TermLookup(self.postings.max_impact)
+
+
+class _SnapshotBitsets(Mapping):
+    """One facet's value -> bitset mapping; bitsets are packed from stored positions on first use."""
+
+    def __init__(self, values: StringTable, offsets: Sequence[int], positions: Sequence[int], pack):
+        self._values = values
+        self._offsets = offsets
+        self._positions = positions
+        self._pack = pack
+        self._bitsets: dict[str, int] = {}
+
+    def _bitset(self, number: int) -> int:
+        value = self._values[number]
+        bitset = self._bitsets.get(value)
+        if bitset is None:
+            members = self._positions[self._offsets[number]:self._offsets[number + 1]]
+            bitset = self._bitsets[value] = self._pack(members)
+        return bitset
+
+    def __getitem__(self, value: str) -> int:
+        number = self._values.find(value)
+        if number is None:
+            raise KeyError(value)
+        return self._bitset(number)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def items(self) -> Iterator[tuple[str, int]]:
+        for number in range(len(self._values)):
+            yield self._values[number], self._bitset(number)
+
+
+class SnapshotFacetIndex(FacetIndex):
+    """Facet index served from snapshot sections; each value's bitset is packed on first use."""
+
+    def __init__(self, section, meta: dict):
+        self.ids = StringTable(section("ids.blob"), section("ids.offsets"))
+        self.sides = {side: tuple(bounds) for side, bounds in meta["sides"].items()}
+        self.bitsets = {
+            facet: _SnapshotBitsets(
+                StringTable(section(f"{facet}.values.blob"), section(f"{facet}.values.offsets")),
+                section(f"{facet}.offsets"), section(f"{facet}.positions"), self.bitset_of
+            )
+            for facet in FACETS
+        }
+        self.everything = (1 << len(self.ids)) - 1
+        self.side_bitsets = {
+            side: ((1 << end) - 1) ^ ((1 << start) - 1) for side, (start, end) in self.sides.items()
+        }
+
+
+class _StringPostings:
+    """Ordinal posting lists looked up by string through a sorted term table."""
+
+    def __init__(self, section):
+        self._terms = StringTable(section("terms.blob"), section("terms.offsets"))
+        self._offsets = section("offsets")
+        self._ordinals = section("ordinals")
+
+    def get(self, term: str, default=None):
+        number = self._terms.find(term)
+        if number is None:
+            return default
+        return self._ordinals[self._offsets[number]:self._offsets[number + 1]]
+
+
+class _StringLookup:
+    """Read-only string -> number mapping over a sorted string table."""
+
+    def __init__(self, strings: StringTable, values: Sequence[int]):
+        self._strings = strings
+        self._values = values
+
+    def get(self, string: str, default=None):
+        number = self._strings.find(string)
+        return self._values[number] if number is not None else default
+
+
+class _SnapshotAutomaton(AhoCorasick):
+    """Aho-Corasick automaton walked over snapshot node tables (edges sorted by code point)."""
+
+    def __init__(self, section, channels: int = 2):
+        self.channels = channels
+        self._offsets = section("offsets")
+        self._chars = section("chars")
+        self._targets = section("targets")
+        self._fail = section("fail")
+        self._ranks = section("ranks")
+
+    def _child(self, node: int, code: int) -> int:
+        """Node reached from `node` on a character, or 0 (the root) if there is no edge."""
+        start, end = self._offsets[node], self._offsets[node + 1]
+        position = bisect_left(self._chars, code, start, end)
+        return self._targets[position] if position < end and self._chars[position] == code else 0
+
+    def first(self, text: str) -> list[Optional[int]]:
+        """Get the lowest rank of any pattern occurring in the text, per channel."""
+        channels, ranks = self.channels, self._ranks
+        best = [rank if rank >= 0 else None for rank in ranks[:channels]]
+        node = 0
+        for char in text:
+            code = ord(char)
+            child = self._child(node, code)
+            while not child and node:
+                node = self._fail[node]
+                child = self._child(node, code)
+            node = child
+            for channel in range(channels):
+                rank = ranks[node * channels + channel]
+                if rank >= 0 and (best[channel] is None or rank < best[channel]):
+                    best[channel] = rank
+        return best
+
+
+class SnapshotKeyMatcher(KeyMatcher):
+    """Key matcher served from snapshot sections; nothing is built at load."""
+
+    def __init__(self, products: ColumnarProducts, section):
+        self.products = products
+        self.size = len(products)
+        self.keys = _LazySequence(self.size, products.key_at)
+        self.titles = StringTable(section("titles.blob"), section("titles.offsets"))
+        self.automaton = _SnapshotAutomaton(lambda name: section(f"automaton.{name}"))
+
+        self.gram_postings = {}
+        self.first_short = {}
+        for name, channel in _CHANNELS:
+            self.gram_postings[channel] = _StringPostings(lambda part, name=name: section(f"grams.{name}.{part}"))
+            self.first_short[channel] = _StringLookup(
+                StringTable(section(f"short.{name}.blob"), section(f"short.{name}.offsets")),
+                section(f"short.{name}.firsts")
+            )
+
+        self.word_postings = _StringPostings(lambda part: section(f"words.{part}"))
+        self.token_postings = _StringPostings(lambda part: section(f"tokens.{part}"))
+        self.title_token_counts = section("title_token_counts")
+
+
+class SnapshotSuggestIndex(SuggestIndex):
+    """Suggest index served from snapshot sections; nothing is built at load."""
+
+    def __init__(self, section, meta: dict):
+        ids = StringTable(section("ids.blob"), section("ids.offsets"))
+        titles = StringTable(section("titles.blob"), section("titles.offsets"))
+        sides, categories = section("sides"), section("categories")
+        prices, savings = section("prices"), section("savings")
+        names = meta["categories"]
+
+        self.suggestions = _LazySequence(len(ids), lambda number: Suggestion(
+            ids[number], titles[number], _SIDES[sides[number]], names[categories[number]],
+            prices[number], savings[number]
+        ))
+        self.keys = StringTable(section("keys.blob"), section("keys.offsets"))
+        self.numbers = section("numbers")
+        self.top = _StringPostings(lambda part: section(f"top.{part}"))
+
+
+class SnapshotCatalog(CatalogRepository):
+    """Read-only catalog over a memory-mapped snapshot file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.version = next_version()
+
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a catalog snapshot: {path}")
+
+        (header_length,) = _HEADER_LENGTH.unpack_from(self._mmap, len(MAGIC))
+        header_start = len(MAGIC) + _HEADER_LENGTH.size
+        header = json.loads(self._mmap[header_start:header_start + header_length])
+        if header.get("format") != SNAPSHOT_FORMAT or header.get("byteorder") != sys.byteorder:
+            raise ValueError(f"Unsupported snapshot format or byte order: {path}")
+
+        view = memoryview(self._mmap)
+        sections = header["sections"]
+        base = _align(header_start + header_length)
+
+        def section(name: str) -> memoryview:
+            offset, length, typecode = sections[name]
+            return view[base + offset:base + offset + length].cast(typecode)
+
+        self.strings = StringTable(section("strings.blob"), section("strings.offsets"))
+
+        for name in PARTITIONS:
+            meta = header["partitions"][name]
+            prefix = f"{name}."
+            columns = {
+                column[len(prefix):]: section(column) for column in sections if column.startswith(prefix)
+                and not column.startswith((f"{name}.index.", f"{name}.matcher."))
+            }
+            products = ColumnarProducts.from_columns(columns, meta, self.strings)
+            # Picked up by get_key_matcher instead of building an automaton per worker
+            products.key_matcher = SnapshotKeyMatcher(
+                products, lambda part, name=name: section(f"{name}.matcher.{part}")
+            )
+            setattr(self, name, products)
+
+        self.mens_products_index = SnapshotIndex(
+            self.mens_products, self.strings,
+            lambda name: section(f"mens_products.index.{name}"), header["indexes"]["mens_products"]
+        )
+        self.mens_clothing_index = SnapshotIndex(
+            self.mens_clothing, self.strings,
+            lambda name: section(f"mens_clothing.index.{name}"), header["indexes"]["mens_clothing"]
+        )
+        if MATCHING_MODE == "lsh":
+            self.mens_products_index.build_lsh(LSH_BANDS, LSH_ROWS)
+            self.mens_clothing_index.build_lsh(LSH_BANDS, LSH_ROWS)
+
+        self._group_refs = section("groups.refs")
+        self._groups = {tuple(group): (start, end) for group, start, end in header["groups"]}
+        self._ids = StringTable(section("ids.blob"), section("ids.offsets"))
+        self._id_sides = section("ids.side")
+        self._id_refs = section("ids.ref")
+        self._listing_positions = section("listings.positions")
+        self._listings = {tuple(group): (start, end) for group, start, end in header["listings"]}
+
+        # Search, facet and suggest indexes come from the file too
+        self._facet_index = SnapshotFacetIndex(lambda name: section(f"facets.{name}"), header["facets"])
+        self._search_index = SnapshotSearchIndex(
+            self._facet_index.ids, lambda name: section(f"search.{name}"), header["search"]
+        )
+        # Stored suggestions are only used with the match table they were ranked with
+        self._stored_suggest_index = SnapshotSuggestIndex(lambda name: section(f"suggest.{name}"), header["suggest"])
+        self._suggest_match_table = header["suggest"]["match_table"]
+        self.attach_match_table(None)
+
+        self.golden_pairs = header["golden_pairs"]
+        self._golden_by_womens_id: dict[str, dict] = {}
+        for pair in self.golden_pairs:
+            self._golden_by_womens_id.setdefault(pair["womens_id"], pair)
+
+    def attach_match_table(self, table: Optional[dict]):
+        """Attach a match table; suggestions ranked with a different one are rebuilt on first use."""
+        super().attach_match_table(table)
+        if self.match_table_generated_at == self._suggest_match_table:
+            self._suggest_index = self._stored_suggest_index
+        else:
+            self._suggest_index = None
+
+    # -------------------------------------------------------------------------
+    # References
+    # -------------------------------------------------------------------------
+
+    def _resolve(self, side: str, ref: int) -> tuple[str, dict]:
+        products, clothing = getattr(self, f"{side}_products"), getattr(self, f"{side}_clothing")
+        if ref >= len(products):
+            return clothing.key_at(ref - len(products)), clothing.product_at(ref - len(products))
+        return products.key_at(ref), products.product_at(ref)
+
+    def _group(self, *group) -> list[dict]:
+        start, end = self._groups.get(group, (0, 0))
+        side = group[0]
+        return [self._resolve(side, ref)[1] for ref in self._group_refs[start:end]]
+
+    def _by_id(self, product_id: str) -> Optional[tuple[str, dict]]:
+        position = self._ids.find(product_id)
+        if position is None:
+            return None
+        return self._resolve(_SIDES[self._id_sides[position]], self._id_refs[position])
+
+    # -------------------------------------------------------------------------
+    # Per-category product databases
+    # -------------------------------------------------------------------------
+
+    def womens_db(self, category: ProductCategory) -> ColumnarProducts:
+        """Get the women's product mapping searched for a product category."""
+        return self.womens_clothing if category == ProductCategory.CLOTHING else self.womens_products
+
+    def mens_db(self, category: ProductCategory) -> ColumnarProducts:
+        """Get the men's product mapping searched for a product category."""
+        return self.mens_clothing if category == ProductCategory.CLOTHING else self.mens_products
+
+    def mens_index(self, category: ProductCategory) -> CatalogIndex:
+        """Get the match candidate index over the men's products for a category."""
+        if category == ProductCategory.CLOTHING:
+            return self.mens_clothing_index
+        return self.mens_products_index
+
+    # -------------------------------------------------------------------------
+    # Lookups
+    # -------------------------------------------------------------------------
+
+    def get_product(self, product_id: str) -> Optional[dict]:
+        """Get any product by id."""
+        entry = self._by_id(product_id)
+        return entry[1] if entry else None
+
+    def get_key(self, product_id: str) -> Optional[str]:
+        """Get the catalog key of a product by id."""
+        entry = self._by_id(product_id)
+        return entry[0] if entry else None
+
+    def get_womens(self, key: str) -> Optional[dict]:
+        """Get a women's product by catalog key."""
+        product = self.womens_clothing.get(key)
+        return product if product is not None else self.womens_products.get(key)
+
+    def get_mens(self, key: str) -> Optional[dict]:
+        """Get a men's product by catalog key."""
+        product = self.mens_clothing.get(key)
+        return product if product is not None else self.mens_products.get(key)
+
+    def womens_by_subcategory(self, category: str, subcategory: str) -> list[dict]:
+        """Get women's products in a (category, subcategory), in catalog order."""
+        return self._group("womens", "subcategory", category, subcategory)
+
+    def mens_by_subcategory(self, category: str, subcategory: str) -> list[dict]:
+        """Get men's products in a (category, subcategory), in catalog order."""
+        return self._group("mens", "subcategory", category, subcategory)
+
+    def mens_by_brand(self, brand: str, subcategory: str) -> list[dict]:
+        """Get men's products of a brand in a subcategory, in catalog order."""
+        return self._group("mens", "brand", brand, subcategory)
+
+    def golden_pair(self, womens_id: str) -> Optional[dict]:
+        """Get pre-computed pair data for a women's product."""
+        return self._golden_by_womens_id.get(womens_id)
+
+    # -------------------------------------------------------------------------
+    # Listings
+    # -------------------------------------------------------------------------
+
+    def list_womens(self, category: Optional[str] = None) -> list[dict]:
+        """List women's products, optionally restricted to one category."""
+        return self._group("womens", "category", category) if category else self._group("womens", "all")
+
+    def list_mens(self, category: Optional[str] = None) -> list[dict]:
+        """List men's products, optionally restricted to one category."""
+        return self._group("mens", "category", category) if category else self._group("mens", "all")
+
+    def list_page(
+        self,
+        side: str,
+        category: Optional[str] = None,
+        after: Optional[str] = None,
+        limit: int = 100
+    ) -> list[dict]:
+        """List one page of a side's products in product id order."""
+        start, end = self._listings.get((side, "category", category) if category else (side, "all"), (0, 0))
+        if after is not None:
+            start = bisect_left(self._listing_positions, self._ids.bisect_right(after), start, end)
+        return [
+            self._resolve(_SIDES[self._id_sides[position]], self._id_refs[position])[1]
+            for position in self._listing_positions[start:min(end, start + limit)]
+        ]
+
+    def count_womens(self) -> int:
+        """Count women's products."""
+        start, end = self._groups.get(("womens", "all"), (0, 0))
+        return end - start
+
+    def count_mens(self) -> int:
+        """Count men's products."""
+        start, end = self._groups.get(("mens", "all"), (0, 0))
+        return end - start
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Build a memory-mapped catalog snapshot.")
+    parser.add_argument("--output", default=os.getenv("CATALOG_SNAPSHOT_PATH", "catalog.snap"))
+    parser.add_argument("--sqlite", default=None, help="Build from a SQLite catalog instead of the demo data")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.sqlite:
+        from .sqlite_catalog import SqliteCatalog
+        source = SqliteCatalog(args.sqlite)
+        catalog = CatalogStore(
+            *(dict(getattr(source, name).items()) for name in PARTITIONS), source.golden_pairs
+        )
+    else:
+        catalog = CatalogStore.from_mock_data()
+    # Rank the stored suggestions with the match table workers will load
+    if MATCH_TABLE_PATH and os.path.exists(MATCH_TABLE_PATH):
+        catalog.attach_match_table(read_match_table(MATCH_TABLE_PATH))
+
+    summary = build_snapshot(catalog, args.output)
+    elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    SnapshotCatalog(args.output)
+    open_ms = (time.perf_counter() - start) * 1000
+
+    print(f"Wrote {summary['products']} products ({summary['strings']} strings, "
+          f"{summary['bytes'] / 2**20:.1f} MB) to {args.output} in {elapsed:.1f}s; opens in {open_ms:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,498 @@
+"""
+SQLite catalog repository.
+
+A local stand-in for the planned Supabase store: products live in one SQLite
+file with indexed category, subcategory, brand and price columns and an FTS5
+table over keys, titles, brands, subcategories and ingredients, so lookups,
+listings and product search are answered by queries instead of module-level
+dicts.
+
+Each thread gets its own read-only connection, opened on first use and reused
+for the life of the catalog.
+
+Build a database from the demo data with:
+    python -m app.sqlite_catalog --output catalog.db
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from functools import partial
+from typing import Iterable, Iterator, Mapping, Optional
+
+from .catalog import CatalogRepository, next_version
+from .models import ProductCategory
+from .services.index import CatalogIndex
+from .services.search import FIELD_WEIGHTS, SearchIndex, SearchResults
+from .services.text import tokenize
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    key TEXT NOT NULL,
+    gender TEXT NOT NULL CHECK (gender IN ('womens', 'mens')),
+    clothing INTEGER NOT NULL,
+    category TEXT,
+    subcategory TEXT,
+    brand TEXT,
+    price REAL NOT NULL,
+    title TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_products_key ON products (gender, clothing, key);
+CREATE INDEX IF NOT EXISTS idx_products_category ON products (gender, category, subcategory, price);
+CREATE INDEX IF NOT EXISTS idx_products_brand ON products (gender, brand, subcategory);
+CREATE INDEX IF NOT EXISTS idx_products_listing ON products (gender, id);
+CREATE INDEX IF NOT EXISTS idx_products_category_listing ON products (gender, category, id);
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+    key, title, brand, subcategory, ingredients, tokenize='unicode61 remove_diacritics 0'
+);
+CREATE TABLE IF NOT EXISTS golden_pairs (
+    seq INTEGER PRIMARY KEY,
+    womens_id TEXT NOT NULL,
+    mens_id TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_golden_pairs_womens ON golden_pairs (womens_id);
+"""
+
+# Listings follow the in-memory merge order: personal care dict, then clothing dict
+_LIST_ORDER = "ORDER BY clothing, seq"
+
+# Bumped when the tables change; older files must be rebuilt
+SCHEMA_VERSION = 2
+
+# bm25() weights of the FTS columns (key, title, brand, subcategory, ingredients); keys repeat titles
+_FTS_WEIGHTS = (
+    0.0, FIELD_WEIGHTS["title"], FIELD_WEIGHTS["brand"], FIELD_WEIGHTS["subcategory"], FIELD_WEIGHTS["ingredients"]
+)
+
+
+def check_schema(conn: sqlite3.Connection):
+    """Raise ValueError if the file holds a catalog written with an older schema."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    has_products = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products'"
+    ).fetchone()
+    if has_products and version != SCHEMA_VERSION:
+        raise ValueError(
+            f"SQLite catalog has schema version {version}, expected {SCHEMA_VERSION}; rebuild it"
+        )
+
+
+def create_schema(conn: sqlite3.Connection):
+    """Create the catalog tables and indexes if they don't exist."""
+    check_schema(conn)
+    conn.executescript(SCHEMA)
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+def insert_product(conn: sqlite3.Connection, gender: str, key: str, product: dict) -> Optional[str]:
+    """
+    Insert one product and its FTS row, ignoring ids already present.
+
+    A key already taken by another product in the partition (e.g. two
+    products sharing a title) gets the product id appended, so both are kept.
+
+    Returns:
+        The key the product was stored under, or None if its id was present
+    """
+    category = product.get("category")
+    row = [
+        product["id"], key, gender, int(category == ProductCategory.CLOTHING.value),
+        category, product.get("subcategory"), product.get("brand"), product["price"],
+        product.get("title", ""), json.dumps(product)
+    ]
+    insert = (
+        "INSERT OR IGNORE INTO products "
+        "(id, key, gender, clothing, category, subcategory, brand, price, title, data) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    )
+    cursor = conn.execute(insert, row)
+    if cursor.rowcount != 1:
+        if conn.execute("SELECT 1 FROM products WHERE id = ?", (product["id"],)).fetchone():
+            return None
+        key = row[1] = f"{key} [{product['id']}]"
+        cursor = conn.execute(insert, row)
+        if cursor.rowcount != 1:
+            raise sqlite3.IntegrityError(f"Catalog key {key!r} is already taken")
+
+    ingredients = product.get("ingredients") or product.get("materials") or []
+    conn.execute(
+        "INSERT INTO products_fts (rowid, key, title, brand, subcategory, ingredients) VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            cursor.lastrowid, key, product.get("title", ""), product.get("brand") or "",
+            (product.get("subcategory") or "").replace("_", " "), "\n".join(ingredients)
+        )
+    )
+    return key
+
+
+def insert_golden_pairs(conn: sqlite3.Connection, pairs: Iterable[dict]):
+    """Insert pre-verified pairs, in order."""
+    conn.executemany(
+        "INSERT INTO golden_pairs (womens_id, mens_id, data) VALUES (?, ?, ?)",
+        ((pair["womens_id"], pair["mens_id"], json.dumps(pair)) for pair in pairs)
+    )
+
+
+def build_from_mock_data(path: str) -> int:
+    """
+    Write the demo product database to a new SQLite catalog file.
+
+    Returns:
+        Number of products written
+    """
+    from . import mock_data
+
+    if os.path.exists(path):
+        os.remove(path)
+
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        create_schema(conn)
+        count = 0
+        with conn:
+            for gender, products in (
+                ("womens", mock_data.WOMENS_PRODUCTS),
+                ("womens", mock_data.WOMENS_CLOTHING),
+                ("mens", mock_data.MENS_PRODUCTS),
+                ("mens", mock_data.MENS_CLOTHING)
+            ):
+                for key, product in products.items():
+                    count += insert_product(conn, gender, key, product) is not None
+            insert_golden_pairs(conn, mock_data.GOLDEN_PAIRS)
+        return count
+    finally:
+        conn.close()
+
+
+class SqliteProducts(Mapping):
+    """Lazy catalog key -> product mapping over one (gender, clothing) partition, in catalog order."""
+
+    def __init__(self, catalog: "SqliteCatalog", gender: str, clothing: bool):
+        self._catalog = catalog
+        self._where = "gender = ? AND clothing = ?"
+        self._params = (gender, int(clothing))
+        # The database is opened read-only, so the size can't change under us
+        self._len = catalog._query_one(
+            f"SELECT COUNT(*) FROM products WHERE {self._where}", self._params
+        )[0]
+
+    def __getitem__(self, key: str) -> dict:
+        row = self._catalog._query_one(
+            f"SELECT data FROM products WHERE {self._where} AND key = ?", self._params + (key,)
+        )
+        if row is None:
+            raise KeyError(key)
+        return json.loads(row[0])
+
+    def __iter__(self) -> Iterator[str]:
+        for (key,) in self._catalog._query(
+            f"SELECT key FROM products WHERE {self._where} ORDER BY seq", self._params
+        ):
+            yield key
+
+    def __len__(self) -> int:
+        return self._len
+
+    def items(self) -> Iterator[tuple[str, dict]]:
+        for key, data in self._catalog._query(
+            f"SELECT key, data FROM products WHERE {self._where} ORDER BY seq", self._params
+        ):
+            yield key, json.loads(data)
+
+    def values(self) -> Iterator[dict]:
+        for _, product in self.items():
+            yield product
+
+
+class SqliteSearchIndex(SearchIndex):
+    """
+    Product search answered by the FTS5 table; nothing is built in memory.
+
+    Ranks with FTS5's bm25() over titles, brands, subcategories and
+    ingredients/materials, weighted like SearchIndex. Query words are the
+    same tokens SearchIndex uses (stop words dropped, any word can match).
+    """
+
+    def __init__(self, catalog: "SqliteCatalog"):
+        self._catalog = catalog
+
+    def __len__(self) -> int:
+        return self._catalog.count_womens() + self._catalog.count_mens()
+
+    @staticmethod
+    def _match(query: str, category: Optional[str]) -> Optional[tuple[str, tuple]]:
+        """FROM/WHERE clause and parameters selecting products that match any query word."""
+        words = list(dict.fromkeys(tokenize(query)))
+        if not words:
+            return None
+
+        match = " OR ".join('"' + word.replace('"', '""') + '"' for word in words)
+        sql = "FROM products_fts JOIN products p ON p.seq = products_fts.rowid WHERE products_fts MATCH ?"
+        if category:
+            return f"{sql} AND p.category = ?", (match, category)
+        return sql, (match,)
+
+    def _ranked(self, match: tuple[str, tuple], limit: Optional[int] = None, offset: int = 0) -> sqlite3.Cursor:
+        """(product id, score) rows, best first (ties in id order), optionally one page of them."""
+        where, params = match
+        sql = f"SELECT p.id, -bm25(products_fts, ?, ?, ?, ?, ?) AS score {where} ORDER BY score DESC, p.id"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += (limit, offset)
+        return self._catalog._query(sql, (*_FTS_WEIGHTS, *params))
+
+    def search(
+        self,
+        query: str,
+        category: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+        allowed: Optional[bytes] = None
+    ) -> SearchResults:
+        """
+        Rank products against a free-text query (see SearchIndex.search).
+
+        Without facet filters the count and the page are both SQL queries.
+        Facet bitmaps live in memory, so filtered hits are streamed from the
+        ranked query and only the requested window is kept.
+        """
+        match = self._match(query, category)
+        if match is None:
+            return SearchResults(0, [])
+
+        if allowed is None:
+            where, params = match
+            total = self._catalog._query_one(f"SELECT COUNT(*) {where}", params)[0]
+            if total <= offset:
+                return SearchResults(total, [])
+            return SearchResults(total, self._ranked(match, limit, offset).fetchall())
+
+        # Facet filters are bitmaps over facet index positions
+        facets = self._catalog.facet_index
+        total = 0
+        hits = []
+        for product_id, score in self._ranked(match):
+            position = facets.position(product_id)
+            if position is None or not allowed[position >> 3] >> (position & 7) & 1:
+                continue
+            if offset <= total < offset + limit:
+                hits.append((product_id, score))
+            total += 1
+        return SearchResults(total, hits)
+
+    def matches(self, query: str, category: Optional[str] = None) -> set[int]:
+        """Facet index positions of every product matching a query, for facet counting."""
+        match = self._match(query, category)
+        if match is None:
+            return set()
+
+        where, params = match
+        facets = self._catalog.facet_index
+        rows = self._catalog._query(f"SELECT p.id {where}", params)
+        positions = (facets.position(product_id) for (product_id,) in rows)
+        return {position for position in positions if position is not None}
+
+
+def _close_connections(connections: list[sqlite3.Connection], lock: threading.Lock):
+    """Close a catalog's per-thread connections."""
+    with lock:
+        for conn in connections:
+            conn.close()
+        connections.clear()
+
+
+class SqliteCatalog(CatalogRepository):
+    """Read-only product catalog served from a SQLite file, one connection per thread."""
+
+    def __init__(self, path: str):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"SQLite catalog not found: {path}")
+
+        self.path = path
+        self.version = next_version()
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        check_schema(self._connection())
+
+        self.womens_products = SqliteProducts(self, "womens", clothing=False)
+        self.mens_products = SqliteProducts(self, "mens", clothing=False)
+        self.womens_clothing = SqliteProducts(self, "womens", clothing=True)
+        self.mens_clothing = SqliteProducts(self, "mens", clothing=True)
+        self.golden_pairs = [json.loads(data) for (data,) in self._query("SELECT data FROM golden_pairs ORDER BY seq")]
+
+        # Limitation: matching still reads every product once into in-memory key
+        # matchers and candidate indexes; only lookups, listings and search stay in SQL
+        self._build_match_indexes()
+        self._search_index = SqliteSearchIndex(self)
+
+    # -------------------------------------------------------------------------
+    # Connections
+    # -------------------------------------------------------------------------
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _query(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        return self._connection().execute(sql, params)
+
+    def _query_one(self, sql: str, params: tuple = ()) -> Optional[tuple]:
+        return self._query(sql, params).fetchone()
+
+    def _products(self, sql: str, params: tuple = ()) -> list[dict]:
+        return [json.loads(data) for (data,) in self._query(sql, params)]
+
+    def close(self):
+        """Close every thread's connection."""
+        _close_connections(self._connections, self._lock)
+        self._local = threading.local()
+
+    def _releaser(self):
+        return partial(_close_connections, self._connections, self._lock)
+
+    # -------------------------------------------------------------------------
+    # Per-category product databases
+    # -------------------------------------------------------------------------
+
+    def womens_db(self, category: ProductCategory) -> SqliteProducts:
+        """Get the women's product mapping searched for a product category."""
+        return self.womens_clothing if category == ProductCategory.CLOTHING else self.womens_products
+
+    def mens_db(self, category: ProductCategory) -> SqliteProducts:
+        """Get the men's product mapping searched for a product category."""
+        return self.mens_clothing if category == ProductCategory.CLOTHING else self.mens_products
+
+    def mens_index(self, category: ProductCategory) -> CatalogIndex:
+        """Get the match candidate index over the men's products for a category."""
+        if category == ProductCategory.CLOTHING:
+            return self.mens_clothing_index
+        return self.mens_products_index
+
+    # -------------------------------------------------------------------------
+    # Lookups
+    # -------------------------------------------------------------------------
+
+    def get_product(self, product_id: str) -> Optional[dict]:
+        """Get any product by id."""
+        row = self._query_one("SELECT data FROM products WHERE id = ?", (product_id,))
+        return json.loads(row[0]) if row else None
+
+    def get_key(self, product_id: str) -> Optional[str]:
+        """Get the catalog key of a product by id."""
+        row = self._query_one("SELECT key FROM products WHERE id = ?", (product_id,))
+        return row[0] if row else None
+
+    def _get_by_key(self, gender: str, key: str) -> Optional[dict]:
+        # Clothing wins a key collision, as in the merged in-memory dicts
+        row = self._query_one(
+            "SELECT data FROM products WHERE gender = ? AND key = ? ORDER BY clothing DESC LIMIT 1",
+            (gender, key)
+        )
+        return json.loads(row[0]) if row else None
+
+    def get_womens(self, key: str) -> Optional[dict]:
+        """Get a women's product by catalog key."""
+        return self._get_by_key("womens", key)
+
+    def get_mens(self, key: str) -> Optional[dict]:
+        """Get a men's product by catalog key."""
+        return self._get_by_key("mens", key)
+
+    def womens_by_subcategory(self, category: str, subcategory: str) -> list[dict]:
+        """Get women's products in a (category, subcategory), in catalog order."""
+        return self._products(
+            f"SELECT data FROM products WHERE gender = 'womens' AND category = ? AND subcategory = ? {_LIST_ORDER}",
+            (category, subcategory)
+        )
+
+    def mens_by_subcategory(self, category: str, subcategory: str) -> list[dict]:
+        """Get men's products in a (category, subcategory), in catalog order."""
+        return self._products(
+            f"SELECT data FROM products WHERE gender = 'mens' AND category = ? AND subcategory = ? {_LIST_ORDER}",
+            (category, subcategory)
+        )
+
+    def mens_by_brand(self, brand: str, subcategory: str) -> list[dict]:
+        """Get men's products of a brand in a subcategory, in catalog order."""
+        return self._products(
+            f"SELECT data FROM products WHERE gender = 'mens' AND brand = ? AND subcategory = ? {_LIST_ORDER}",
+            (brand, subcategory)
+        )
+
+    def golden_pair(self, womens_id: str) -> Optional[dict]:
+        """Get pre-computed pair data for a women's product."""
+        row = self._query_one(
+            "SELECT data FROM golden_pairs WHERE womens_id = ? ORDER BY seq LIMIT 1", (womens_id,)
+        )
+        return json.loads(row[0]) if row else None
+
+    # -------------------------------------------------------------------------
+    # Listings
+    # -------------------------------------------------------------------------
+
+    def _list(self, gender: str, category: Optional[str]) -> list[dict]:
+        if category:
+            return self._products(
+                f"SELECT data FROM products WHERE gender = ? AND category = ? {_LIST_ORDER}",
+                (gender, category)
+            )
+        return self._products(f"SELECT data FROM products WHERE gender = ? {_LIST_ORDER}", (gender,))
+
+    def list_womens(self, category: Optional[str] = None) -> list[dict]:
+        """List women's products, optionally restricted to one category."""
+        return self._list("womens", category)
+
+    def list_mens(self, category: Optional[str] = None) -> list[dict]:
+        """List men's products, optionally restricted to one category."""
+        return self._list("mens", category)
+
+    def list_page(
+        self,
+        side: str,
+        category: Optional[str] = None,
+        after: Optional[str] = None,
+        limit: int = 100
+    ) -> list[dict]:
+        """List one page of a side's products in product id order (a keyset seek on the listing indexes)."""
+        sql, params = "SELECT data FROM products WHERE gender = ?", [side]
+        if category:
+            sql += " AND category = ?"
+            params.append(category)
+        if after is not None:
+            sql += " AND id > ?"
+            params.append(after)
+        return self._products(f"{sql} ORDER BY id LIMIT ?", (*params, limit))
+
+    def count_womens(self) -> int:
+        """Count women's products."""
+        return self._query_one("SELECT COUNT(*) FROM products WHERE gender = 'womens'")[0]
+
+    def count_mens(self) -> int:
+        """Count men's products."""
+        return self._query_one("SELECT COUNT(*) FROM products WHERE gender = 'mens'")[0]
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Build a SQLite catalog from the demo product data.")
+    parser.add_argument("--output", default=os.getenv("CATALOG_SQLITE_PATH", "catalog.db"))
+    args = parser.parse_args(argv)
+
+    count = build_from_mock_data(args.output)
+    print(f"Wrote {count} products to {args.output}")
+
+
+if __name__ == "__main__":
+    main()